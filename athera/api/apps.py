@@ -1,20 +1,18 @@
-import requests
-from athera.api.common import headers, api_debug
+from athera.api.transport import get_transport
+from athera.api.common import headers
 
 route_app_families = "/families"
 route_app          = "/apps/{app_id}"
 
-@api_debug
 def get_app_families(base_url, group_id, token):
     """
     App Families represent high-level products, eg Nuke. This endpoint only returns app families for which the authenticated user has an active Entitlement.
     Response: [403 Forbidden] Incorrect or inaccessible group_id
     """
     url = base_url + route_app_families
-    response = requests.get(url, headers=headers(group_id, token))
+    response = get_transport().get(url, route=route_app_families, headers=headers(group_id, token))
     return response
 
-@api_debug
 def get_app(base_url, group_id, token, app_id):
     """
     Apps are children of App Families and are either 'interactive' or 'compute'. They normally have a minor version like 11.2v3.
@@ -22,7 +20,7 @@ def get_app(base_url, group_id, token, app_id):
     Response: [404 Not Found] Incorrect app_id
     """
     url = base_url + route_app.format(app_id=app_id)
-    response = requests.get(url, headers=headers(group_id, token))
+    response = get_transport().get(url, route=route_app, headers=headers(group_id, token))
     return response
 
 
@@ -0,0 +1,396 @@
+"""
+An asyncio client for the Athera API, mirroring the request methods of athera.api.client.Client.
+
+Requires aiohttp (pip install athera-python[async]). Every coroutine returns an AsyncResponse whose body has already
+been read, so it can be used like a requests.Response (status_code, json(), text). iter_jobs, iter_orgs and
+iter_group_children are async generators. The incremental JSON parsers (stream_jobs, stream_parts) and the thread
+pool helpers (crawl_groups, build_driver_index) are only available on Client.
+
+Requests share one aiohttp connection pool, and the number of requests in flight for each active group is capped,
+so thousands of get_job/get_session polls can be scheduled on one event loop without overwhelming the API.
+"""
+import asyncio
+import json
+from timeit import default_timer
+
+import aiohttp
+import requests
+
+from athera.api import apps, compute, groups, sessions, storage
+from athera.api.common import headers, page_params
+from athera.api.metrics import Metrics, default_log_sample_rate
+from athera.api.pagination import next_page
+from athera.api.watchers import SessionBackoff, SessionState, is_permanent_error
+
+DEFAULT_LIMIT           = 100
+DEFAULT_LIMIT_PER_HOST  = 100
+DEFAULT_KEEPALIVE       = 30
+DEFAULT_GROUP_CONCURRENCY = 50
+
+
+class AsyncResponse(object):
+    """
+    The parts of a requests.Response that callers of athera.api rely on.
+    """
+    def __init__(self, method, url, status_code, headers, content):
+        self.method = method
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", "replace")
+
+    def json(self):
+        return json.loads(self.text)
+
+    def __bool__(self):
+        return self.ok
+
+    __nonzero__ = __bool__
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise requests.HTTPError("{} Error for url: {}".format(self.status_code, self.url), response=self)
+
+    def __repr__(self):
+        return "<AsyncResponse [{}]>".format(self.status_code)
+
+
+class AsyncPool(object):
+    """
+    The aiohttp session and per-group concurrency limits shared by a family of AsyncClients.
+
+    'limit':             Total number of simultaneous connections.
+    'limit_per_host':    Simultaneous connections to a single host.
+    'keepalive_timeout': Seconds an idle connection is kept open for reuse.
+    'group_concurrency': Requests in flight per active group. Further requests wait their turn.
+    'timeout':           Total seconds allowed for each request, or None.
+    'metrics':           The athera.api.metrics.Metrics recording per-route counts and latencies.
+    """
+    def __init__(self, limit=DEFAULT_LIMIT, limit_per_host=DEFAULT_LIMIT_PER_HOST, keepalive_timeout=DEFAULT_KEEPALIVE,
+                 group_concurrency=DEFAULT_GROUP_CONCURRENCY, timeout=None, metrics=None):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.group_concurrency = group_concurrency
+        self.timeout = timeout
+        self.metrics = metrics if metrics is not None else Metrics(log_sample_rate=default_log_sample_rate())
+        self.session = None
+        self.semaphores = {}
+
+    def get_session(self):
+        # aiohttp sessions must be created inside a running event loop, so this is deferred until the first request.
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self.session
+
+    def get_semaphore(self, group_id):
+        semaphore = self.semaphores.get(group_id)
+        if semaphore is None:
+            semaphore = self.semaphores[group_id] = asyncio.Semaphore(self.group_concurrency)
+        return semaphore
+
+    async def request(self, method, url, group_id, route=None, **kwargs):
+        async with self.get_semaphore(group_id):
+            start = default_timer()
+            try:
+                async with self.get_session().request(method, url, **kwargs) as response:
+                    content = await response.read()
+                    result = AsyncResponse(method, str(response.url), response.status, response.headers, content)
+            except Exception as e:
+                self.metrics.observe(method, route, url, default_timer() - start, error=e, body=kwargs.get("json"))
+                raise
+            self.metrics.observe(method, route, url, default_timer() - start, response=result, body=kwargs.get("json"))
+            return result
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+
+async def paginate(fetch, key, page_size=None, prefetch=True, first_page=None):
+    """
+    Yield every item found under 'key' across all pages, like athera.api.pagination.paginate.
+
+    'fetch':    A coroutine function called as fetch(page=..., page_size=...) returning an AsyncResponse for that page.
+    'prefetch': Fetch the next page in a task while the current one is being consumed.
+
+    Failed requests raise requests.HTTPError.
+    """
+    pending = None
+    page = first_page
+    response = await fetch(page=page, page_size=page_size)
+    try:
+        while response is not None:
+            response.raise_for_status()
+            data = response.json()
+            items = data.get(key) or []
+
+            following = next_page(data.get("pagination"), page if page is not None else 1)
+            # An empty page ends the walk even if the pagination object disagrees, so we never spin forever.
+            if following is not None and items:
+                pending = fetch(page=following, page_size=page_size)
+                if prefetch:
+                    pending = asyncio.ensure_future(pending)
+            else:
+                pending = None
+
+            for item in items:
+                yield item
+
+            page = following
+            response, pending = (await pending if pending is not None else None), None
+    finally:
+        if pending is not None:
+            if prefetch:
+                pending.cancel()
+            else:
+                pending.close()
+
+
+class AsyncClient(object):
+    """
+    Asyncio client to query the Athera API on behalf of a single user and active group.
+
+    'base_url': The API root, eg https://api.athera.io/api/v1 (no trailing '/').
+    'token':    JSON Web Token. See athera.auth.generate_jwt.py on how to generate a JWT.
+    'group_id': The active group which defines the context of each request.
+    'pool':     An AsyncPool. If not supplied the client creates (and owns) one, built from any extra keyword arguments.
+    """
+
+    def __init__(self, base_url, token, group_id, pool=None, **pool_kwargs):
+        self.base_url = base_url
+        self.token = token
+        self.group_id = group_id
+        self.pool = pool if pool is not None else AsyncPool(**pool_kwargs)
+        self.owns_pool = pool is None
+
+        self.headers = headers(group_id, token)
+        self.org_headers = {"Authorization": self.headers["Authorization"]}
+
+        self.url_app_families     = base_url + apps.route_app_families
+        self.url_app              = (base_url + apps.route_app).format
+        self.url_jobs             = base_url + compute.route_jobs
+        self.url_job              = (base_url + compute.route_job).format
+        self.url_job_stop         = (base_url + compute.route_job_stop).format
+        self.url_parts            = (base_url + compute.route_parts).format
+        self.url_part             = (base_url + compute.route_part).format
+        self.url_orgs             = base_url + groups.route_orgs
+        self.url_group            = (base_url + groups.route_group).format
+        self.url_group_children   = (base_url + groups.route_group_children).format
+        self.url_group_users      = (base_url + groups.route_group_users).format
+        self.url_user_sessions    = (base_url + sessions.route_user_sessions).format
+        self.url_session          = (base_url + sessions.route_session).format
+        self.url_sessions         = base_url + sessions.route_sessions
+        self.url_session_stop     = (base_url + sessions.route_session_stop).format
+        self.url_driver           = base_url + storage.route_driver
+        self.url_drivers          = base_url + storage.route_drivers
+        self.url_driver_id        = (base_url + storage.route_driver_id).format
+
+    def for_group(self, group_id):
+        """
+        Return an AsyncClient for another active group which shares this client's pool.
+        """
+        return AsyncClient(self.base_url, self.token, group_id, pool=self.pool)
+
+    async def close(self):
+        if self.owns_pool:
+            await self.pool.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def _get(self, url, route, **kwargs):
+        return self.pool.request("GET", url, self.group_id, route, headers=self.headers, **kwargs)
+
+    def _post(self, url, route, **kwargs):
+        return self.pool.request("POST", url, self.group_id, route, headers=self.headers, **kwargs)
+
+    def _delete(self, url, route, **kwargs):
+        return self.pool.request("DELETE", url, self.group_id, route, headers=self.headers, **kwargs)
+
+    # Apps
+    async def get_app_families(self):
+        """ See athera.api.apps.get_app_families """
+        return await self._get(self.url_app_families, apps.route_app_families)
+
+    async def get_app(self, app_id):
+        """ See athera.api.apps.get_app """
+        return await self._get(self.url_app(app_id=app_id), apps.route_app)
+
+    # Compute
+    async def get_jobs(self, page=None, page_size=None):
+        """ See athera.api.compute.get_jobs """
+        return await self._get(self.url_jobs, compute.route_jobs, params=page_params(page, page_size))
+
+    def iter_jobs(self, page_size=None, prefetch=True):
+        """ See athera.api.pagination.iter_jobs. An async generator. """
+        return paginate(self.get_jobs, "jobs", page_size, prefetch)
+
+    async def get_job(self, job_id):
+        """ See athera.api.compute.get_job """
+        return await self._get(self.url_job(job_id=job_id), compute.route_job)
+
+    async def create_job(self, payload, idempotency_key=None):
+        """ See athera.api.compute.create_job """
+        request_headers = dict(self.headers)
+        if idempotency_key is not None:
+            request_headers[compute.idempotency_header] = idempotency_key
+        return await self.pool.request("POST", self.url_jobs, self.group_id, compute.route_jobs,
+                                       headers=request_headers, json=payload, allow_redirects=False)
+
+    async def stop_job(self, job_id):
+        """ See athera.api.compute.stop_job """
+        return await self._post(self.url_job_stop(job_id=job_id), compute.route_job_stop)
+
+    async def get_parts(self, job_id):
+        """ See athera.api.compute.get_parts """
+        return await self._get(self.url_parts(job_id=job_id), compute.route_parts)
+
+    async def get_part(self, job_id, part_id):
+        """ See athera.api.compute.get_part """
+        return await self._get(self.url_part(job_id=job_id, part_id=part_id), compute.route_part)
+
+    # Groups
+    async def get_orgs(self, page=None, page_size=None):
+        """ See athera.api.groups.get_orgs """
+        return await self.pool.request("GET", self.url_orgs, None, groups.route_orgs, headers=self.org_headers,
+                                       params=page_params(page, page_size))
+
+    def iter_orgs(self, page_size=None, prefetch=True):
+        """ See athera.api.pagination.iter_orgs. An async generator. """
+        return paginate(self.get_orgs, "groups", page_size, prefetch)
+
+    async def get_group(self, target_group_id=None):
+        """ See athera.api.groups.get_group """
+        target = target_group_id if target_group_id else self.group_id
+        return await self._get(self.url_group(group_id=target), groups.route_group)
+
+    async def get_group_children(self, target_group_id=None, page=None, page_size=None):
+        """ See athera.api.groups.get_group_children """
+        target = target_group_id if target_group_id else self.group_id
+        url = self.url_group_children(group_id=target)
+        return await self._get(url, groups.route_group_children, params=page_params(page, page_size))
+
+    def iter_group_children(self, target_group_id=None, page_size=None, prefetch=True):
+        """ See athera.api.pagination.iter_group_children. An async generator. """
+        async def fetch(page, page_size):
+            return await self.get_group_children(target_group_id, page=page, page_size=page_size)
+        return paginate(fetch, "groups", page_size, prefetch)
+
+    async def get_group_users(self, target_group_id=None):
+        """ See athera.api.groups.get_group_users """
+        target = target_group_id if target_group_id else self.group_id
+        return await self._get(self.url_group_users(group_id=target), groups.route_group_users)
+
+    # Sessions
+    async def get_user_sessions(self, user_id):
+        """ See athera.api.sessions.get_user_sessions """
+        return await self._get(self.url_user_sessions(user_id=user_id), sessions.route_user_sessions)
+
+    async def get_session(self, session_id):
+        """ See athera.api.sessions.get_session """
+        return await self._get(self.url_session(session_id=session_id), sessions.route_session)
+
+    async def start_session(self, payload):
+        """ See athera.api.sessions.start_session """
+        return await self._post(self.url_sessions, sessions.route_sessions, json=payload)
+
+    async def stop_session(self, session_id):
+        """ See athera.api.sessions.stop_session """
+        return await self._post(self.url_session_stop(session_id=session_id), sessions.route_session_stop)
+
+    async def wait_for_sessions(self, session_ids, timeout=None, backoff=None):
+        """
+        Wait until every session is READY, failed or terminated, or 'timeout' seconds have passed, polling them all
+        from one coroutine. Returns a dict of session_id -> the last session seen, None for sessions which could not
+        be fetched. See athera.api.watchers.SessionBackoff for the poll intervals.
+        """
+        backoff = backoff if backoff is not None else SessionBackoff()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout if timeout is not None else None
+        pending = dict((session_id, SessionState(session_id, self.group_id, loop.time())) for session_id in session_ids)
+        result = dict.fromkeys(pending)
+
+        while pending:
+            now = loop.time()
+            due = [state for state in pending.values() if state.due <= now]
+            responses = await asyncio.gather(*[self.get_session(state.session_id) for state in due],
+                                             return_exceptions=True)
+            now = loop.time()
+            for state, response in zip(due, responses):
+                if isinstance(response, Exception) or not response.ok:
+                    if isinstance(response, AsyncResponse) and is_permanent_error(response):
+                        del pending[state.session_id]
+                    else:
+                        state.retry(backoff, now)
+                    continue
+                if state.update(response.json(), backoff, now):
+                    del pending[state.session_id]
+                result[state.session_id] = state.session
+
+            if not pending:
+                break
+            next_due = min(state.due for state in pending.values())
+            if deadline is not None and next_due > deadline:
+                break
+            await asyncio.sleep(max(0.0, next_due - loop.time()))
+        return result
+
+    async def wait_for_session(self, session_id, timeout=None, backoff=None):
+        """
+        Wait until a session is READY, failed or terminated, or 'timeout' seconds have passed, and return the last
+        session seen.
+        """
+        return (await self.wait_for_sessions([session_id], timeout, backoff))[session_id]
+
+    # Storage
+    async def get_drivers(self):
+        """ See athera.api.storage.get_drivers """
+        return await self._get(self.url_drivers, storage.route_drivers)
+
+    async def get_driver(self, driver_id):
+        """ See athera.api.storage.get_driver """
+        return await self._get(self.url_driver_id(driver_id=driver_id), storage.route_driver_id)
+
+    async def delete_driver(self, driver_id):
+        """ See athera.api.storage.delete_driver """
+        return await self._delete(self.url_driver_id(driver_id=driver_id), storage.route_driver_id)
+
+    async def create_driver(self, storage_driver_request):
+        """ See athera.api.storage.create_driver """
+        return await self._post(self.url_driver, storage.route_driver, json=storage_driver_request)
+
+    async def rescan_driver(self, driver_id, path):
+        """ See athera.api.storage.rescan_driver """
+        body = {
+            "type": "RESCAN",
+            "path": path
+        }
+        return await self._post(self.url_driver_id(driver_id=driver_id), storage.route_driver_id, json=body)
+
+    async def dropcache_driver(self, driver_id):
+        """ See athera.api.storage.dropcache_driver """
+        body = {
+            "type": "DROP"
+        }
+        return await self._post(self.url_driver_id(driver_id=driver_id), storage.route_driver_id, json=body)
@@ -0,0 +1,98 @@
+"""
+Bulk variants of the single-item routes, fanned out over a bounded pool of worker threads.
+
+Each helper yields (id, response, error) tuples as soon as each request finishes, so results arrive in completion
+order, not input order. 'error' is None for a successful response, a requests.HTTPError (with 'response' still set)
+for an error status, or the exception raised if the request could not be made at all (with 'response' None).
+A failure never stops the remaining items.
+"""
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import requests
+
+from athera.api import compute, groups, sessions
+
+DEFAULT_MAX_WORKERS = 8
+
+
+def fetch_many(func, ids, max_workers=DEFAULT_MAX_WORKERS):
+    """
+    Call func(id) for every id with at most 'max_workers' calls in flight, yielding (id, response, error) as they
+    finish. 'ids' may be any iterable, including a generator; it is consumed only as workers become free.
+    """
+    ids = iter(ids)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = {}
+
+        def submit():
+            for item in ids:
+                pending[executor.submit(func, item)] = item
+                return True
+            return False
+
+        for _ in range(max_workers):
+            if not submit():
+                break
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                item = pending.pop(future)
+                submit()
+                yield (item,) + _outcome(future)
+
+
+def _outcome(future):
+    try:
+        response = future.result()
+    except Exception as e:
+        return None, e
+    if response is not None and not response.ok:
+        return response, requests.HTTPError("{} Error for url: {}".format(response.status_code, response.url),
+                                            response=response)
+    return response, None
+
+
+def get_jobs_by_ids(base_url, group_id, token, job_ids, max_workers=DEFAULT_MAX_WORKERS):
+    """
+    Get many Compute Jobs, which must belong to the provided Group. Yields (job_id, response, error).
+    """
+    def fetch(job_id):
+        return compute.get_job(base_url, group_id, token, job_id)
+    return fetch_many(fetch, job_ids, max_workers)
+
+
+def get_parts_for_jobs(base_url, group_id, token, job_ids, max_workers=DEFAULT_MAX_WORKERS):
+    """
+    Get all Compute Parts for many Jobs, which must belong to the provided Group. Yields (job_id, response, error).
+    """
+    def fetch(job_id):
+        return compute.get_parts(base_url, group_id, token, job_id)
+    return fetch_many(fetch, job_ids, max_workers)
+
+
+def get_sessions_by_ids(base_url, group_id, token, session_ids, max_workers=DEFAULT_MAX_WORKERS):
+    """
+    Get many Sessions. Yields (session_id, response, error).
+    """
+    def fetch(session_id):
+        return sessions.get_session(base_url, group_id, token, session_id)
+    return fetch_many(fetch, session_ids, max_workers)
+
+
+def get_user_sessions_for_users(base_url, group_id, token, user_ids, max_workers=DEFAULT_MAX_WORKERS):
+    """
+    Get the Sessions owned by each of many users, eg a whole team. Yields (user_id, response, error).
+    """
+    def fetch(user_id):
+        return sessions.get_user_sessions(base_url, group_id, token, user_id)
+    return fetch_many(fetch, user_ids, max_workers)
+
+
+def get_groups_by_ids(base_url, group_id, token, target_group_ids, max_workers=DEFAULT_MAX_WORKERS):
+    """
+    Get many Groups, which must be within the context of the main group. Yields (target_group_id, response, error).
+    """
+    def fetch(target_group_id):
+        return groups.get_group(base_url, group_id, token, target_group_id)
+    return fetch_many(fetch, target_group_ids, max_workers)
@@ -0,0 +1,216 @@
+"""
+An opt-in, in-process response cache for read-mostly API routes.
+
+App families, apps, groups and storage drivers change a few times a day, so fetching them again on every lookup is
+wasted work. Install a ResponseCache on a transport to serve repeat GETs from memory:
+
+    from athera.api.cache import ResponseCache
+    from athera.api.transport import configure_transport
+    configure_transport(cache=ResponseCache())
+
+Only routes with a TTL are cached. Entries are keyed on url, query parameters, active group and token, and the cache
+is a size-bounded LRU. 403 and 404 responses are cached for a shorter time, so repeated lookups of a bad id do not
+hit the API either. Any write to a route (create_driver, delete_driver, ...) drops the cached entries of the read
+routes it affects, for every group, because a driver created on an Org is visible to all its descendants.
+
+Responses carrying an ETag or Last-Modified header are kept after they expire, and revalidated with If-None-Match /
+If-Modified-Since. A 304 reply renews the stored body without downloading it again. ResponseCache.stats() reports
+hit, miss and revalidation counts.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from athera.api import apps, compute, groups, sessions, storage
+from athera.api.common import request_key
+
+DEFAULT_MAX_ENTRIES  = 1024
+DEFAULT_NEGATIVE_TTL = 60
+
+# Seconds each cached route's responses are served before they are fetched again
+DEFAULT_TTLS = {
+    apps.route_app_families: 3600,
+    apps.route_app:          3600,
+    groups.route_group:      600,
+    storage.route_drivers:   600,
+    storage.route_driver_id: 600,
+}
+
+# Routes whose cached responses are dropped when a non-GET request is sent to the key route
+DEFAULT_INVALIDATIONS = {
+    storage.route_driver:       (storage.route_drivers,),
+    storage.route_driver_id:    (storage.route_drivers, storage.route_driver_id),
+    compute.route_jobs:         (compute.route_jobs,),
+    compute.route_job_stop:     (compute.route_jobs, compute.route_job, compute.route_parts, compute.route_part),
+    sessions.route_sessions:    (sessions.route_user_sessions,),
+    sessions.route_session_stop: (sessions.route_user_sessions, sessions.route_session),
+}
+
+NEGATIVE_STATUS = (403, 404)
+
+
+class CacheEntry(object):
+    __slots__ = ("route", "response", "expires", "etag", "last_modified")
+
+    def __init__(self, route, response, expires):
+        self.route = route
+        self.response = response
+        self.expires = expires
+        self.etag = response.headers.get("ETag")
+        self.last_modified = response.headers.get("Last-Modified")
+
+    def conditional_headers(self):
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ResponseCache(object):
+    """
+    TTL + LRU cache of requests.Response objects.
+
+    'max_entries':       Maximum number of responses held. The least recently used entry is evicted first.
+    'ttls':              Dict of route -> seconds, replacing DEFAULT_TTLS.
+    'negative_ttl':      Seconds to cache 403/404 responses, capped at the route's own TTL. 0 disables negative caching.
+    'invalidations':     Dict of write route -> read routes to drop, replacing DEFAULT_INVALIDATIONS.
+    'revalidate':        Keep expired responses which carry an ETag or Last-Modified validator, and revalidate them
+                         with a conditional request. A 304 reply serves the stored body without downloading it again.
+    'validate_uncached': Also store validated responses of GET routes without a TTL. They are never served without
+                         a conditional request, so they are always current, but an unchanged body costs only a 304.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttls=None, negative_ttl=DEFAULT_NEGATIVE_TTL,
+                 invalidations=None, revalidate=True, validate_uncached=False, clock=time.time):
+        self.max_entries = max_entries
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.negative_ttl = negative_ttl
+        self.invalidations = dict(DEFAULT_INVALIDATIONS if invalidations is None else invalidations)
+        self.revalidate = revalidate
+        self.validate_uncached = validate_uncached
+        self.clock = clock
+
+        self.entries = OrderedDict()
+        self.route_keys = {}
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.revalidated_bytes = 0
+
+    def key(self, route, url, headers=None, params=None):
+        """
+        The cache key of a GET request, or None if its route is not cached.
+        """
+        if route not in self.ttls and not self.validate_uncached:
+            return None
+        return request_key(url, headers, params)
+
+    def lookup(self, key):
+        """
+        Look up a GET request. Returns (response, conditional_headers, stale_response):
+        * (response, None, None) if a fresh response is cached.
+        * (None, headers, stale) if an expired response can be revalidated by sending the extra headers. Pass 'stale'
+          to not_modified, which serves it on a 304 even if the entry is evicted while the request is in flight.
+        * (None, None, None) if the request has to be sent as is.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None, None, None
+            self.entries.move_to_end(key)
+            if entry.expires > self.clock():
+                self.hits += 1
+                return entry.response, None, None
+            conditional = entry.conditional_headers() if self.revalidate and entry.response.ok else None
+            if not conditional:
+                self._remove(key)
+                return None, None, None
+            return None, conditional, entry.response
+
+    def get(self, key):
+        """
+        Return the cached response for 'key' if it has not expired, otherwise None.
+        """
+        return self.lookup(key)[0]
+
+    def put(self, key, route, response):
+        """
+        Store a freshly downloaded response. Only successful responses, and 403/404 when negative caching is enabled,
+        are kept.
+        """
+        ttl = self.ttls.get(route, 0)
+        if response.status_code in NEGATIVE_STATUS:
+            ttl = min(ttl, self.negative_ttl)
+        elif not response.ok:
+            ttl = 0
+
+        with self.lock:
+            self.misses += 1
+            if key in self.entries:
+                self._remove(key)
+            entry = CacheEntry(route, response, self.clock() + ttl)
+            if ttl <= 0 and not (response.ok and self.revalidate and entry.conditional_headers()):
+                return
+            self.entries[key] = entry
+            self.route_keys.setdefault(route, set()).add(key)
+            while len(self.entries) > self.max_entries:
+                self._remove(next(iter(self.entries)))
+
+    def not_modified(self, key, response, stale):
+        """
+        Handle a 304 reply to a conditional request: renew the stored response and return it.
+
+        If the entry was evicted or invalidated while the request was in flight, 'stale', the response the
+        conditional request was made for, is returned without being stored again. The server vouched for it, but a
+        write may have dropped the entry and a later request should fetch afresh.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry.response is not stale:
+                return stale
+            self.revalidations += 1
+            self.revalidated_bytes += len(entry.response.content or b"")
+            entry.expires = self.clock() + self.ttls.get(entry.route, 0)
+            entry.etag = response.headers.get("ETag", entry.etag)
+            entry.last_modified = response.headers.get("Last-Modified", entry.last_modified)
+            return entry.response
+
+    def stats(self):
+        """
+        Counts of fresh hits, full downloads (misses) and 304 revalidations, plus the body bytes 304s saved.
+        """
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "revalidations": self.revalidations,
+                "revalidated_bytes": self.revalidated_bytes,
+            }
+
+    def invalidate(self, route):
+        """
+        Drop the cached responses of every read route affected by a write to 'route'.
+        """
+        with self.lock:
+            for read_route in self.invalidations.get(route, ()):
+                for key in list(self.route_keys.get(read_route, ())):
+                    self._remove(key)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.route_keys.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _remove(self, key):
+        entry = self.entries.pop(key)
+        keys = self.route_keys.get(entry.route)
+        if keys is not None:
+            keys.discard(key)
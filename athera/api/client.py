@@ -0,0 +1,232 @@
+"""
+An object-oriented wrapper around the athera.api route functions.
+
+The module level functions take base_url, group_id and token on every call. Client binds them once, builds its
+headers once, pre-binds its route templates, and owns its own connection pool.
+"""
+from athera.api import apps, bulk, compute, driver_index, groups, hierarchy, sessions, storage, streaming
+from athera.api.common import headers, page_params
+from athera.api.pagination import paginate
+from athera.api.transport import Transport
+
+
+class Client(object):
+    """
+    Client to query the Athera API on behalf of a single user and active group.
+
+    'base_url': The API root, eg https://api.athera.io/api/v1 (no trailing '/').
+    'token':    JSON Web Token. See athera.auth.generate_jwt.py on how to generate a JWT.
+    'group_id': The active group which defines the context of each request.
+    'transport': An athera.api.transport.Transport. If not supplied the client creates (and owns) its own pool,
+                 built from any extra keyword arguments, eg Client(base_url, token, group_id, pool_maxsize=50).
+                 close() only closes a pool the client created, never one passed in or shared by for_group.
+    """
+
+    def __init__(self, base_url, token, group_id, transport=None, **transport_kwargs):
+        self.base_url = base_url
+        self.token = token
+        self.group_id = group_id
+        self.owns_transport = transport is None
+        self.transport = transport if transport is not None else Transport(**transport_kwargs)
+
+        self.headers = headers(group_id, token)
+        self.org_headers = {"Authorization": self.headers["Authorization"]}
+
+        # Pre-bound route templates. Routes without parameters are plain strings.
+        self.url_app_families     = base_url + apps.route_app_families
+        self.url_app              = (base_url + apps.route_app).format
+        self.url_jobs             = base_url + compute.route_jobs
+        self.url_job              = (base_url + compute.route_job).format
+        self.url_job_stop         = (base_url + compute.route_job_stop).format
+        self.url_parts            = (base_url + compute.route_parts).format
+        self.url_part             = (base_url + compute.route_part).format
+        self.url_orgs             = base_url + groups.route_orgs
+        self.url_group            = (base_url + groups.route_group).format
+        self.url_group_children   = (base_url + groups.route_group_children).format
+        self.url_group_users      = (base_url + groups.route_group_users).format
+        self.url_user_sessions    = (base_url + sessions.route_user_sessions).format
+        self.url_session          = (base_url + sessions.route_session).format
+        self.url_sessions         = base_url + sessions.route_sessions
+        self.url_session_stop     = (base_url + sessions.route_session_stop).format
+        self.url_driver           = base_url + storage.route_driver
+        self.url_drivers          = base_url + storage.route_drivers
+        self.url_driver_id        = (base_url + storage.route_driver_id).format
+
+    def for_group(self, group_id):
+        """
+        Return a Client for another active group which shares this client's connection pool.
+        """
+        return Client(self.base_url, self.token, group_id, transport=self.transport)
+
+    def close(self):
+        if self.owns_transport:
+            self.transport.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # Apps
+    def get_app_families(self):
+        """ See athera.api.apps.get_app_families """
+        return self.transport.get(self.url_app_families, route=apps.route_app_families, headers=self.headers)
+
+    def get_app(self, app_id):
+        """ See athera.api.apps.get_app """
+        url = self.url_app(app_id=app_id)
+        return self.transport.get(url, route=apps.route_app, headers=self.headers)
+
+    # Compute
+    def get_jobs(self, page=None, page_size=None, stream=False):
+        """ See athera.api.compute.get_jobs """
+        return self.transport.get(self.url_jobs, route=compute.route_jobs, headers=self.headers,
+                                  params=page_params(page, page_size), stream=stream)
+
+    def iter_jobs(self, page_size=None, prefetch=True):
+        """ See athera.api.pagination.iter_jobs """
+        return paginate(self.get_jobs, "jobs", page_size, prefetch)
+
+    def stream_jobs(self, page_size=None, chunk_size=streaming.DEFAULT_CHUNK_SIZE):
+        """ See athera.api.streaming.stream_jobs """
+        return streaming.stream_pages(self.get_jobs, "jobs", page_size, chunk_size)
+
+    def get_job(self, job_id):
+        """ See athera.api.compute.get_job """
+        url = self.url_job(job_id=job_id)
+        return self.transport.get(url, route=compute.route_job, headers=self.headers)
+
+    def create_job(self, payload, idempotency_key=None):
+        """ See athera.api.compute.create_job """
+        request_headers = dict(self.headers)
+        if idempotency_key is not None:
+            request_headers[compute.idempotency_header] = idempotency_key
+        return self.transport.post(self.url_jobs, route=compute.route_jobs, headers=request_headers, json=payload,
+                                   allow_redirects=False)
+
+    def stop_job(self, job_id):
+        """ See athera.api.compute.stop_job """
+        url = self.url_job_stop(job_id=job_id)
+        return self.transport.post(url, route=compute.route_job_stop, headers=self.headers)
+
+    def get_parts(self, job_id, stream=False):
+        """ See athera.api.compute.get_parts """
+        url = self.url_parts(job_id=job_id)
+        return self.transport.get(url, route=compute.route_parts, headers=self.headers, stream=stream)
+
+    def stream_parts(self, job_id, chunk_size=streaming.DEFAULT_CHUNK_SIZE):
+        """ See athera.api.streaming.stream_parts """
+        return streaming.iter_response(self.get_parts(job_id, stream=True), "parts", chunk_size=chunk_size)
+
+    def get_part(self, job_id, part_id):
+        """ See athera.api.compute.get_part """
+        url = self.url_part(job_id=job_id, part_id=part_id)
+        return self.transport.get(url, route=compute.route_part, headers=self.headers)
+
+    # Groups
+    def get_orgs(self, page=None, page_size=None):
+        """ See athera.api.groups.get_orgs """
+        return self.transport.get(self.url_orgs, route=groups.route_orgs, headers=self.org_headers,
+                                  params=page_params(page, page_size))
+
+    def iter_orgs(self, page_size=None, prefetch=True):
+        """ See athera.api.pagination.iter_orgs """
+        return paginate(self.get_orgs, "groups", page_size, prefetch)
+
+    def get_group(self, target_group_id=None):
+        """ See athera.api.groups.get_group """
+        target = target_group_id if target_group_id else self.group_id
+        url = self.url_group(group_id=target)
+        return self.transport.get(url, route=groups.route_group, headers=self.headers)
+
+    def get_group_children(self, target_group_id=None, page=None, page_size=None):
+        """ See athera.api.groups.get_group_children """
+        target = target_group_id if target_group_id else self.group_id
+        url = self.url_group_children(group_id=target)
+        return self.transport.get(url, route=groups.route_group_children, headers=self.headers,
+                                  params=page_params(page, page_size))
+
+    def iter_group_children(self, target_group_id=None, page_size=None, prefetch=True):
+        """ See athera.api.pagination.iter_group_children """
+        def fetch(page, page_size):
+            return self.get_group_children(target_group_id, page=page, page_size=page_size)
+        return paginate(fetch, "groups", page_size, prefetch)
+
+    def get_group_users(self, target_group_id=None):
+        """ See athera.api.groups.get_group_users """
+        target = target_group_id if target_group_id else self.group_id
+        url = self.url_group_users(group_id=target)
+        return self.transport.get(url, route=groups.route_group_users, headers=self.headers)
+
+    def crawl_groups(self, max_workers=hierarchy.DEFAULT_MAX_WORKERS, page_size=None, max_depth=None):
+        """ See athera.api.hierarchy.crawl_org. The client's group is the root. """
+        response = self.get_group()
+        response.raise_for_status()
+
+        def iter_children(group_id):
+            return self.iter_group_children(group_id, page_size=page_size, prefetch=False)
+        return hierarchy.crawl(response.json(), iter_children, max_workers, max_depth)
+
+    # Sessions
+    def get_user_sessions(self, user_id):
+        """ See athera.api.sessions.get_user_sessions """
+        url = self.url_user_sessions(user_id=user_id)
+        return self.transport.get(url, route=sessions.route_user_sessions, headers=self.headers)
+
+    def get_session(self, session_id):
+        """ See athera.api.sessions.get_session """
+        url = self.url_session(session_id=session_id)
+        return self.transport.get(url, route=sessions.route_session, headers=self.headers)
+
+    def start_session(self, payload):
+        """ See athera.api.sessions.start_session """
+        return self.transport.post(self.url_sessions, route=sessions.route_sessions, headers=self.headers, json=payload)
+
+    def stop_session(self, session_id):
+        """ See athera.api.sessions.stop_session """
+        url = self.url_session_stop(session_id=session_id)
+        return self.transport.post(url, route=sessions.route_session_stop, headers=self.headers)
+
+    # Storage
+    def get_drivers(self):
+        """ See athera.api.storage.get_drivers """
+        return self.transport.get(self.url_drivers, route=storage.route_drivers, headers=self.headers)
+
+    def build_driver_index(self, tree, max_workers=bulk.DEFAULT_MAX_WORKERS):
+        """ See athera.api.driver_index.build_index """
+        def fetch_drivers(group_id):
+            return self.for_group(group_id).get_drivers()
+        return driver_index.DriverIndex.build(tree, fetch_drivers, max_workers)
+
+    def get_driver(self, driver_id):
+        """ See athera.api.storage.get_driver """
+        url = self.url_driver_id(driver_id=driver_id)
+        return self.transport.get(url, route=storage.route_driver_id, headers=self.headers)
+
+    def delete_driver(self, driver_id):
+        """ See athera.api.storage.delete_driver """
+        url = self.url_driver_id(driver_id=driver_id)
+        return self.transport.delete(url, route=storage.route_driver_id, headers=self.headers)
+
+    def create_driver(self, storage_driver_request):
+        """ See athera.api.storage.create_driver """
+        return self.transport.post(self.url_driver, route=storage.route_driver, headers=self.headers,
+                                   json=storage_driver_request)
+
+    def rescan_driver(self, driver_id, path):
+        """ See athera.api.storage.rescan_driver """
+        body = {
+            "type": "RESCAN",
+            "path": path
+        }
+        url = self.url_driver_id(driver_id=driver_id)
+        return self.transport.post(url, route=storage.route_driver_id, headers=self.headers, json=body)
+
+    def dropcache_driver(self, driver_id):
+        """ See athera.api.storage.dropcache_driver """
+        body = {
+            "type": "DROP"
+        }
+        url = self.url_driver_id(driver_id=driver_id)
+        return self.transport.post(url, route=storage.route_driver_id, headers=self.headers, json=body)
@@ -0,0 +1,64 @@
+"""
+Single-flight coalescing of identical concurrent requests.
+
+When many threads ask for the same thing at the same moment (eg 200 render workers calling groups.get_group for the
+same id at startup), only the first sends a request. The others wait for it and all receive its result, or its
+exception.
+"""
+import threading
+
+
+class Call(object):
+    __slots__ = ("event", "result", "error", "waiters")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight(object):
+    """
+    Run at most one call per key at a time, sharing its outcome with every concurrent caller of the same key.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.coalesced = 0
+
+    def do(self, key, func):
+        """
+        Call func() unless a call for 'key' is already in flight, in which case wait for and return its result.
+        """
+        with self.lock:
+            call = self.calls.get(key)
+            if call is None:
+                call = self.calls[key] = Call()
+                leader = True
+            else:
+                call.waiters += 1
+                self.coalesced += 1
+                leader = False
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.event.set()
+        return call.result
+
+    def in_flight(self):
+        with self.lock:
+            return len(self.calls)
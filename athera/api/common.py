@@ -1,7 +1,12 @@
 """
 Helpers for the Athera API
 """
-import os
+import email.utils
+import time
+
+# Query parameters understood by the paginated list endpoints (orgs, group children, jobs)
+page_param      = "page"
+page_size_param = "pageSize"
 
 def headers(group_id, token):
     """
@@ -13,14 +18,47 @@ def headers(group_id, token):
     }
 
 
+def request_key(url, headers=None, params=None):
+    """
+    Identify a GET request by what determines its response: url, query parameters, active group and token.
+    """
+    headers = headers or {}
+    params = tuple(sorted(params.items())) if params else ()
+    return (url, params, headers.get("active-group"), headers.get("Authorization"))
+
+
+def page_params(page=None, page_size=None):
+    """
+    Generate the query parameters selecting a page of a paginated list endpoint. Omitted values use the API defaults.
+    """
+    params = {}
+    if page is not None:
+        params[page_param] = page
+    if page_size is not None:
+        params[page_size_param] = page_size
+    return params
+
+
+def parse_retry_after(value, now=None):
+    """
+    Seconds to wait according to a Retry-After header, given either as seconds or as an HTTP date. None if invalid.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.mktime_tz(email.utils.parsedate_tz(value))
+    except (TypeError, ValueError, OverflowError):
+        return None
+    return max(0.0, when - (now if now is not None else time.time()))
+
+
 def api_debug(func):
-    if os.getenv("ATHERA_API_DEBUG"):
-        def wrapper(*args, **kwargs):
-            response = func(*args, **kwargs)
-            print("Request: {} {} [{}]".format(response.request.method, response.url, response.status_code))
-            print("Body: {}".format(response.request.body))
-            return response
-        return wrapper
-    else:
-        return func
-    
\ No newline at end of file
+    """
+    Retained for backwards compatibility. Requests are now logged by athera.api.metrics, which ATHERA_API_DEBUG
+    configures to log every request.
+    """
+    return func
@@ -1,5 +1,5 @@
-import requests
-from athera.api.common import headers, api_debug
+from athera.api.transport import get_transport
+from athera.api.common import headers, page_params
 
 route_jobs     = "/compute/jobs"
 route_job      = "/compute/jobs/{job_id}"
@@ -7,6 +7,12 @@ route_job_stop = "/compute/jobs/{job_id}/stop"
 route_parts    = "/compute/jobs/{job_id}/parts"
 route_part     = "/compute/jobs/{job_id}/parts/{part_id}"
 
+# Job statuses after which a job no longer changes
+final_status = ["COMPLETE", "CANCELED", "FAILED"]
+
+# Header carrying a client-generated key, so a repeated create_job can be recognised, see athera.api.submitter
+idempotency_header = "Idempotency-Key"
+
 def make_job_request(user_id, group_id, app_id, file_path, name, 
                      frame_start, frame_finish, frame_increment, region, arguments,
                      part_count=1, node_count=1):
@@ -29,17 +35,17 @@ def make_job_request(user_id, group_id, app_id, file_path, name,
         "nodeCount": node_count,
     }
 
-@api_debug
-def get_jobs(base_url, group_id, token):
+def get_jobs(base_url, group_id, token, page=None, page_size=None, stream=False):
     """
     Get all Compute Jobs for the provided Group
+    The response is paginated, see athera.api.pagination.iter_jobs to walk every page.
+    With stream=True the body is not downloaded up front, see athera.api.streaming.stream_jobs.
     Response: [403 Forbidden] Incorrect or inaccessible group_id
     """
     url = base_url + route_jobs
-    response = requests.get(url, headers=headers(group_id, token))
+    response = get_transport().get(url, route=route_jobs, headers=headers(group_id, token), params=page_params(page, page_size), stream=stream)
     return response
 
-@api_debug
 def get_job(base_url, group_id, token, job_id):
     """
     Get a single Compute Job, which must belong to the provided Group
@@ -47,21 +53,22 @@ def get_job(base_url, group_id, token, job_id):
     Response: [404 Not Found] Incorrect job_id
     """
     url = base_url + route_job.format(job_id=job_id)
-    response = requests.get(url, headers=headers(group_id, token))
+    response = get_transport().get(url, route=route_job, headers=headers(group_id, token))
     return response
 
-@api_debug
-def create_job(base_url, group_id, token, payload):
+def create_job(base_url, group_id, token, payload, idempotency_key=None):
     """
     Start a compute Job with the provided payload description
     Response: [403 Forbidden] Incorrect or inaccessible group_id
     Response: [400 Bad Request] Malformed payload
     """
     url = base_url + route_jobs
-    response = requests.post(url, headers=headers(group_id, token), json=payload, allow_redirects=False)
+    request_headers = headers(group_id, token)
+    if idempotency_key is not None:
+        request_headers[idempotency_header] = idempotency_key
+    response = get_transport().post(url, route=route_jobs, headers=request_headers, json=payload, allow_redirects=False)
     return response
 
-@api_debug
 def stop_job(base_url, group_id, token, job_id):
     """
     Stop a job in the ACTIVE/READY state
@@ -69,21 +76,20 @@ def stop_job(base_url, group_id, token, job_id):
     Response: [404 Not Found] Incorrect job_id
     """
     url = base_url + route_job_stop.format(job_id=job_id)
-    response = requests.post(url, headers=headers(group_id, token))
+    response = get_transport().post(url, route=route_job_stop, headers=headers(group_id, token))
     return response
 
-@api_debug
-def get_parts(base_url, group_id, token, job_id):
+def get_parts(base_url, group_id, token, job_id, stream=False):
     """
     Get all Compute Parts for the provided Job, which must belong to the provided Group
+    With stream=True the body is not downloaded up front, see athera.api.streaming.stream_parts.
     Response: [403 Forbidden] Incorrect or inaccessible group_id
     Response: [404 Not Found] Incorrect job_id
     """
     url = base_url + route_parts.format(job_id=job_id)
-    response = requests.get(url, headers=headers(group_id, token))
+    response = get_transport().get(url, route=route_parts, headers=headers(group_id, token), stream=stream)
     return response
 
-@api_debug
 def get_part(base_url, group_id, token, job_id, part_id):
     """
     Get a single Compute Part for the provided Job, which must belong to the provided Group
@@ -91,7 +97,7 @@ def get_part(base_url, group_id, token, job_id, part_id):
     Response: [404 Not Found] Incorrect job_id
     """
     url = base_url + route_part.format(job_id=job_id, part_id=part_id)
-    response = requests.get(url, headers=headers(group_id, token))
+    response = get_transport().get(url, route=route_part, headers=headers(group_id, token))
     return response
 
 
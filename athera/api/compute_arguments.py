@@ -4,7 +4,26 @@ These functions are helpers to generate the argument set required by Athera Comp
 They follow the pattern provided by Compute submission plugins for in-Athera Apps. Some are recognizably the app arguments, others are interpreted by a script.
 
 Placeholders are interpreted during Job creation, to enable splitting of Job frame ranges for a set of Parts.
+
+ArgumentTemplate expands them locally, to preview or validate what each Part will run before the Job is submitted:
+
+    template = ArgumentTemplate(get_nuke_arguments("Write1"))
+    for arguments in template.expand_splits("/data/Group/shot.nk", [(1001, 1060), (1061, 1120)]):
+        print(format_command(arguments))
 """
+import re
+import shlex
+
+FRAME_RANGE_START     = "FRAME_RANGE_START"
+FRAME_RANGE_FINISH    = "FRAME_RANGE_FINISH"
+FRAME_RANGE_INCREMENT = "FRAME_RANGE_INCREMENT"
+FILE_PATH             = "FILE_PATH"
+
+# Positions of the built in placeholders in the values passed to a compiled argument
+_BUILTINS = (FRAME_RANGE_START, FRAME_RANGE_FINISH, FRAME_RANGE_INCREMENT, FILE_PATH)
+
+_PLACEHOLDER = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
 def get_houdini_arguments(output):
     return [
         "{{FRAME_RANGE_START}}",
@@ -42,3 +61,87 @@ def get_nuke_arguments(write_node):
         "{{FRAME_RANGE_START}}-{{FRAME_RANGE_FINISH}}"
     ]
 
+
+class ArgumentTemplate(object):
+    """
+    An argument list with placeholders, parsed once so that expanding it for many Parts only fills in values.
+
+    'arguments': The argument list, eg from get_nuke_arguments.
+    'variables': Values of placeholders other than the built in ones, eg {"OUTPUT": "/data/Group/out"}.
+    'prefix':    Arguments put before the expanded ones, eg the app executable.
+
+    Raises ValueError for a placeholder which is neither built in nor in 'variables'.
+    """
+
+    def __init__(self, arguments, variables=None, prefix=()):
+        self.arguments = list(arguments)
+        self.variables = dict(variables or {})
+        self.prefix = list(prefix)
+        self.placeholders = set()
+        # Each argument becomes a str.format pattern over the values (start, finish, increment, file path), so
+        # expanding it is one call into C. Arguments without placeholders are kept as they are.
+        self._patterns = []
+        for argument in self.arguments:
+            names = _PLACEHOLDER.findall(argument)
+            if not names:
+                self._patterns.append((argument, False))
+                continue
+            self.placeholders.update(names)
+            self._patterns.append((self._compile(argument), True))
+        unknown = self.placeholders.difference(_BUILTINS, self.variables)
+        if unknown:
+            raise ValueError("Unknown placeholders: {}".format(", ".join(sorted(unknown))))
+
+    def _compile(self, argument):
+        pattern = []
+        position = 0
+        for match in _PLACEHOLDER.finditer(argument):
+            pattern.append(argument[position:match.start()].replace("{", "{{").replace("}", "}}"))
+            name = match.group(1)
+            if name in _BUILTINS:
+                pattern.append("{{{}}}".format(_BUILTINS.index(name)))
+            else:
+                pattern.append(str(self.variables.get(name, "")).replace("{", "{{").replace("}", "}}"))
+            position = match.end()
+        pattern.append(argument[position:].replace("{", "{{").replace("}", "}}"))
+        return "".join(pattern)
+
+    def expand(self, file_path, frame_start, frame_finish, frame_increment=1):
+        """
+        The arguments of one Part.
+        """
+        values = (frame_start, frame_finish, frame_increment, file_path)
+        result = list(self.prefix)
+        for pattern, compiled in self._patterns:
+            result.append(pattern.format(*values) if compiled else pattern)
+        return result
+
+    def expand_splits(self, file_path, splits, frame_increment=1):
+        """
+        The arguments of each Part, for (first_frame, last_frame) splits such as athera.api.partition.Plan.splits.
+        """
+        return [self.expand(file_path, start, finish, frame_increment) for start, finish in splits]
+
+    def expand_plan(self, plan, file_path):
+        """
+        The arguments of each Part of an athera.api.partition.Plan.
+        """
+        return self.expand_splits(file_path, plan.splits, plan.frame_increment)
+
+    def expand_frames(self, file_path, frame_set, count):
+        """
+        The arguments of each Part when an athera.api.frames.FrameSet is split into 'count' Parts. A chunk which is
+        not one evenly stepped range needs a Part per range, so it can expand to more than one argument list.
+        """
+        result = []
+        for chunk in frame_set.split(count):
+            for start, finish, increment in chunk.ranges():
+                result.append(self.expand(file_path, start, finish, increment))
+        return result
+
+
+def format_command(arguments):
+    """
+    An argument list as one shell-quoted line, for display.
+    """
+    return " ".join(shlex.quote(str(argument)) for argument in arguments)
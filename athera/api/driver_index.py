@@ -0,0 +1,163 @@
+"""
+An in-memory index of the storage drivers visible across a group tree.
+
+storage.get_drivers returns the drivers of the active group together with those of every ancestor, so a report over
+a whole Org receives the Org's drivers once per descendant group. DriverIndex fetches each group's drivers once,
+concurrently, works out which group owns each driver, keeps every driver a single time, and then answers "which
+drivers can group X see" from the lineage alone, without further requests:
+
+    from athera.api import driver_index, hierarchy
+    tree = hierarchy.crawl_org(base_url, token, org_id)
+    index = driver_index.build_index(base_url, token, tree)
+    for driver in index.visible_drivers(group_id):
+        print(driver['name'], driver['mounts'][0]['mountLocation'])
+"""
+from athera.api import bulk, storage
+
+_GROUP_KEYS = ("groupId", "groupID", "group_id")
+
+
+def _driver_group(driver):
+    for key in _GROUP_KEYS:
+        if driver.get(key):
+            return driver[key]
+    return None
+
+
+class DriverIndex(object):
+    """
+    Drivers indexed by owning group.
+
+    'drivers': Dict of driver_id -> driver, each stored once.
+    'owner':   Dict of driver_id -> the group which owns it.
+    'own':     Dict of group_id -> ids of the drivers the group owns, in API order.
+    'parents': Dict of group_id -> parent group id, None for the root.
+    'errors':  Dict of group_id -> the error raised fetching its drivers. Such a group owns no drivers in the index,
+               and drivers it owns may be counted as owned by its children instead.
+    """
+
+    def __init__(self):
+        self.drivers = {}
+        self.owner = {}
+        self.own = {}
+        self.parents = {}
+        self.errors = {}
+
+    def add_group(self, group_id, parent_id, drivers):
+        """
+        Index a group from its get_drivers listing, which includes inherited drivers. The parent must have been
+        added first, so groups are added root first.
+
+        A driver belongs to the group named in its own group id field when the API provides one. Otherwise it is
+        inherited if it is visible to the parent, and owned by this group if it is not.
+        """
+        self.parents[group_id] = parent_id
+        inherited = set(self.visible_ids(parent_id)) if parent_id is not None else set()
+        own = []
+        for driver in drivers:
+            driver_id = driver["id"]
+            owner = _driver_group(driver)
+            if owner is None:
+                owner = self.owner.get(driver_id) if driver_id in inherited else group_id
+            if owner == group_id:
+                own.append(driver_id)
+            self.owner.setdefault(driver_id, owner)
+            self.drivers.setdefault(driver_id, driver)
+        self.own[group_id] = own
+
+    def lineage(self, group_id):
+        """
+        The ids from 'group_id' up to the root.
+        """
+        result = []
+        while group_id is not None:
+            result.append(group_id)
+            group_id = self.parents.get(group_id)
+        return result
+
+    def visible_ids(self, group_id):
+        """
+        Ids of the drivers visible to a group: its own first, then those of each ancestor, nearest first.
+        """
+        result = []
+        for ancestor_id in self.lineage(group_id):
+            result.extend(self.own.get(ancestor_id, ()))
+        return result
+
+    def visible_drivers(self, group_id):
+        """
+        Every driver a group can see, as get_drivers would return them for that group.
+        """
+        return [self.drivers[driver_id] for driver_id in self.visible_ids(group_id)]
+
+    def own_drivers(self, group_id):
+        return [self.drivers[driver_id] for driver_id in self.own.get(group_id, ())]
+
+    def inherited_drivers(self, group_id):
+        """
+        The drivers a group sees because of its ancestors.
+        """
+        parent_id = self.parents.get(group_id)
+        return self.visible_drivers(parent_id) if parent_id is not None else []
+
+    def owner_of(self, driver_id):
+        return self.owner.get(driver_id)
+
+    def groups_seeing(self, driver_id):
+        """
+        Ids of every indexed group which can see a driver: its owner and the owner's descendants.
+        """
+        owner = self.owner.get(driver_id)
+        return [group_id for group_id in self.parents if owner in self.lineage(group_id)]
+
+    def remove_driver(self, driver_id):
+        """
+        Forget a driver, eg after delete_driver.
+        """
+        owner = self.owner.pop(driver_id, None)
+        self.drivers.pop(driver_id, None)
+        if owner in self.own:
+            self.own[owner] = [other for other in self.own[owner] if other != driver_id]
+
+    def add_driver(self, group_id, driver):
+        """
+        Record a driver owned by a group, eg after create_driver.
+        """
+        self.drivers[driver["id"]] = driver
+        self.owner[driver["id"]] = group_id
+        self.own.setdefault(group_id, []).append(driver["id"])
+
+    def __len__(self):
+        return len(self.drivers)
+
+    @classmethod
+    def build(cls, tree, fetch_drivers, max_workers=bulk.DEFAULT_MAX_WORKERS):
+        """
+        Index every group of an athera.api.hierarchy.GroupTree.
+
+        'fetch_drivers': Called as fetch_drivers(group_id), returning the group's get_drivers response.
+        """
+        listings = {}
+        index = cls()
+        for group_id, response, error in bulk.fetch_many(fetch_drivers, [node.id for node in tree], max_workers):
+            if error is not None:
+                index.errors[group_id] = error
+                continue
+            # Keep one copy of each driver as soon as it arrives, and only ids per group
+            ids = listings[group_id] = []
+            for driver in response.json().get("drivers") or []:
+                ids.append(index.drivers.setdefault(driver["id"], driver)["id"])
+        # Parents must be indexed before their children, which the tree's breadth first order guarantees
+        for node in tree:
+            drivers = [index.drivers[driver_id] for driver_id in listings.pop(node.id, ())]
+            index.add_group(node.id, node.parent_id, drivers)
+        return index
+
+
+def build_index(base_url, token, tree, max_workers=bulk.DEFAULT_MAX_WORKERS):
+    """
+    Fetch the drivers of every group in 'tree', each with itself as the active group, and index them.
+    """
+    def fetch_drivers(group_id):
+        return storage.get_drivers(base_url, group_id, token)
+    return DriverIndex.build(tree, fetch_drivers, max_workers)
@@ -0,0 +1,746 @@
+"""
+Frame sets: the frames of a job, a part or a file sequence, with set algebra.
+
+A FrameSet stores sorted, disjoint runs in three arrays of 64 bit integers: (start, end, step). A run is either
+consecutive frames (step 1) or evenly stepped single frames, such as every other frame of a shot. A sequence of
+millions of contiguous or stepped frames costs a few bytes, and every operation works on runs rather than frames:
+
+    from athera.api.frames import FrameSet
+    rendered = FrameSet.parse("1001-1100,1102-1240")
+    wanted = FrameSet.from_range(1001, 1240)
+    print(wanted - rendered)                  # 1101
+    for chunk in wanted.split(4):
+        start, finish, increment = chunk.ranges()[0]
+
+The text form is a comma separated list of frames 'N', ranges 'A-B' and stepped ranges 'A-BxS', eg
+"1-100x2,150,200-300". Negative frames are allowed, eg "-10--1".
+
+Runs are kept in one canonical form, so equal sets have equal runs: maximal ranges of consecutive frames, with the
+remaining single frames grouped left to right into stepped runs of at least three evenly spaced frames. Stepped runs
+of different steps or phases, eg "1-100x2" | "1-100x3", are combined over one period of the least common multiple of
+their steps, which is then repeated.
+"""
+import bisect
+import itertools
+import operator
+import re
+from array import array
+from math import gcd
+
+_TOKEN = re.compile(r"^\s*(-?\d+)\s*(?:-\s*(-?\d+)\s*(?:x\s*(\d+)\s*)?)?$")
+
+# Typecode of the run arrays: 64 bit signed integers
+_TYPECODE = "q"
+
+_repeat = itertools.repeat
+
+
+def _clip(start, end, step, low, high):
+    # The frames of a run within [low, high] as a (first, last, step) run, or None
+    first = start if low <= start else start + -(-(low - start) // step) * step
+    last = end if high >= end else start + (high - start) // step * step
+    if first > last:
+        return None
+    return (first, last, step if first != last else 1)
+
+
+def _atoms(pieces):
+    """
+    Merge sorted, span-disjoint (start, end, step) pieces into maximal ranges of consecutive frames (step 1) and
+    stepped runs of single frames. An end frame of a stepped run touching a neighbour joins the neighbour's range.
+    """
+    atoms = []
+    append = atoms.append
+    last = None
+    for start, end, step in pieces:
+        if start == end:
+            step = 1
+        if last is None or last[1] + 1 != start:
+            last = [start, end, step]
+            append(last)
+            continue
+        if last[2] != 1:
+            # The last frame of a stepped run touches this piece and becomes part of its range
+            joined = last[1]
+            last[1] -= last[2]
+            if last[0] == last[1]:
+                last[2] = 1
+            last = [joined, end if step == 1 else start, 1]
+            append(last)
+        elif step == 1:
+            last[1] = end
+        else:
+            last[1] = start
+        if step != 1:
+            # The first frame of a stepped piece joined the range before it
+            start += step
+            last = [start, end, step if start != end else 1]
+            append(last)
+    return atoms
+
+
+def _canonical(pieces):
+    """
+    The canonical (starts, ends, steps) arrays of sorted, span-disjoint (start, end, step) pieces.
+
+    Grouping starts afresh after a range of consecutive frames which the next piece does not touch, so the pieces are
+    cut there. The pieces around each stepped piece are grouped by _group_atoms, and the stretches between them,
+    which only hold consecutive frames, by _grouped.
+    """
+    pieces = list(pieces)
+    count = len(pieces)
+    starts = list(map(operator.itemgetter(0), pieces))
+    ends = list(map(operator.itemgetter(1), pieces))
+    steps = list(map(operator.itemgetter(2), pieces))
+    stepped = itertools.compress(range(count), map(operator.and_, map(operator.ne, steps, _repeat(1)),
+                                                   map(operator.ne, starts, ends)))
+
+    def cut(k):
+        return steps[k] == 1 and ends[k] > starts[k] and (k + 1 == count or starts[k + 1] > ends[k] + 1)
+
+    result = (array(_TYPECODE), array(_TYPECODE), array(_TYPECODE))
+    resume = 0
+    for k in stepped:
+        if k < resume:
+            continue
+        first, last = k, k
+        while first > resume and not cut(first - 1):
+            first -= 1
+        while last + 1 < count and not cut(last):
+            last += 1
+        for column, values in zip(result, _grouped(*_joined(starts[resume:first], ends[resume:first]))):
+            column.extend(values)
+        for column, values in zip(result, _group_atoms(pieces[first:last + 1])):
+            column.extend(values)
+        resume = last + 1
+    for column, values in zip(result, _grouped(*_joined(starts[resume:], ends[resume:]))):
+        column.extend(values)
+    return result
+
+
+def _joined(starts, ends):
+    # Sorted runs of consecutive frames which do not overlap, with the runs which touch joined
+    apart = list(map(operator.ne, starts[1:], map(operator.add, ends[:-1], _repeat(1))))
+    return list(itertools.compress(starts, [True] + apart)), list(itertools.compress(ends, apart + [True]))
+
+
+def _group_atoms(pieces):
+    """
+    The canonical (starts, ends, steps) arrays of sorted, span-disjoint (start, end, step) pieces, one at a time.
+
+    Ranges of consecutive frames are kept as they are. The single frames between them are grouped left to right:
+    a stepped run starts at each single frame followed by at least two more at the same spacing.
+    """
+    atoms = _atoms(pieces)
+    starts = []
+    ends = []
+    steps = []
+    count = len(atoms)
+    k = 0
+    cursor = None
+    while k < count:
+        x, a_end, a_step = atoms[k]
+        if cursor is not None:
+            x, cursor = cursor, None
+        elif a_step == 1 and a_end > x:
+            starts.append(x)
+            ends.append(a_end)
+            steps.append(1)
+            k += 1
+            continue
+
+        # x is a single frame, alone or the first of a stepped run. Find how far an even spacing reaches.
+        if a_end > x:
+            step, z = a_step, a_end
+        elif k + 1 < count:
+            n_start, n_end, n_step = atoms[k + 1]
+            step, z = (None if n_step == 1 and n_end > n_start else n_start - x), x
+        else:
+            step = None
+        kz, partial = k, None
+        while step is not None and kz + 1 < count:
+            n_start, n_end, n_step = atoms[kz + 1]
+            if n_start - z != step or (n_step == 1 and n_end > n_start):
+                break
+            if n_end == n_start or n_step == step:
+                z, kz = n_end, kz + 1
+                continue
+            # A stepped run with another spacing: only its first frame continues this one
+            z, partial = n_start, kz + 1
+            break
+
+        if step is not None and z - x >= 2 * step:
+            starts.append(x)
+            ends.append(z)
+            steps.append(step)
+            if partial is not None:
+                k, cursor = partial, z + atoms[partial][2]
+            else:
+                k = kz + 1
+            continue
+        starts.append(x)
+        ends.append(x)
+        steps.append(1)
+        if a_end > x:
+            cursor = x + a_step
+        else:
+            k += 1
+    return array(_TYPECODE, starts), array(_TYPECODE, ends), array(_TYPECODE, steps)
+
+
+def _grouped(starts, ends):
+    """
+    The canonical (starts, ends, steps) arrays of sorted runs of consecutive frames which neither overlap nor touch.
+
+    Gives the same grouping as _group_atoms, written with map and itertools so that only the frames which start a
+    stepped run are visited in a loop.
+    """
+    count = len(starts)
+    single = list(map(operator.eq, starts, ends))
+    spacing = list(map(operator.sub, starts[1:], starts[:-1]))
+    # A stepped run can start where three single frames in a row are evenly spaced
+    candidates = itertools.compress(range(count - 2), map(
+        operator.and_, map(operator.and_, single[:-2], single[1:-1]),
+        map(operator.and_, single[2:], map(operator.eq, spacing[:-1], spacing[1:]))))
+    result = (array(_TYPECODE), array(_TYPECODE), array(_TYPECODE))
+    new_starts, new_ends, new_steps = result
+    resume = 0
+    for k in candidates:
+        if k < resume:
+            continue
+        step = spacing[k]
+        z = k + 2
+        while z + 1 < count and single[z + 1] and spacing[z] == step:
+            z += 1
+        new_starts.extend(starts[resume:k])
+        new_ends.extend(ends[resume:k])
+        new_steps.extend(_repeat(1, k - resume))
+        new_starts.append(starts[k])
+        new_ends.append(starts[z])
+        new_steps.append(step)
+        resume = z + 1
+    new_starts.extend(starts[resume:])
+    new_ends.extend(ends[resume:])
+    new_steps.extend(_repeat(1, count - resume))
+    return result
+
+
+def _bounds(starts, ends, tag):
+    # Alternating run starts and ends + 1, each shifted left one bit with 'tag' in the low bit
+    bounds = [0] * (2 * len(starts))
+    bounds[0::2] = map(operator.or_, map(operator.lshift, starts, _repeat(1)), _repeat(tag))
+    bounds[1::2] = map(operator.or_, map(operator.lshift, map(operator.add, ends, _repeat(1)), _repeat(1)),
+                       _repeat(tag))
+    return bounds
+
+
+def _sweep(a, b, keep):
+    """
+    The (starts, ends) of the frames for which keep(in a, in b) is true, where 'a' and 'b' are the (starts, ends) of
+    runs of consecutive frames.
+
+    Walks the merged bounds of both, tracking which each point is inside of. It is written with sorted, map and
+    itertools, rather than a loop per run, so sets with millions of runs combine quickly.
+    """
+    table = [bool(keep(state & 1, state >> 1)) for state in range(4)]
+    merged = sorted(itertools.chain(_bounds(a[0], a[1], 0), _bounds(b[0], b[1], 1)))
+    points = list(map(operator.rshift, merged, _repeat(1)))
+    # Each bound toggles bit 1 (a) or bit 2 (b) of the state
+    toggles = map(operator.add, map(operator.and_, merged, _repeat(1)), _repeat(1))
+    inside = list(map(table.__getitem__, itertools.accumulate(toggles, operator.xor)))
+    # Where both have a bound at the same point only the state after the second counts
+    last = list(map(operator.ne, points, points[1:] + [None]))
+    points = list(itertools.compress(points, last))
+    inside = list(itertools.compress(inside, last))
+    changes = list(itertools.compress(points, map(operator.ne, inside, [False] + inside[:-1])))
+    return changes[0::2], list(map(operator.sub, changes[1::2], _repeat(1)))
+
+
+def _covers(outer, inner):
+    # Whether every frame of 'inner' is a frame of 'outer', both clipped to one interval
+    return ((inner[0] - outer[0]) % outer[2] == 0 and (inner[0] == inner[1] or inner[2] % outer[2] == 0)
+            and outer[0] <= inner[0] and inner[1] <= outer[1])
+
+
+def _both(a, b, in_a, in_b, in_both):
+    """
+    The pieces of a combination within an interval where both sets have a run.
+    """
+    if a == b:
+        return [a] if in_both else []
+    if _covers(a, b):
+        return _within(a, b, in_both, in_a)
+    if _covers(b, a):
+        return _within(b, a, in_both, in_b)
+    if in_a and in_b:
+        return _merge(a, b, in_both)
+    if not in_a and not in_b:
+        return _intersect(a, b) if in_both else []
+    # One run whole, or with the frames it shares with the other taken out
+    outer = a if in_a else b
+    if in_both:
+        return [outer]
+    common = _intersect(a, b)
+    return _within(outer, common[0], False, True) if common else [outer]
+
+
+def _merge(a, b, in_both):
+    """
+    The pieces of the union, or without 'in_both' the symmetric difference, of two runs.
+
+    Where both runs have frames the result repeats every lcm of their steps, so the frames of one period are worked
+    out and the ranges of consecutive frames among them are repeated over the rest.
+    """
+    low, high = max(a[0], b[0]), min(a[1], b[1])
+    if low > high:
+        return sorted([a, b])
+    # Before 'low' and after 'high' only one of the runs has frames
+    head = a if a[0] < b[0] else b
+    head = _clip(head[0], head[1], head[2], head[0], low - 1)
+    pieces = [head] if head is not None else []
+    pieces.extend(_periodic(a, b, low, high, in_both))
+    tail = a if a[1] > b[1] else b
+    tail = _clip(tail[0], tail[1], tail[2], high + 1, tail[1])
+    if tail is not None:
+        pieces.append(tail)
+    return pieces
+
+
+def _periodic(a, b, low, high, in_both):
+    # The frames within [low, high] of two runs which both span it, combined period by period
+    a_step, b_step = a[2], b[2]
+    period = a_step // gcd(a_step, b_step) * b_step
+    # Frames of the first period only, or of the interval if it is shorter
+    limit = min(period, high - low + 1)
+    a_offsets = set(range((a[0] - low) % a_step, limit, a_step))
+    b_offsets = set(range((b[0] - low) % b_step, limit, b_step))
+    offsets = sorted(a_offsets | b_offsets if in_both else a_offsets ^ b_offsets)
+    if not offsets:
+        return []
+    if limit == period:
+        step = period // len(offsets)
+        if period % len(offsets) == 0 and offsets == list(range(offsets[0], period, step)):
+            # Evenly spaced across periods too: a single run
+            first = low + offsets[0]
+            return [(first, first + (high - first) // step * step, step)]
+
+    # The ranges of consecutive offsets within a period, repeated from each period's start
+    ranges = []
+    for offset in offsets:
+        if ranges and ranges[-1][1] + 1 == offset:
+            ranges[-1][1] = offset
+        else:
+            ranges.append([offset, offset])
+    count = len(ranges)
+    periods = (high - low) // period + 1
+    starts = [0] * (count * periods)
+    ends = [0] * (count * periods)
+    for k, (first, last) in enumerate(ranges):
+        starts[k::count] = range(low + first, low + first + periods * period, period)
+        ends[k::count] = range(low + last, low + last + periods * period, period)
+    # The last period may run past 'high'
+    kept = bisect.bisect_right(starts, high)
+    return zip(starts[:kept], map(min, ends[:kept], _repeat(high)), _repeat(1))
+
+
+def _intersect(a, b):
+    # The frames common to two runs are evenly spaced by the least common multiple of their steps
+    a_first, a_last, a_step = a
+    b_first, b_last, b_step = b
+    divisor = gcd(a_step, b_step)
+    step = a_step // divisor * b_step
+    first = a_first + -(-(max(a_first, b_first) - a_first) // a_step) * a_step
+    for _ in range(b_step // divisor):
+        if (first - b_first) % b_step == 0:
+            break
+        first += a_step
+    else:
+        return []
+    last = min(a_last, b_last)
+    if first > last:
+        return []
+    return [(first, first + (last - first) // step * step, step)]
+
+
+def _within(outer, inner, in_both, in_outer):
+    # Every frame of 'inner' is in 'outer', and its step is a multiple of the outer step
+    if in_both and in_outer:
+        return [outer]
+    if in_both:
+        return [inner]
+    if not in_outer:
+        return []
+    outer_first, outer_last, outer_step = outer
+    first, last, step = inner
+    pieces = []
+    if first > outer_first:
+        pieces.append((outer_first, first - outer_step, outer_step))
+    if last > first:
+        if step == 2 * outer_step:
+            # One frame between each pair of inner frames: those frames are evenly stepped too
+            pieces.append((first + outer_step, last - outer_step, step))
+        elif step == 3 * outer_step and outer_step > 1:
+            # Two frames between each pair of inner frames: single frames, which are grouped without a loop
+            singles = [0] * (2 * ((last - first) // step))
+            singles[0::2] = range(first + outer_step, last, step)
+            singles[1::2] = range(first + 2 * outer_step, last, step)
+            pieces.extend(zip(singles, singles, _repeat(1)))
+        else:
+            pieces.extend((frame + outer_step, frame + step - outer_step, outer_step)
+                          for frame in range(first, last, step))
+    if last < outer_last:
+        pieces.append((last + outer_step, outer_last, outer_step))
+    return pieces
+
+
+class FrameSet(object):
+    """
+    An immutable set of integer frames.
+
+    Build one with parse, from_range, from_frames or from_runs. Sets support len, in, iteration in ascending order,
+    indexing, equality, and the operators | & - ^ for union, intersection, difference and symmetric difference.
+    """
+    __slots__ = ("_starts", "_ends", "_steps", "_offsets")
+
+    def __init__(self, starts=None, ends=None, steps=None):
+        # The arrays must already be canonical; use _from_pieces otherwise
+        self._starts = starts if starts is not None else array(_TYPECODE)
+        self._ends = ends if ends is not None else array(_TYPECODE)
+        self._steps = steps if steps is not None else array(_TYPECODE, _repeat(1, len(self._starts)))
+        self._offsets = None
+
+    @classmethod
+    def _from_pieces(cls, pieces):
+        return cls(*_canonical(pieces))
+
+    @classmethod
+    def parse(cls, text):
+        """
+        Parse "1-100x2,150,200-300". Raises ValueError on a malformed or descending range.
+        """
+        tokens = []
+        for token in text.split(","):
+            if not token.strip():
+                continue
+            match = _TOKEN.match(token)
+            if match is None:
+                raise ValueError("Invalid frame range '{}'".format(token.strip()))
+            start = int(match.group(1))
+            finish = int(match.group(2)) if match.group(2) is not None else start
+            increment = int(match.group(3)) if match.group(3) is not None else 1
+            if finish < start or increment < 1:
+                raise ValueError("Invalid frame range '{}'".format(token.strip()))
+            tokens.append((start, start + (finish - start) // increment * increment, increment))
+        tokens.sort()
+
+        # Tokens whose spans overlap are unioned, the others are taken as they are
+        pieces = []
+        i = 0
+        while i < len(tokens):
+            j = i + 1
+            end = tokens[i][1]
+            while j < len(tokens) and tokens[j][0] <= end:
+                end = max(end, tokens[j][1])
+                j += 1
+            if j == i + 1:
+                pieces.append(tokens[i])
+            else:
+                cluster = cls._from_pieces([tokens[i]])
+                for token in tokens[i + 1:j]:
+                    cluster = cluster | cls._from_pieces([token])
+                pieces.extend(cluster.ranges())
+            i = j
+        return cls._from_pieces(pieces)
+
+    @classmethod
+    def from_range(cls, start, finish, increment=1):
+        """
+        The frames of a frameRange, as given to athera.api.compute.make_job_request.
+        """
+        if increment < 1:
+            raise ValueError("increment must be at least 1")
+        if finish < start:
+            return cls()
+        return cls._from_pieces([(start, start + (finish - start) // increment * increment, increment)])
+
+    @classmethod
+    def from_frame_range(cls, frame_range):
+        """
+        The frames of a job or part's frameRange dict: {"start": ..., "finish": ..., "increment": ...}.
+        """
+        start = frame_range["start"]
+        return cls.from_range(start, frame_range.get("finish", start), frame_range.get("increment") or 1)
+
+    @classmethod
+    def from_frames(cls, frames):
+        """
+        A set of the given frames, in any order, eg the frame numbers of the files of a sequence.
+        """
+        frames = sorted(set(frames))
+        starts = []
+        ends = []
+        for frame in frames:
+            if ends and frame == ends[-1] + 1:
+                ends[-1] = frame
+            else:
+                starts.append(frame)
+                ends.append(frame)
+        return cls(*_grouped(starts, ends))
+
+    @classmethod
+    def from_runs(cls, runs):
+        """
+        A set of the frames of (first, last) runs, which may overlap and be in any order.
+        """
+        starts = []
+        ends = []
+        for start, end in sorted(runs):
+            if end < start:
+                continue
+            if ends and start <= ends[-1] + 1:
+                if end > ends[-1]:
+                    ends[-1] = end
+            else:
+                starts.append(start)
+                ends.append(end)
+        return cls(*_grouped(starts, ends))
+
+    def runs(self):
+        """
+        The (first, last) runs of consecutive frames, in order. Each frame of a stepped run is a run of its own.
+        """
+        result = []
+        for start, end, step in zip(self._starts, self._ends, self._steps):
+            if step == 1:
+                result.append((start, end))
+            else:
+                result.extend((frame, frame) for frame in range(start, end + 1, step))
+        return result
+
+    def ranges(self):
+        """
+        The set as few (start, finish, increment) ranges as possible, in order, eg to submit one job per range.
+        """
+        return list(zip(self._starts, self._ends, self._steps))
+
+    def format(self):
+        """
+        The text form, eg "1-99x2,150,200-300". parse(format()) gives back an equal set.
+        """
+        tokens = []
+        for start, finish, increment in zip(self._starts, self._ends, self._steps):
+            if start == finish:
+                tokens.append(str(start))
+            elif increment == 1:
+                tokens.append("{}-{}".format(start, finish))
+            else:
+                tokens.append("{}-{}x{}".format(start, finish, increment))
+        return ",".join(tokens)
+
+    def __str__(self):
+        return self.format()
+
+    def __repr__(self):
+        return "FrameSet('{}')".format(self.format())
+
+    @property
+    def first(self):
+        return self._starts[0] if self._starts else None
+
+    @property
+    def last(self):
+        return self._ends[-1] if self._ends else None
+
+    def _cumulative(self):
+        # Frames before each run, and in total at the end
+        if self._offsets is None:
+            offsets = array(_TYPECODE, [0])
+            total = 0
+            for start, end, step in zip(self._starts, self._ends, self._steps):
+                total += (end - start) // step + 1
+                offsets.append(total)
+            self._offsets = offsets
+        return self._offsets
+
+    def __len__(self):
+        return self._cumulative()[-1]
+
+    def __bool__(self):
+        return len(self._starts) > 0
+
+    __nonzero__ = __bool__
+
+    def __contains__(self, frame):
+        i = bisect.bisect_right(self._starts, frame) - 1
+        return i >= 0 and frame <= self._ends[i] and (frame - self._starts[i]) % self._steps[i] == 0
+
+    def __iter__(self):
+        for start, end, step in zip(self._starts, self._ends, self._steps):
+            for frame in range(start, end + 1, step):
+                yield frame
+
+    def __getitem__(self, index):
+        """
+        The index-th frame in ascending order. Negative indexes count from the end.
+        """
+        offsets = self._cumulative()
+        total = offsets[-1]
+        if index < 0:
+            index += total
+        if not 0 <= index < total:
+            raise IndexError("FrameSet index out of range")
+        i = bisect.bisect_right(offsets, index) - 1
+        return self._starts[i] + (index - offsets[i]) * self._steps[i]
+
+    def __eq__(self, other):
+        if not isinstance(other, FrameSet):
+            return NotImplemented
+        return self._starts == other._starts and self._ends == other._ends and self._steps == other._steps
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    def __hash__(self):
+        return hash((self._starts.tobytes(), self._ends.tobytes(), self._steps.tobytes()))
+
+    def _stepped(self):
+        # The indexes of the stepped runs
+        return list(itertools.compress(range(len(self._steps)), map(operator.ne, self._steps, _repeat(1))))
+
+    def _consecutive(self, stepped):
+        # The (starts, ends) of the runs of consecutive frames, with each frame of a stepped run as a run of its own
+        starts = []
+        ends = []
+        resume = 0
+        for i in stepped:
+            starts.extend(self._starts[resume:i])
+            ends.extend(self._ends[resume:i])
+            frames = range(self._starts[i], self._ends[i] + 1, self._steps[i])
+            starts.extend(frames)
+            ends.extend(frames)
+            resume = i + 1
+        starts.extend(self._starts[resume:])
+        ends.extend(self._ends[resume:])
+        return starts, ends
+
+    def _combine(self, other, keep):
+        """
+        The frames for which keep(in self, in other) is true.
+
+        When the stepped runs of both sets hold few frames, as in sets built from the frames of files on disk, the
+        stepped runs are split into single frames and the bounds of both sets are swept. Otherwise runs which overlap
+        no run of the other set are kept or dropped whole. Where runs of both sets overlap, their bounds cut the
+        frames into intervals within which each set has at most one run, and the two runs are combined as runs
+        wherever their steps allow.
+        """
+        a_stepped, b_stepped = self._stepped(), other._stepped()
+        frames = sum((self._ends[i] - self._starts[i]) // self._steps[i] for i in a_stepped)
+        frames += sum((other._ends[i] - other._starts[i]) // other._steps[i] for i in b_stepped)
+        if frames <= len(self._starts) + len(other._starts):
+            return FrameSet(*_grouped(*_sweep(self._consecutive(a_stepped), other._consecutive(b_stepped), keep)))
+
+        in_a, in_b, in_both = bool(keep(True, False)), bool(keep(False, True)), bool(keep(True, True))
+        a_starts, a_ends, a_steps = self._starts, self._ends, self._steps
+        b_starts, b_ends, b_steps = other._starts, other._ends, other._steps
+        a_count, b_count = len(a_starts), len(b_starts)
+        pieces = []
+        append = pieces.append
+        i = j = 0
+        while i < a_count and j < b_count:
+            if a_ends[i] < b_starts[j]:
+                if in_a:
+                    append((a_starts[i], a_ends[i], a_steps[i]))
+                i += 1
+                continue
+            if b_ends[j] < a_starts[i]:
+                if in_b:
+                    append((b_starts[j], b_ends[j], b_steps[j]))
+                j += 1
+                continue
+            # Gather the runs of both sets which overlap one another, directly or through other runs
+            end = max(a_ends[i], b_ends[j])
+            i_end, j_end = i + 1, j + 1
+            while True:
+                if i_end < a_count and a_starts[i_end] <= end:
+                    end = max(end, a_ends[i_end])
+                    i_end += 1
+                elif j_end < b_count and b_starts[j_end] <= end:
+                    end = max(end, b_ends[j_end])
+                    j_end += 1
+                else:
+                    break
+            cuts = sorted(set(itertools.chain(a_starts[i:i_end], map(operator.add, a_ends[i:i_end], _repeat(1)),
+                                              b_starts[j:j_end], map(operator.add, b_ends[j:j_end], _repeat(1)))))
+            for low, high in zip(cuts, cuts[1:]):
+                high -= 1
+                while i < i_end and a_ends[i] < low:
+                    i += 1
+                while j < j_end and b_ends[j] < low:
+                    j += 1
+                # Every run bound is a cut, so a run starting at or before 'low' spans the whole interval
+                a = _clip(a_starts[i], a_ends[i], a_steps[i], low, high) if i < i_end and a_starts[i] <= low else None
+                b = _clip(b_starts[j], b_ends[j], b_steps[j], low, high) if j < j_end and b_starts[j] <= low else None
+                if a is None:
+                    if b is not None and in_b:
+                        append(b)
+                elif b is None:
+                    if in_a:
+                        append(a)
+                else:
+                    pieces.extend(_both(a, b, in_a, in_b, in_both))
+            i, j = i_end, j_end
+        if in_a:
+            pieces.extend(zip(a_starts[i:], a_ends[i:], a_steps[i:]))
+        if in_b:
+            pieces.extend(zip(b_starts[j:], b_ends[j:], b_steps[j:]))
+        return FrameSet._from_pieces(pieces)
+
+    def union(self, other):
+        return self._combine(other, operator.or_)
+
+    def intersection(self, other):
+        return self._combine(other, operator.and_)
+
+    def difference(self, other):
+        return self._combine(other, operator.gt)
+
+    def symmetric_difference(self, other):
+        return self._combine(other, operator.xor)
+
+    __or__ = union
+    __and__ = intersection
+    __sub__ = difference
+    __xor__ = symmetric_difference
+
+    def issubset(self, other):
+        return not self.difference(other)
+
+    def slice(self, begin, end):
+        """
+        The frames from the begin-th up to, but excluding, the end-th, in ascending order.
+        """
+        offsets = self._cumulative()
+        begin = max(0, begin)
+        end = min(end, offsets[-1])
+        if begin >= end:
+            return FrameSet()
+        first = bisect.bisect_right(offsets, begin) - 1
+        last = bisect.bisect_right(offsets, end - 1) - 1
+        pieces = list(zip(self._starts[first:last + 1], self._ends[first:last + 1], self._steps[first:last + 1]))
+        start, finish, step = pieces[0]
+        pieces[0] = (start + (begin - offsets[first]) * step, finish, step)
+        start, finish, step = pieces[-1]
+        pieces[-1] = (start, self._starts[last] + (end - 1 - offsets[last]) * self._steps[last], step)
+        # Cutting a stepped run can leave too few frames for a run, or change how the frames around it group
+        return FrameSet._from_pieces(pieces)
+
+    def split(self, count):
+        """
+        Split into at most 'count' consecutive chunks whose sizes differ by at most one frame.
+        """
+        if count < 1:
+            raise ValueError("count must be at least 1")
+        total = len(self)
+        count = min(count, total)
+        return [self.slice(total * i // count, total * (i + 1) // count) for i in range(count)]
@@ -0,0 +1,293 @@
+"""
+A persistent snapshot of an Org's group hierarchy, kept in a local SQLite file.
+
+Tools which start many times a minute should not crawl the whole context tree on every start. A GroupStore loads
+the last snapshot from disk in a single query, hands back a GroupTree straight away, and refreshes the snapshot in a
+background thread once some of its groups are due to be listed again:
+
+    from athera.api import group_store
+    store = group_store.org_store("~/.athera/groups.db", base_url, token, org_id, max_age=300)
+    tree = store.load()
+
+A refresh is incremental. Each group's children are listed again 'max_age' after they were last listed, less a
+fixed fraction of up to 'stagger' of 'max_age' which differs from group to group. Groups crawled together therefore
+come due at different times, and each refresh lists only the slice of the tree which is due rather than the whole
+tree. Groups which are not due are taken from the snapshot, new children are crawled, vanished children are dropped
+with their subtrees, and only groups which actually changed are rewritten. A listing which fails keeps the subtree
+from the previous snapshot.
+With 'max_stale' set, load() refreshes in the foreground once any group was last listed longer ago than that, and
+lists every such group again, so callers never see data staler than the bound.
+
+The API has no change feed, so a stale group costs one children listing. Installing a ResponseCache with
+validate_uncached=True on the transport turns unchanged listings into 304 replies in long-running processes.
+"""
+import contextlib
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from athera.api import groups, hierarchy
+from athera.api.pagination import iter_group_children
+
+DEFAULT_MAX_AGE = 300
+DEFAULT_STAGGER = 0.5
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS groups ("
+    " org_id TEXT NOT NULL, id TEXT NOT NULL, parent_id TEXT, depth INTEGER NOT NULL, data TEXT NOT NULL,"
+    " children_digest TEXT, checked_at REAL, PRIMARY KEY (org_id, id))",
+    "CREATE INDEX IF NOT EXISTS groups_parent ON groups (org_id, parent_id)",
+    "CREATE TABLE IF NOT EXISTS snapshots (org_id TEXT PRIMARY KEY, refreshed_at REAL NOT NULL)",
+)
+
+
+def _digest(children):
+    return hashlib.sha1(json.dumps(children, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _spread(group_id):
+    # A fraction in [0, 1) which is stable for each group, so its re-checks keep their place in the cycle
+    return int(hashlib.sha1(str(group_id).encode("utf-8")).hexdigest()[:8], 16) / float(0x100000000)
+
+
+class _Row(object):
+    __slots__ = ("parent_id", "data", "digest", "checked_at")
+
+    def __init__(self, parent_id, data, digest, checked_at):
+        self.parent_id = parent_id
+        self.data = data
+        self.digest = digest
+        self.checked_at = checked_at
+
+
+class GroupStore(object):
+    """
+    A SQLite-backed snapshot of one Org's group tree.
+
+    'path':          The SQLite file. One file may hold the snapshots of several Orgs.
+    'org_id':        The root of the tree.
+    'fetch_root':    Called with no arguments, returning the Org as a dict.
+    'iter_children': Called as iter_children(group_id), returning an iterable of child group dicts.
+    'max_age':       Seconds after which a group's children are listed again. load() starts a background refresh
+                     as soon as any group is due.
+    'stagger':       Fraction (0 - 1) of 'max_age' over which the re-checks of groups listed at the same time are
+                     spread. 0 lists every group again at once, 'max_age' after a full crawl.
+    'max_stale':     Seconds after which a group's children must be listed again before load() returns. None never
+                     blocks once a snapshot exists.
+    'max_workers':   Children listings in flight during a refresh.
+    """
+
+    def __init__(self, path, org_id, fetch_root, iter_children, max_age=DEFAULT_MAX_AGE, stagger=DEFAULT_STAGGER,
+                 max_stale=None, max_workers=hierarchy.DEFAULT_MAX_WORKERS, clock=time.time):
+        self.path = os.path.expanduser(path)
+        self.org_id = org_id
+        self.fetch_root = fetch_root
+        self.iter_children = iter_children
+        self.max_age = max_age
+        self.stagger = stagger
+        self.max_stale = max_stale
+        self.max_workers = max_workers
+        self.clock = clock
+
+        self.tree = None
+        self.refreshed_at = None
+        self.due_at = None
+        self.checked_at = None
+        self.rows = {}
+        self.lock = threading.Lock()
+        self.refresh_lock = threading.Lock()
+        self.thread = None
+        self.error = None
+
+        with self.transaction() as connection:
+            for statement in _SCHEMA:
+                connection.execute(statement)
+
+    @contextlib.contextmanager
+    def transaction(self):
+        # SQLite connections belong to the thread which opened them, so each operation opens its own
+        connection = sqlite3.connect(self.path)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def age(self):
+        """
+        Seconds since the children of the least recently listed group were listed, or None if there is no snapshot.
+        """
+        if self.refreshed_at is None:
+            return None
+        return self.clock() - self.checked_at
+
+    def interval(self, group_id):
+        """
+        Seconds after which the children of 'group_id' are listed again.
+        """
+        return self.max_age * (1.0 - self.stagger * _spread(group_id))
+
+    def _due_at(self, rows):
+        # When the first group of 'rows' needs listing again
+        due = [row.checked_at + self.interval(group_id) if row.checked_at is not None else 0.0
+               for group_id, row in rows.items()]
+        return min(due) if due else None
+
+    def _checked_at(self, rows):
+        # When the least recently listed group of 'rows' was listed
+        checked = [row.checked_at for row in rows.values() if row.checked_at is not None]
+        return min(checked) if checked else self.refreshed_at
+
+    def load(self):
+        """
+        Return the group tree, reading it from disk on first use. Crawls the Org if there is no snapshot yet,
+        refreshes in the foreground beyond 'max_stale', and starts a background refresh once any group is due.
+        """
+        if self.tree is None:
+            self.read()
+        age = self.age()
+        if age is None:
+            return self.refresh()
+        if self.max_stale is not None and age > self.max_stale:
+            return self.refresh(self.max_stale)
+        if self.clock() >= self.due_at:
+            self.refresh_async()
+        return self.tree
+
+    def read(self):
+        """
+        Read the snapshot from disk into memory.
+        """
+        with self.transaction() as connection:
+            row = connection.execute("SELECT refreshed_at FROM snapshots WHERE org_id = ?", (self.org_id,)).fetchone()
+            records = connection.execute(
+                "SELECT id, parent_id, data, children_digest, checked_at FROM groups WHERE org_id = ? ORDER BY depth",
+                (self.org_id,)).fetchall()
+
+        tree = hierarchy.GroupTree()
+        rows = {}
+        for group_id, parent_id, data, digest, checked_at in records:
+            if parent_id is not None and parent_id not in tree:
+                continue
+            tree.add(json.loads(data), parent_id)
+            rows[group_id] = _Row(parent_id, data, digest, checked_at)
+        with self.lock:
+            self.tree = tree if rows else None
+            self.rows = rows
+            self.refreshed_at = row[0] if row and rows else None
+            self.due_at = self._due_at(rows)
+            self.checked_at = self._checked_at(rows)
+        return self.tree
+
+    def refresh(self, max_age=None):
+        """
+        Bring the snapshot up to date now, returning the new tree. Concurrent calls share one refresh.
+        With 'max_age', every group listed longer ago than that is listed again too, even if it is not due yet.
+        """
+        if not self.refresh_lock.acquire(False):
+            # Another thread is refreshing, wait for it and use its result
+            with self.refresh_lock:
+                if max_age is None or self.age() <= max_age:
+                    return self.tree
+            return self.refresh(max_age)
+        try:
+            return self._refresh(max_age)
+        finally:
+            self.refresh_lock.release()
+
+    def refresh_async(self):
+        """
+        Start a background refresh unless one is already running. Failures are kept in 'error'.
+        """
+        with self.lock:
+            if self.thread is not None and self.thread.is_alive():
+                return self.thread
+            self.thread = threading.Thread(target=self._background_refresh, name="athera-group-store")
+            self.thread.daemon = True
+            self.thread.start()
+            return self.thread
+
+    def _background_refresh(self):
+        try:
+            self.refresh()
+            self.error = None
+        except Exception as e:
+            self.error = e
+
+    def _refresh(self, max_age=None):
+        now = self.clock()
+        old_tree, old_rows = self.tree, self.rows
+        checked = {}
+
+        def iter_children(group_id):
+            row = old_rows.get(group_id)
+            node = old_tree.get(group_id) if old_tree is not None else None
+            if node is not None and row.checked_at is not None:
+                age = now - row.checked_at
+                if age < self.interval(group_id) and (max_age is None or age <= max_age):
+                    return [child.data for child in node.children]
+            try:
+                children = list(self.iter_children(group_id))
+            except Exception:
+                if node is None:
+                    raise
+                return [child.data for child in node.children]
+            checked[group_id] = _digest(children)
+            return children
+
+        tree = hierarchy.crawl(self.fetch_root(), iter_children, self.max_workers)
+
+        rows = {}
+        writes = []
+        touched = []
+        for node in tree:
+            old = old_rows.get(node.id)
+            data = json.dumps(node.data, sort_keys=True)
+            digest = checked.get(node.id, old.digest if old is not None else None)
+            checked_at = now if node.id in checked else (old.checked_at if old is not None else None)
+            row = rows[node.id] = _Row(node.parent_id, data, digest, checked_at)
+            if old is None or old.parent_id != row.parent_id or old.data != data or old.digest != digest:
+                writes.append((self.org_id, node.id, node.parent_id, node.depth, data, digest, checked_at))
+            elif old.checked_at != checked_at:
+                touched.append((checked_at, self.org_id, node.id))
+        removed = [(self.org_id, group_id) for group_id in old_rows if group_id not in rows]
+
+        with self.transaction() as connection:
+            connection.executemany("DELETE FROM groups WHERE org_id = ? AND id = ?", removed)
+            connection.executemany("INSERT OR REPLACE INTO groups VALUES (?, ?, ?, ?, ?, ?, ?)", writes)
+            connection.executemany("UPDATE groups SET checked_at = ? WHERE org_id = ? AND id = ?", touched)
+            connection.execute("INSERT OR REPLACE INTO snapshots VALUES (?, ?)", (self.org_id, now))
+
+        with self.lock:
+            self.tree = tree
+            self.rows = rows
+            self.refreshed_at = now
+            self.due_at = self._due_at(rows)
+            self.checked_at = self._checked_at(rows)
+        return tree
+
+    def wait(self, timeout=None):
+        """
+        Wait for a running background refresh to finish.
+        """
+        thread = self.thread
+        if thread is not None:
+            thread.join(timeout)
+
+
+def org_store(path, base_url, token, org_id, page_size=None, **kwargs):
+    """
+    A GroupStore crawling an Org through the API, with the Org as the active group of every request.
+    Extra keyword arguments are passed to GroupStore.
+    """
+    def fetch_root():
+        response = groups.get_group(base_url, org_id, token)
+        response.raise_for_status()
+        return response.json()
+
+    def iter_children(group_id):
+        return iter_group_children(base_url, org_id, token, group_id, page_size=page_size, prefetch=False)
+    return GroupStore(path, org_id, fetch_root, iter_children, **kwargs)
@@ -1,5 +1,5 @@
-import requests
-from athera.api.common import headers, api_debug
+from athera.api.transport import get_transport
+from athera.api.common import headers, page_params
 
 route_orgs           = "/orgs"
 route_group          = "/groups/{group_id}"
@@ -7,19 +7,18 @@ route_group_children = "/groups/{group_id}/children"
 route_group_users    = "/groups/{group_id}/users"
 
 
-@api_debug
-def get_orgs(base_url, token):
+def get_orgs(base_url, token, page=None, page_size=None):
     """
     Get all Orgs (top level groups) belonging to the authenticated user. 
     This endpoint does not require the 'active-group' header to be set.
+    The response is paginated, see athera.api.pagination.iter_orgs to walk every page.
     """
     url = base_url + route_orgs
-    response = requests.get(url, headers={ 
+    response = get_transport().get(url, route=route_orgs, headers={ 
         "Authorization" : "Bearer: {}".format(token) 
-    })
+    }, params=page_params(page, page_size))
     return response
 
-@api_debug
 def get_group(base_url, group_id, token, target_group_id=None):
     """
     Get a single Group, which must be within the context of the main group.
@@ -29,23 +28,22 @@ def get_group(base_url, group_id, token, target_group_id=None):
     # If target_group_id is supplied use that, otherwise use the base group
     target = target_group_id if target_group_id else group_id
     url = base_url + route_group.format(group_id=target)
-    response = requests.get(url, headers=headers(group_id, token))
+    response = get_transport().get(url, route=route_group, headers=headers(group_id, token))
     return response
 
-@api_debug
-def get_group_children(base_url, group_id, token, target_group_id=None):
+def get_group_children(base_url, group_id, token, target_group_id=None, page=None, page_size=None):
     """
     Get the child groups of a single Group, which must be within the context of the main group.
+    The response is paginated, see athera.api.pagination.iter_group_children to walk every page.
     Response: [403 Forbidden] Incorrect or inaccessible group_id
     Response: [404 Not Found] Incorrect target group
     """
     # If target_group_id is supplied use that, otherwise use the base group
     target = target_group_id if target_group_id else group_id
     url = base_url + route_group_children.format(group_id=target)
-    response = requests.get(url, headers=headers(group_id, token))
+    response = get_transport().get(url, route=route_group_children, headers=headers(group_id, token), params=page_params(page, page_size))
     return response
 
-@api_debug
 def get_group_users(base_url, group_id, token, target_group_id=None):
     """
     Get users who belong to a single Group, which must be within the context of the main group.
@@ -54,5 +52,5 @@ def get_group_users(base_url, group_id, token, target_group_id=None):
     """
     target = target_group_id if target_group_id else group_id
     url = base_url + route_group_users.format(group_id=target)
-    response = requests.get(url, headers=headers(group_id, token))
+    response = get_transport().get(url, route=route_group_users, headers=headers(group_id, token))
     return response
@@ -0,0 +1,230 @@
+"""
+The group hierarchy of an Org, fetched once and indexed in memory.
+
+Walking the context tree with get_group / get_group_children one call at a time, depth first, costs one round trip
+per group in sequence. crawl_org fetches the tree breadth first instead, with up to 'max_workers' children listings
+in flight, and returns a GroupTree. Every group is indexed by id with its parent, depth and children, so lineage
+questions (ancestors, descendants, leaves, common ancestors) are answered without further requests:
+
+    from athera.api import hierarchy
+    tree = hierarchy.crawl_org(base_url, token, org_id)
+    for node in tree.walk():
+        print("    " * node.depth + node.name)
+    print([group.name for group in tree.ancestors(leaf_id)])
+"""
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from athera.api import groups
+from athera.api.pagination import iter_group_children
+
+DEFAULT_MAX_WORKERS = 8
+
+
+class GroupNode(object):
+    """
+    One group in a GroupTree. 'data' is the group as returned by the API.
+    """
+    __slots__ = ("id", "data", "parent", "children", "depth")
+
+    def __init__(self, data, parent=None):
+        self.id = data["id"]
+        self.data = data
+        self.parent = parent
+        self.children = []
+        self.depth = parent.depth + 1 if parent is not None else 0
+
+    @property
+    def name(self):
+        return self.data.get("name")
+
+    @property
+    def type(self):
+        return self.data.get("type")
+
+    @property
+    def parent_id(self):
+        return self.parent.id if self.parent is not None else None
+
+    def ancestors(self):
+        """
+        The chain of parents, nearest first, ending with the root.
+        """
+        result = []
+        node = self.parent
+        while node is not None:
+            result.append(node)
+            node = node.parent
+        return result
+
+    def is_leaf(self):
+        return not self.children
+
+    def __repr__(self):
+        return "<GroupNode {} {} depth={}>".format(self.id, self.name, self.depth)
+
+
+class GroupTree(object):
+    """
+    An indexed group hierarchy: id -> GroupNode, with parent pointers and depths.
+
+    'errors': Dict of group_id -> exception for groups whose children could not be fetched. Those groups appear in
+              the tree, but their subtrees are missing.
+    """
+
+    def __init__(self):
+        self.nodes = {}
+        self.roots = []
+        self.errors = {}
+
+    def add(self, data, parent_id=None):
+        """
+        Add a group under 'parent_id', or as a root. Adding a group that is already present returns the existing node.
+        """
+        node = self.nodes.get(data["id"])
+        if node is not None:
+            return node
+        parent = self.nodes[parent_id] if parent_id is not None else None
+        node = self.nodes[data["id"]] = GroupNode(data, parent)
+        if parent is not None:
+            parent.children.append(node)
+        else:
+            self.roots.append(node)
+        return node
+
+    def get(self, group_id):
+        return self.nodes.get(group_id)
+
+    def __getitem__(self, group_id):
+        return self.nodes[group_id]
+
+    def __contains__(self, group_id):
+        return group_id in self.nodes
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __iter__(self):
+        """
+        Every node, breadth first.
+        """
+        queue = deque(self.roots)
+        while queue:
+            node = queue.popleft()
+            yield node
+            queue.extend(node.children)
+
+    def walk(self, group_id=None):
+        """
+        Yield the nodes of the tree, or of the subtree rooted at 'group_id', depth first with parents before children,
+        ready for printing an indented view.
+        """
+        stack = [self.nodes[group_id]] if group_id is not None else list(reversed(self.roots))
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed(node.children))
+
+    def ancestors(self, group_id):
+        """
+        The ancestors of a group, nearest first.
+        """
+        return self.nodes[group_id].ancestors()
+
+    def lineage(self, group_id):
+        """
+        The ids from the root down to, and including, 'group_id'.
+        """
+        node = self.nodes[group_id]
+        return [ancestor.id for ancestor in reversed(node.ancestors())] + [node.id]
+
+    def descendants(self, group_id):
+        """
+        Every group below 'group_id', breadth first.
+        """
+        queue = deque(self.nodes[group_id].children)
+        result = []
+        while queue:
+            node = queue.popleft()
+            result.append(node)
+            queue.extend(node.children)
+        return result
+
+    def leaves(self, group_id=None):
+        return [node for node in self.walk(group_id) if not node.children]
+
+    def is_ancestor(self, ancestor_id, group_id):
+        """
+        Whether 'ancestor_id' is a strict ancestor of 'group_id'.
+        """
+        ancestor = self.nodes[ancestor_id]
+        node = self.nodes[group_id]
+        if node.depth <= ancestor.depth:
+            return False
+        while node.depth > ancestor.depth:
+            node = node.parent
+        return node is ancestor
+
+    def common_ancestor(self, group_id, other_id):
+        """
+        The deepest group which is, or is an ancestor of, both groups. None if they are in different trees.
+        """
+        a, b = self.nodes[group_id], self.nodes[other_id]
+        while a.depth > b.depth:
+            a = a.parent
+        while b.depth > a.depth:
+            b = b.parent
+        while a is not b:
+            a, b = a.parent, b.parent
+        return a
+
+
+def crawl(root, iter_children, max_workers=DEFAULT_MAX_WORKERS, max_depth=None, tree=None):
+    """
+    Build a GroupTree breadth first from 'root', a group dict, with up to 'max_workers' children listings in flight.
+
+    'iter_children': Called as iter_children(group_id), returning an iterable of child group dicts.
+    'max_depth':     Stop descending below this depth (the root is depth 0). None crawls the whole tree.
+    'tree':          An existing GroupTree to add the crawled groups to.
+    """
+    tree = tree if tree is not None else GroupTree()
+    root = tree.add(root)
+
+    def children(node):
+        return list(iter_children(node.id))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = {}
+
+        def submit(node):
+            if max_depth is None or node.depth < max_depth:
+                pending[executor.submit(children, node)] = node
+
+        submit(root)
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                node = pending.pop(future)
+                try:
+                    child_groups = future.result()
+                except Exception as e:
+                    tree.errors[node.id] = e
+                    continue
+                for data in child_groups:
+                    # Never visit a group twice, even if the API reports it under two parents
+                    if data["id"] not in tree:
+                        submit(tree.add(data, node.id))
+    return tree
+
+
+def crawl_org(base_url, token, org_id, max_workers=DEFAULT_MAX_WORKERS, page_size=None, max_depth=None):
+    """
+    Fetch the whole group tree of an Org. Every request uses the Org as its active group.
+    Raises requests.HTTPError if the Org itself cannot be fetched.
+    """
+    response = groups.get_group(base_url, org_id, token)
+    response.raise_for_status()
+
+    def iter_children(group_id):
+        return iter_group_children(base_url, org_id, token, group_id, page_size=page_size, prefetch=False)
+    return crawl(response.json(), iter_children, max_workers, max_depth)
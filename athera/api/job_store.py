@@ -0,0 +1,354 @@
+"""
+A local store of jobs or parts, fed by successive listings, which reports only what changed.
+
+Dashboards which poll get_jobs every few seconds should not reprocess thousands of unchanged jobs each time.
+A RecordStore keeps the last version of every record by id. apply() compares a new listing by id and update time and
+returns just the records which were added, changed or removed. Those changes are also appended to a change feed,
+and the store keeps indexes by status, name and creation / update time:
+
+    from athera.api import job_store
+    store = job_store.RecordStore("~/.athera/jobs.db")
+    while True:
+        for change in job_store.sync_jobs(store, base_url, group_id, token):
+            print(change.kind, change.id, change.record and change.record.get("status"))
+        running = store.by_status("RUNNING")
+        time.sleep(5)
+
+Without a path the store lives in memory only. With one, it is loaded from a SQLite file on start, and each apply()
+writes only the changed rows.
+"""
+import bisect
+import contextlib
+import fnmatch
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from athera.api import compute, models
+from athera.api.pagination import iter_jobs
+
+DEFAULT_MAX_CHANGES = 10000
+
+# Change kinds
+ADDED   = "added"
+CHANGED = "changed"
+REMOVED = "removed"
+
+_TIME_FIELDS = {
+    "created_at": ("createdAt", "created_at"),
+    "updated_at": ("updatedAt", "updated_at"),
+}
+
+_EPOCH = datetime(1970, 1, 1)
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS records ("
+    " id TEXT PRIMARY KEY, scope TEXT, version TEXT NOT NULL, data TEXT NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)",
+)
+
+
+def _field(record, keys):
+    for key in keys:
+        if record.get(key) is not None:
+            return record[key]
+    return None
+
+
+def _timestamp(record, field):
+    value = _field(record, _TIME_FIELDS[field])
+    if value is None:
+        return None
+    value = models.parse_time(value)
+    return (value - _EPOCH).total_seconds() if hasattr(value, "year") else None
+
+
+def record_version(record):
+    """
+    What identifies a version of a record: its update time and status, or a digest of the whole record if it has
+    no update time.
+    """
+    updated = _field(record, _TIME_FIELDS["updated_at"])
+    if updated is not None:
+        return u"{}|{}".format(updated, record.get("status"))
+    return hashlib.sha1(json.dumps(record, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class Change(object):
+    """
+    One entry of the change feed.
+
+    'seq':      Position in the feed, increasing by one per change.
+    'record':   The new record, None when removed.
+    'previous': The record before the change, None when added.
+    """
+    __slots__ = ("seq", "kind", "id", "record", "previous", "at")
+
+    def __init__(self, seq, kind, record_id, record, previous, at):
+        self.seq = seq
+        self.kind = kind
+        self.id = record_id
+        self.record = record
+        self.previous = previous
+        self.at = at
+
+    def __repr__(self):
+        return "<Change {} {} {}>".format(self.seq, self.kind, self.id)
+
+
+class _TimeIndex(object):
+    """
+    (timestamp, id) pairs kept sorted, for range queries.
+    """
+    __slots__ = ("keys",)
+
+    def __init__(self):
+        self.keys = []
+
+    def add(self, timestamp, record_id):
+        if timestamp is not None:
+            bisect.insort(self.keys, (timestamp, record_id))
+
+    def remove(self, timestamp, record_id):
+        if timestamp is None:
+            return
+        i = bisect.bisect_left(self.keys, (timestamp, record_id))
+        if i < len(self.keys) and self.keys[i] == (timestamp, record_id):
+            del self.keys[i]
+
+    def between(self, start, end):
+        low = bisect.bisect_left(self.keys, (start,)) if start is not None else 0
+        high = bisect.bisect_left(self.keys, (end,)) if end is not None else len(self.keys)
+        return [record_id for _, record_id in self.keys[low:high]]
+
+
+class RecordStore(object):
+    """
+    The latest version of a set of records, jobs or parts, by id.
+
+    'path':        SQLite file persisting the records, None to keep them in memory only.
+    'max_changes': Changes kept in the feed. Readers further behind must re-read the whole store.
+    'listeners':   Callables called with the list of changes after each apply().
+    """
+
+    def __init__(self, path=None, max_changes=DEFAULT_MAX_CHANGES, clock=time.time):
+        self.path = os.path.expanduser(path) if path else None
+        self.clock = clock
+        self.records = {}
+        self.versions = {}
+        self.scopes = {}
+        self.feed = deque(maxlen=max_changes)
+        self.seq = 0
+        self.listeners = []
+        self.lock = threading.RLock()
+
+        self._status = {}
+        self._names = {}
+        self._times = dict((field, _TimeIndex()) for field in _TIME_FIELDS)
+        self._stamps = {}
+
+        if self.path is not None:
+            with self.transaction() as connection:
+                for statement in _SCHEMA:
+                    connection.execute(statement)
+            self.read()
+
+    @contextlib.contextmanager
+    def transaction(self):
+        # SQLite connections belong to the thread which opened them, so each operation opens its own
+        connection = sqlite3.connect(self.path)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def read(self):
+        """
+        Load the records from disk, replacing those in memory. The change feed carries on from the stored seq.
+        """
+        with self.transaction() as connection:
+            rows = connection.execute("SELECT id, scope, version, data FROM records").fetchall()
+            seq = connection.execute("SELECT value FROM meta WHERE key = 'seq'").fetchone()
+        with self.lock:
+            for record_id in list(self.records):
+                self._unindex(record_id)
+            self.records, self.versions, self.scopes = {}, {}, {}
+            for record_id, scope, version, data in rows:
+                self.records[record_id] = json.loads(data)
+                self.versions[record_id] = version
+                self.scopes[record_id] = scope
+                self._index(record_id)
+            self.seq = int(seq[0]) if seq else 0
+
+    def _index(self, record_id):
+        record = self.records[record_id]
+        self._status.setdefault(record.get("status"), set()).add(record_id)
+        self._names.setdefault(record.get("name"), set()).add(record_id)
+        stamps = self._stamps[record_id] = {}
+        for field, index in self._times.items():
+            stamps[field] = _timestamp(record, field)
+            index.add(stamps[field], record_id)
+
+    def _unindex(self, record_id):
+        record = self.records[record_id]
+        for index, key in ((self._status, record.get("status")), (self._names, record.get("name"))):
+            ids = index.get(key)
+            if ids is not None:
+                ids.discard(record_id)
+                if not ids:
+                    del index[key]
+        stamps = self._stamps.pop(record_id, {})
+        for field, index in self._times.items():
+            index.remove(stamps.get(field), record_id)
+
+    def apply(self, records, scope=None, complete=True):
+        """
+        Compare a listing with the store and record the differences. Returns the list of changes.
+
+        'scope':    What the listing covers, eg the group id for get_jobs or the job id for get_parts.
+        'complete': The listing holds every record of the scope, so stored records of the scope missing from it are
+                    removed. Pass False for a single page or a single record.
+        """
+        now = self.clock()
+        changes = []
+        seen = set()
+        with self.lock:
+            for record in records:
+                record_id = record["id"]
+                seen.add(record_id)
+                version = record_version(record)
+                # Unchanged records cost a dict lookup and a string comparison
+                if self.versions.get(record_id) == version:
+                    continue
+                previous = self.records.get(record_id)
+                if previous is not None:
+                    self._unindex(record_id)
+                self.records[record_id] = record
+                self.versions[record_id] = version
+                self.scopes[record_id] = scope
+                self._index(record_id)
+                changes.append(self._change(ADDED if previous is None else CHANGED, record_id, record, previous, now))
+
+            if complete:
+                removed = [record_id for record_id, record_scope in self.scopes.items()
+                           if record_scope == scope and record_id not in seen]
+                for record_id in removed:
+                    self._unindex(record_id)
+                    previous = self.records.pop(record_id)
+                    del self.versions[record_id]
+                    del self.scopes[record_id]
+                    changes.append(self._change(REMOVED, record_id, None, previous, now))
+
+            if changes and self.path is not None:
+                self._write(changes)
+            listeners = list(self.listeners)
+
+        if changes:
+            for listener in listeners:
+                listener(changes)
+        return changes
+
+    def _change(self, kind, record_id, record, previous, now):
+        self.seq += 1
+        change = Change(self.seq, kind, record_id, record, previous, now)
+        self.feed.append(change)
+        return change
+
+    def _write(self, changes):
+        with self.transaction() as connection:
+            for change in changes:
+                if change.kind == REMOVED:
+                    connection.execute("DELETE FROM records WHERE id = ?", (change.id,))
+                else:
+                    connection.execute("INSERT OR REPLACE INTO records (id, scope, version, data) VALUES (?, ?, ?, ?)",
+                                       (change.id, self.scopes[change.id], self.versions[change.id],
+                                        json.dumps(change.record)))
+            connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('seq', ?)", (str(self.seq),))
+
+    def changes(self, since=0):
+        """
+        Changes after seq 'since', oldest first. Returns None if some of them have already left the feed, in which
+        case the reader should start again from the whole store and the current seq.
+        """
+        with self.lock:
+            if since >= self.seq:
+                return []
+            if not self.feed or self.feed[0].seq > since + 1:
+                return None
+            return [change for change in self.feed if change.seq > since]
+
+    def subscribe(self, listener):
+        with self.lock:
+            self.listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        with self.lock:
+            self.listeners.remove(listener)
+
+    def get(self, record_id):
+        return self.records.get(record_id)
+
+    def __len__(self):
+        return len(self.records)
+
+    def __contains__(self, record_id):
+        return record_id in self.records
+
+    def by_status(self, *statuses):
+        """
+        Records in any of the given statuses.
+        """
+        with self.lock:
+            return [self.records[record_id] for status in statuses for record_id in self._status.get(status, ())]
+
+    def by_name(self, name):
+        """
+        Records with exactly this name. Use match_name for patterns.
+        """
+        with self.lock:
+            return [self.records[record_id] for record_id in self._names.get(name, ())]
+
+    def match_name(self, pattern):
+        """
+        Records whose name matches a shell-style pattern, eg "sh01*". Each distinct name is tested once.
+        """
+        with self.lock:
+            names = fnmatch.filter([name for name in self._names if name is not None], pattern)
+            return [self.records[record_id] for name in names for record_id in self._names[name]]
+
+    def between(self, start=None, end=None, field="created_at"):
+        """
+        Records whose 'field' ("created_at" or "updated_at") is within [start, end), in seconds since the epoch,
+        oldest first. Either bound may be None.
+        """
+        with self.lock:
+            return [self.records[record_id] for record_id in self._times[field].between(start, end)]
+
+    def in_scope(self, scope):
+        with self.lock:
+            return [self.records[record_id] for record_id, record_scope in self.scopes.items() if record_scope == scope]
+
+
+def sync_jobs(store, base_url, group_id, token, page_size=None):
+    """
+    List every job of a group into 'store' and return the changes. The whole listing is read before the store is
+    touched, so a failed page changes nothing.
+    """
+    jobs = list(iter_jobs(base_url, group_id, token, page_size))
+    return store.apply(jobs, scope=group_id)
+
+
+def sync_parts(store, base_url, group_id, token, job_id):
+    """
+    List the parts of a job into 'store' and return the changes. A failed listing raises requests.HTTPError and
+    changes nothing.
+    """
+    response = compute.get_parts(base_url, group_id, token, job_id)
+    response.raise_for_status()
+    return store.apply(response.json().get("parts") or [], scope=job_id)
@@ -0,0 +1,267 @@
+"""
+Start many sessions at once, eg for a class of artists logging in together, and follow them to READY.
+
+launch_sessions submits start_session requests from a small thread pool while keeping at most 'max_in_flight'
+sessions between submission and READY, so a burst of logins does not swamp the scheduler. A session ending in
+ALLOCATION_EXHAUSTED or QUEUE_FAILURE means capacity ran out, so the whole launcher pauses, with exponential backoff,
+before starting that session again. Progress is followed with one athera.api.watchers.SessionWaiter.
+
+The returned LaunchHandle aggregates the launch while it runs:
+
+    from athera.api import launcher, sessions
+    payloads = dict((user_id, sessions.make_session_request(user_id, group_id, app_id, region, 1920, 1080, 96, name))
+                    for user_id in user_ids)
+    handle = launcher.launch_sessions(base_url, group_id, token, payloads, max_in_flight=20)
+    while not handle.wait(10):
+        print(handle.counts())
+    print(handle.time_to_ready())
+"""
+import threading
+import time
+from collections import deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import requests
+
+from athera.api import sessions
+from athera.api.metrics import logger
+from athera.api.retry import RetryPolicy
+from athera.api.watchers import SessionWaiter
+
+DEFAULT_MAX_IN_FLIGHT = 10
+
+# Session statuses which mean the platform is out of capacity, so starting the session again later may succeed
+RETRY_SESSION_STATUS = ("ALLOCATION_EXHAUSTED", "QUEUE_FAILURE")
+
+# Launch statuses of sessions which have no session status yet
+LAUNCH_QUEUED = "QUEUED"
+LAUNCH_FAILED = "START_FAILED"
+
+
+def default_retry():
+    return RetryPolicy(max_attempts=3, backoff_factor=5.0, max_backoff=120.0)
+
+
+class LaunchState(object):
+    """
+    The progress of one session of a launch.
+    """
+    __slots__ = ("key", "payload", "session_id", "status", "session", "attempts", "started_at", "ready_at", "error")
+
+    def __init__(self, key, payload):
+        self.key = key
+        self.payload = payload
+        self.session_id = None
+        self.status = LAUNCH_QUEUED
+        self.session = None
+        self.attempts = 0
+        self.started_at = None
+        self.ready_at = None
+        self.error = None
+
+
+class LaunchHandle(object):
+    """
+    Aggregate status of a bulk launch. 'states' is an OrderedDict of key -> LaunchState.
+    """
+
+    def __init__(self, payloads):
+        items = payloads.items() if isinstance(payloads, dict) else enumerate(payloads)
+        self.states = OrderedDict((key, LaunchState(key, payload)) for key, payload in items)
+        self.lock = threading.Lock()
+        self.finished = threading.Event()
+        self.cancelled = threading.Event()
+
+    def counts(self):
+        """
+        Number of sessions in each status, including LAUNCH_QUEUED and LAUNCH_FAILED.
+        """
+        with self.lock:
+            result = {}
+            for state in self.states.values():
+                result[state.status] = result.get(state.status, 0) + 1
+            return result
+
+    def time_to_ready(self):
+        """
+        Seconds from the first start_session to READY for each session which became READY, by key.
+        """
+        with self.lock:
+            return dict((state.key, state.ready_at - state.started_at)
+                        for state in self.states.values() if state.ready_at is not None)
+
+    def sessions(self):
+        """
+        The last session body seen for each key, None if the session was never started.
+        """
+        with self.lock:
+            return dict((state.key, state.session) for state in self.states.values())
+
+    def ready(self):
+        return [state for state in self.states.values() if state.status in sessions.ready_status]
+
+    def failed(self):
+        return [state for state in self.states.values()
+                if state.status == LAUNCH_FAILED or state.status in sessions.failed_status]
+
+    def done(self):
+        return self.finished.is_set()
+
+    def wait(self, timeout=None):
+        """
+        Wait for every session to be READY or failed. Returns False if 'timeout' passed first.
+        """
+        return self.finished.wait(timeout)
+
+    def cancel(self):
+        """
+        Submit no further sessions. Sessions already started are not stopped.
+        """
+        self.cancelled.set()
+
+
+class SessionLauncher(object):
+    """
+    Launch many sessions in one group.
+
+    'max_in_flight': Sessions started but not yet READY or failed at any one time.
+    'retry':         An athera.api.retry.RetryPolicy. Its max_attempts bounds the starts of each session, and its
+                     backoff paces restarts after ALLOCATION_EXHAUSTED / QUEUE_FAILURE. A failed start_session is
+                     retried only when the policy allows, eg after a 429.
+    'retry_status':  Session statuses which cause a restart.
+    'waiter':        The athera.api.watchers.SessionWaiter following the sessions to READY. It is started and
+                     stopped with each launch.
+    """
+
+    def __init__(self, base_url, group_id, token, max_in_flight=DEFAULT_MAX_IN_FLIGHT, retry=None,
+                 retry_status=RETRY_SESSION_STATUS, waiter=None, clock=time.time):
+        self.base_url = base_url
+        self.group_id = group_id
+        self.token = token
+        self.max_in_flight = max_in_flight
+        self.retry = retry if retry is not None else default_retry()
+        self.retry_status = frozenset(retry_status)
+        self.waiter = waiter if waiter is not None else SessionWaiter(base_url, token)
+        self.clock = clock
+
+    def start_session(self, payload):
+        """
+        Start one session. Override to change how sessions are started.
+        """
+        return sessions.start_session(self.base_url, self.group_id, self.token, payload)
+
+    def launch(self, payloads):
+        """
+        Start a session for each payload, a list or a dict of key -> payload, in a background thread.
+        Returns a LaunchHandle keyed like 'payloads'.
+        """
+        handle = LaunchHandle(payloads)
+        thread = threading.Thread(target=self._run, args=(handle,), name="athera-session-launcher")
+        thread.daemon = True
+        thread.start()
+        return handle
+
+    def _run(self, handle):
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_in_flight) as executor, self.waiter:
+                self._launch(handle, executor)
+        except Exception:
+            logger.exception("Session launch failed")
+        finally:
+            handle.finished.set()
+
+    def _launch(self, handle, executor):
+        queue = deque(handle.states.values())
+        active = {}
+        paused_until = 0.0
+
+        while (queue or active) and not handle.cancelled.is_set():
+            now = self.clock()
+            while queue and len(active) < self.max_in_flight and now >= paused_until:
+                state = queue.popleft()
+                with handle.lock:
+                    state.attempts += 1
+                    if state.started_at is None:
+                        state.started_at = now
+                active[executor.submit(self.start_session, state.payload)] = (state, True)
+
+            if not active:
+                handle.cancelled.wait(max(0.0, paused_until - now))
+                continue
+            timeout = max(0.0, paused_until - now) if queue and now < paused_until else None
+            done, _ = wait(active, timeout, FIRST_COMPLETED)
+
+            for future in done:
+                state, starting = active.pop(future)
+                if starting:
+                    delay = self._started(handle, state, future, active)
+                else:
+                    delay = self._settled(handle, state, future)
+                if delay is not None:
+                    # Capacity ran out: every session waits, not just this one
+                    paused_until = max(paused_until, self.clock() + delay)
+                    queue.appendleft(state)
+
+    def _started(self, handle, state, future, active):
+        """
+        Follow a started session, or return the seconds to wait before starting it again.
+        """
+        error = None
+        try:
+            response = future.result()
+        except Exception as e:
+            response, error = None, e
+        if error is None and response.ok:
+            session = response.json()
+            with handle.lock:
+                state.session = session
+                state.session_id = session.get("id")
+                state.status = session.get("status") or sessions.pending_status[0]
+                state.error = None
+            active[self.waiter.add(self.group_id, state.session_id)] = (state, False)
+            return None
+
+        # The policy looks at the error only when there is no response, so a 429 is judged by its status
+        if self.retry.should_retry("POST", sessions.route_sessions, state.attempts, response=response, error=error):
+            with handle.lock:
+                state.status = LAUNCH_QUEUED
+            return self.retry.backoff(state.attempts, response)
+        if error is None:
+            error = requests.HTTPError("{} Error for url: {}".format(response.status_code, response.url),
+                                       response=response)
+        with handle.lock:
+            state.status = LAUNCH_FAILED
+            state.error = error
+        return None
+
+    def _settled(self, handle, state, future):
+        """
+        Record a session which is READY or failed, or return the seconds to wait before starting it again.
+        """
+        try:
+            session = future.result()
+        except Exception as e:
+            with handle.lock:
+                state.status = LAUNCH_FAILED
+                state.error = e
+            return None
+
+        status = session.get("status")
+        retry = status in self.retry_status and state.attempts < self.retry.max_attempts
+        with handle.lock:
+            state.session = session
+            state.status = LAUNCH_QUEUED if retry else status
+            if status in sessions.ready_status:
+                state.ready_at = self.clock()
+        if retry:
+            logger.info("Session %s ended in %s, starting it again", state.session_id, status)
+            return self.retry.backoff(state.attempts)
+        return None
+
+
+def launch_sessions(base_url, group_id, token, payloads, max_in_flight=DEFAULT_MAX_IN_FLIGHT, **kwargs):
+    """
+    Start a session for each payload (see athera.api.sessions.make_session_request), a list or a dict of
+    key -> payload, and return a LaunchHandle. Extra keyword arguments are passed to SessionLauncher.
+    """
+    return SessionLauncher(base_url, group_id, token, max_in_flight, **kwargs).launch(payloads)
@@ -0,0 +1,238 @@
+"""
+Per-route request metrics for the Athera API.
+
+Every transport records, for each (method, route), the number of requests sent, the status codes returned and a
+latency histogram from which p50/p95/p99 are estimated. Each retry counts as a request of its own. Calls answered
+without a request, from the response cache or by sharing a concurrent identical request, are counted apart. Recording
+is a dict lookup and a few additions under a lock, so it is always on. Read the numbers with Metrics.snapshot(), or
+expose Metrics.prometheus() on a /metrics endpoint:
+
+    from athera.api.transport import get_transport
+    print(get_transport().metrics.snapshot())
+
+Metrics can also log a sample of requests (method, url, status, latency, and the request and response bodies) to the
+'athera.api' logger at DEBUG. The values of secret fields, such as a storage driver's client_secret, are redacted.
+Setting ATHERA_API_DEBUG in the environment logs every request, replacing the old api_debug prints.
+"""
+import bisect
+import json
+import logging
+import os
+import random
+import sys
+import threading
+
+logger = logging.getLogger("athera.api")
+
+# Upper bounds, in seconds, of the latency histogram buckets. A final +Inf bucket is implied.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+ERROR_STATUS = "error"
+
+# Sources of calls answered without sending a request
+CACHE_HIT = "cache"
+COALESCED = "coalesced"
+
+# Logged bodies are cut to this many characters
+DEFAULT_LOG_BODY_LENGTH = 1000
+
+# Fields whose name contains one of these, in any case, are logged as REDACTED
+SECRET_FIELDS = ("secret", "password", "token", "authorization")
+REDACTED = "<redacted>"
+
+
+def redact(body):
+    """
+    A copy of a JSON body with the values of secret fields, at any depth, replaced by REDACTED.
+    """
+    if isinstance(body, dict):
+        return dict((key, REDACTED if _is_secret(key) else redact(value)) for key, value in body.items())
+    if isinstance(body, (list, tuple)):
+        return [redact(value) for value in body]
+    return body
+
+
+def _is_secret(key):
+    key = str(key).lower()
+    return any(field in key for field in SECRET_FIELDS)
+
+
+def _shorten(text, length):
+    return text if len(text) <= length else text[:length] + "..."
+
+
+def _content(response):
+    # The body of a response, redacted if it is JSON
+    content = getattr(response, "content", None)
+    if not content:
+        return None
+    try:
+        return str(redact(json.loads(content)))
+    except ValueError:
+        return content.decode("utf-8", "replace") if isinstance(content, bytes) else str(content)
+
+
+class RouteStats(object):
+    """
+    Counts and latency histogram for one (method, route).
+    """
+    __slots__ = ("count", "statuses", "served", "buckets", "total_seconds", "max_seconds")
+
+    def __init__(self, bucket_count):
+        self.count = 0
+        self.statuses = {}
+        self.served = {}
+        self.buckets = [0] * (bucket_count + 1)
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def quantile(self, q, bounds):
+        """
+        Estimate a quantile by linear interpolation within the histogram bucket containing it.
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for i, bucket_count in enumerate(self.buckets):
+            if bucket_count and cumulative + bucket_count >= rank:
+                lower = bounds[i - 1] if i > 0 else 0.0
+                upper = bounds[i] if i < len(bounds) else self.max_seconds
+                upper = min(upper, self.max_seconds)
+                return lower + (upper - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+        return self.max_seconds
+
+
+class Metrics(object):
+    """
+    Thread-safe per-route request metrics.
+
+    'buckets':         Latency histogram bucket upper bounds in seconds.
+    'log_sample_rate': Fraction of requests (0.0 - 1.0) logged to the 'athera.api' logger at DEBUG.
+    'log_body_length': Characters of the request and response bodies logged.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, log_sample_rate=0.0, log_body_length=DEFAULT_LOG_BODY_LENGTH):
+        self.bounds = tuple(buckets)
+        self.log_sample_rate = log_sample_rate
+        self.log_body_length = log_body_length
+        self.routes = {}
+        self.lock = threading.Lock()
+
+    def _stats(self, method, route):
+        # Call with the lock held
+        key = (method, route or "")
+        stats = self.routes.get(key)
+        if stats is None:
+            stats = self.routes[key] = RouteStats(len(self.bounds))
+        return stats
+
+    def observe(self, method, route, url, seconds, response=None, error=None, body=None):
+        """
+        Record one request sent, a single attempt when retrying. 'response' is None if it raised 'error' instead.
+        """
+        status = response.status_code if response is not None else ERROR_STATUS
+        index = bisect.bisect_left(self.bounds, seconds)
+        with self.lock:
+            stats = self._stats(method, route)
+            stats.count += 1
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+            stats.buckets[index] += 1
+            stats.total_seconds += seconds
+            if seconds > stats.max_seconds:
+                stats.max_seconds = seconds
+
+        if self.log_sample_rate and (self.log_sample_rate >= 1.0 or random.random() < self.log_sample_rate):
+            self._log(method, url, seconds, status, response, error, body)
+
+    def _log(self, method, url, seconds, status, response, error, body):
+        if not logger.isEnabledFor(logging.DEBUG):
+            return
+        logger.debug("Request: %s %s [%s] %.3fs", method, url, error if error is not None else status, seconds)
+        if body is not None:
+            logger.debug("Body: %s", _shorten(str(redact(body)), self.log_body_length))
+        content = _content(response) if response is not None else None
+        if content is not None:
+            logger.debug("Response: %s", _shorten(content, self.log_body_length))
+
+    def served(self, method, route, source):
+        """
+        Record a call answered without sending a request. 'source' is CACHE_HIT or COALESCED.
+        """
+        with self.lock:
+            stats = self._stats(method, route)
+            stats.served[source] = stats.served.get(source, 0) + 1
+
+    def snapshot(self):
+        """
+        Return {(method, route): {'count', 'statuses', 'served', 'mean', 'max', 'p50', 'p95', 'p99'}} with latencies
+        in seconds. 'count' is the number of requests sent and 'served' the calls answered without one, by source.
+        """
+        with self.lock:
+            result = {}
+            for key, stats in self.routes.items():
+                result[key] = {
+                    "count": stats.count,
+                    "statuses": dict(stats.statuses),
+                    "served": dict(stats.served),
+                    "mean": stats.total_seconds / stats.count if stats.count else None,
+                    "max": stats.max_seconds,
+                    "p50": stats.quantile(0.50, self.bounds),
+                    "p95": stats.quantile(0.95, self.bounds),
+                    "p99": stats.quantile(0.99, self.bounds),
+                }
+            return result
+
+    def prometheus(self, prefix="athera_api"):
+        """
+        Render the metrics in the Prometheus text exposition format.
+        """
+        lines = [
+            "# HELP {}_requests_total Requests sent to the Athera API.".format(prefix),
+            "# TYPE {}_requests_total counter".format(prefix),
+        ]
+        with self.lock:
+            routes = sorted(self.routes.items())
+            for (method, route), stats in routes:
+                for status, count in sorted(stats.statuses.items(), key=lambda item: str(item[0])):
+                    lines.append('{}_requests_total{{method="{}",route="{}",status="{}"}} {}'.format(
+                        prefix, method, route, status, count))
+
+            lines.append("# HELP {}_served_total Calls answered without a request to the Athera API.".format(prefix))
+            lines.append("# TYPE {}_served_total counter".format(prefix))
+            for (method, route), stats in routes:
+                for source, count in sorted(stats.served.items()):
+                    lines.append('{}_served_total{{method="{}",route="{}",source="{}"}} {}'.format(
+                        prefix, method, route, source, count))
+
+            lines.append("# HELP {}_request_duration_seconds Athera API request latency.".format(prefix))
+            lines.append("# TYPE {}_request_duration_seconds histogram".format(prefix))
+            for (method, route), stats in routes:
+                if not stats.count:
+                    continue
+                labels = 'method="{}",route="{}"'.format(method, route)
+                cumulative = 0
+                for bound, count in zip(self.bounds + ("+Inf",), stats.buckets):
+                    cumulative += count
+                    lines.append('{}_request_duration_seconds_bucket{{{},le="{}"}} {}'.format(
+                        prefix, labels, bound, cumulative))
+                lines.append("{}_request_duration_seconds_sum{{{}}} {}".format(prefix, labels, stats.total_seconds))
+                lines.append("{}_request_duration_seconds_count{{{}}} {}".format(prefix, labels, stats.count))
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self.lock:
+            self.routes.clear()
+
+
+def default_log_sample_rate():
+    """
+    ATHERA_API_DEBUG logs every request to stdout, as api_debug used to.
+    """
+    if not os.getenv("ATHERA_API_DEBUG"):
+        return 0.0
+    if not logger.handlers:
+        logger.addHandler(logging.StreamHandler(sys.stdout))
+        logger.setLevel(logging.DEBUG)
+    return 1.0
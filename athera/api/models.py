@@ -0,0 +1,261 @@
+"""
+Optional typed models for API responses.
+
+The route functions return requests.Response objects, and response.json() gives nested dicts. That is convenient, but
+a dict per job or part is expensive when monitoring code keeps thousands of them. The models here keep only their
+known fields, in __slots__ storage, and decode values (timestamps, nested mounts and apps) the first time they are
+accessed:
+
+    from athera.api import compute, models
+    jobs = models.from_response(compute.get_jobs(base_url, group_id, token), models.Job, "jobs")
+    running = [job for job in jobs if job.status == "ACTIVE"]
+
+Unknown fields are kept in a small side dict unless keep_extra=False, and any value can still be read by its JSON key
+with model.get(key).
+"""
+import itertools
+import re
+from datetime import datetime, timedelta
+
+_EPOCH = datetime(1970, 1, 1)
+_TIME_PATTERN = re.compile(
+    r"^(\d{4})-(\d{2})-(\d{2})[T ](\d{2}):(\d{2}):(\d{2})(?:\.(\d+))?(Z|[+-]\d{2}:?\d{2})?$")
+
+
+def parse_time(value):
+    """
+    Decode an RFC 3339 timestamp, or seconds since the epoch, to a naive UTC datetime. Unparseable values are
+    returned unchanged.
+    """
+    if isinstance(value, (int, float)):
+        return _EPOCH + timedelta(seconds=value)
+    match = _TIME_PATTERN.match(value)
+    if not match:
+        return value
+    year, month, day, hour, minute, second, fraction, zone = match.groups()
+    microsecond = int((fraction or "0")[:6].ljust(6, "0"))
+    result = datetime(int(year), int(month), int(day), int(hour), int(minute), int(second), microsecond)
+    if zone and zone != "Z":
+        sign = -1 if zone[0] == "-" else 1
+        zone = zone[1:].replace(":", "")
+        result -= sign * timedelta(hours=int(zone[:2]), minutes=int(zone[2:]))
+    return result
+
+
+_counter = itertools.count()
+
+
+class Field(object):
+    """
+    A model attribute read from the first present of one or more JSON keys, and optionally decoded on first access.
+    Its value lives in a private slot of the same name prefixed with '_'.
+    """
+    __slots__ = ("keys", "decode", "index", "order", "slot")
+
+    def __init__(self, *keys, **kwargs):
+        self.keys = keys
+        self.decode = kwargs.get("decode")
+        self.index = None
+        self.order = next(_counter)
+        self.slot = None
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        value = self.slot.__get__(obj, objtype)
+        if self.decode is not None and value is not None and not obj._decoded >> self.index & 1:
+            value = self.decode(value)
+            self.slot.__set__(obj, value)
+            obj._decoded |= 1 << self.index
+        return value
+
+
+class ModelMeta(type):
+    """
+    Gives every Field of a Model its own slot, so instances carry no __dict__ and no per-instance container.
+    """
+    def __new__(mcs, name, bases, namespace):
+        fields = sorted(((key, value) for key, value in namespace.items() if isinstance(value, Field)),
+                        key=lambda item: item[1].order)
+        namespace["__slots__"] = tuple(namespace.get("__slots__", ())) + tuple("_" + key for key, _ in fields)
+        cls = super(ModelMeta, mcs).__new__(mcs, name, bases, namespace)
+        if fields:
+            cls._names = tuple(key for key, _ in fields)
+            cls._fields = tuple(field for _, field in fields)
+            cls._keys = frozenset(key for field in cls._fields for key in field.keys)
+            for index, (key, field) in enumerate(fields):
+                field.index = index
+                field.slot = namespace.get("_" + key) or cls.__dict__["_" + key]
+        return cls
+
+
+_ModelBase = ModelMeta("_ModelBase", (object,), {"__slots__": ()})
+
+
+class Model(_ModelBase):
+    """
+    Base of the typed models. Subclasses declare Fields as class attributes.
+    """
+    __slots__ = ("_decoded", "_extra")
+    _names = ()
+    _fields = ()
+    _keys = frozenset()
+
+    def __init__(self, data, keep_extra=True):
+        for field in self._fields:
+            value = None
+            for key in field.keys:
+                if key in data:
+                    value = data[key]
+                    break
+            field.slot.__set__(self, value)
+        self._decoded = 0
+        self._extra = None
+        if keep_extra:
+            keys = self._keys
+            extra = dict((k, v) for k, v in data.items() if k not in keys)
+            self._extra = extra or None
+
+    @classmethod
+    def from_list(cls, items, keep_extra=True):
+        return [cls(item, keep_extra) for item in items]
+
+    def get(self, key, default=None):
+        """
+        Read a value by its JSON key, whether it is a declared field or an extra one.
+        """
+        for name, field in zip(self._names, self._fields):
+            if key in field.keys:
+                value = getattr(self, name)
+                return default if value is None else value
+        if self._extra is not None:
+            return self._extra.get(key, default)
+        return default
+
+    def to_dict(self):
+        """
+        The model's attributes, decoded, as a dict keyed by attribute name.
+        """
+        return dict((name, getattr(self, name)) for name in self._names)
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.id is not None and self.id == other.id
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((type(self), self.id))
+
+    def __repr__(self):
+        return "<{} {} {}>".format(type(self).__name__, self.id, getattr(self, "name", None))
+
+
+class Mount(Model):
+    id             = Field("id")
+    name           = Field("name")
+    mount_location = Field("mountLocation")
+    group_id       = Field("groupID")
+
+
+def _mounts(items):
+    return Mount.from_list(items)
+
+
+class Driver(Model):
+    id         = Field("id")
+    name       = Field("name")
+    type       = Field("type")
+    group_id   = Field("groupID")
+    mounts     = Field("mounts", decode=_mounts)
+    created_at = Field("createdAt", decode=parse_time)
+
+
+class Group(Model):
+    id         = Field("id")
+    name       = Field("name")
+    type       = Field("type")
+    parent_id  = Field("parentID")
+    created_at = Field("createdAt", decode=parse_time)
+
+
+class App(Model):
+    id      = Field("id")
+    name    = Field("name")
+    type    = Field("type")
+    version = Field("version")
+
+
+def _apps(apps):
+    # {"interactive": {version: app_id}, "compute": {version: app_id}}, see examples/search_for_app.py
+    return dict((app_type, dict(versions)) for app_type, versions in apps.items())
+
+
+class AppFamily(Model):
+    """
+    'apps' maps each app type, 'interactive' or 'compute', to {version: app_id}.
+    """
+    id   = Field("id")
+    name = Field("name")
+    apps = Field("apps", decode=_apps)
+
+
+class Job(Model):
+    id          = Field("id")
+    name        = Field("name")
+    status      = Field("status")
+    user_id     = Field("userID")
+    group_id    = Field("groupID")
+    app_id      = Field("appID")
+    file_path   = Field("filePath")
+    region      = Field("region")
+    frame_range = Field("frameRange")
+    part_count  = Field("partCount")
+    created_at  = Field("createdAt", decode=parse_time)
+    updated_at  = Field("updatedAt", decode=parse_time)
+
+
+class Part(Model):
+    id          = Field("id")
+    job_id      = Field("jobID")
+    status      = Field("status")
+    frame_range = Field("frameRange")
+    created_at  = Field("createdAt", decode=parse_time)
+    updated_at  = Field("updatedAt", decode=parse_time)
+    started_at  = Field("startedAt", decode=parse_time)
+    finished_at = Field("finishedAt", decode=parse_time)
+
+    @property
+    def frame_start(self):
+        return (self.frame_range or {}).get("start")
+
+    @property
+    def frame_finish(self):
+        return (self.frame_range or {}).get("finish")
+
+    @property
+    def frame_increment(self):
+        return (self.frame_range or {}).get("increment")
+
+
+class Session(Model):
+    id         = Field("id")
+    name       = Field("name")
+    status     = Field("status")
+    user_id    = Field("userID")
+    group_id   = Field("groupID")
+    app_id     = Field("appID")
+    region     = Field("region")
+    created_at = Field("createdAt", decode=parse_time)
+    updated_at = Field("updatedAt", decode=parse_time)
+
+
+def from_response(response, model_class, key=None, keep_extra=True):
+    """
+    Build models from a response body. With 'key' the body holds a list under that key (eg 'jobs') and a list of
+    models is returned, otherwise the body is a single object.
+    """
+    data = response.json()
+    if key is None:
+        return model_class(data, keep_extra)
+    return model_class.from_list(data.get(key) or [], keep_extra)
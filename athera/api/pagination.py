@@ -0,0 +1,123 @@
+"""
+Iterators which walk every page of the paginated list endpoints.
+
+get_orgs, get_group_children and get_jobs return one page of results next to a 'pagination' object. The iterators
+here follow that object page by page and yield the individual items. While the caller works through page N, page N+1
+is already being fetched in the background, and at most two pages are held in memory at once.
+
+Failed requests raise requests.HTTPError.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from athera.api import compute, groups
+
+
+def _integer(value):
+    # Page numbers and counts are integers. Anything else, eg a URL or null, is not a page.
+    if isinstance(value, bool) or not isinstance(value, int):
+        return None
+    return value
+
+
+def next_page(pagination, page):
+    """
+    Work out the page after 'page' from a 'pagination' object, or None if 'page' was the last.
+
+    The 'pagination' object of a list response is expected to hold integer page numbers and counts, in the camelCase
+    of the 'page' and 'pageSize' query parameters:
+
+        {"page": 2, "pageSize": 50, "totalPages": 4, "total": 180}
+
+    An integer 'nextPage' is taken as it is. Otherwise the page after 'page' follows from 'totalPages', or from 'total'
+    and 'pageSize'. Values which are not integers are ignored, so a walk ends rather than sending one back as a page.
+    """
+    if not pagination:
+        return None
+
+    if "nextPage" in pagination:
+        return _integer(pagination["nextPage"]) or None
+
+    page = _integer(pagination.get("page", page))
+    total_pages = _integer(pagination.get("totalPages"))
+    if total_pages is None:
+        total = _integer(pagination.get("total"))
+        page_size = _integer(pagination.get("pageSize"))
+        if total is None or not page_size:
+            return None
+        total_pages = -(-total // page_size)
+
+    if page is not None and page < total_pages:
+        return page + 1
+    return None
+
+
+def paginate(fetch, key, page_size=None, prefetch=True, first_page=None):
+    """
+    Yield every item found under 'key' across all pages.
+
+    'fetch':    Called as fetch(page=..., page_size=...) and returning a requests.Response for that page.
+    'key':      The name of the list in the response body, eg 'groups' or 'jobs'.
+    'prefetch': Fetch the next page in a background thread while the current one is being consumed.
+    """
+    executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+    pending = None
+    page = first_page
+    try:
+        response = fetch(page=page, page_size=page_size)
+        while response is not None:
+            response.raise_for_status()
+            data = response.json()
+            items = data.get(key) or []
+
+            following = next_page(data.get("pagination"), page if page is not None else 1)
+            # An empty page ends the walk even if the pagination object disagrees, so we never spin forever.
+            if following is not None and items:
+                if executor:
+                    pending = executor.submit(fetch, page=following, page_size=page_size)
+                else:
+                    pending = following
+            else:
+                pending = None
+
+            for item in items:
+                yield item
+
+            page = following
+            if pending is None:
+                response = None
+            elif executor:
+                response, pending = pending.result(), None
+            else:
+                response, pending = fetch(page=pending, page_size=page_size), None
+    finally:
+        if executor:
+            if pending is not None:
+                pending.cancel()
+            executor.shutdown(wait=False)
+
+
+def iter_orgs(base_url, token, page_size=None, prefetch=True):
+    """
+    Yield every Org (top level group) belonging to the authenticated user.
+    """
+    def fetch(page, page_size):
+        return groups.get_orgs(base_url, token, page=page, page_size=page_size)
+    return paginate(fetch, "groups", page_size, prefetch)
+
+
+def iter_group_children(base_url, group_id, token, target_group_id=None, page_size=None, prefetch=True):
+    """
+    Yield every child group of a single Group, which must be within the context of the main group.
+    """
+    def fetch(page, page_size):
+        return groups.get_group_children(base_url, group_id, token, target_group_id, page=page, page_size=page_size)
+    return paginate(fetch, "groups", page_size, prefetch)
+
+
+def iter_jobs(base_url, group_id, token, page_size=None, prefetch=True):
+    """
+    Yield every Compute Job for the provided Group.
+    """
+    def fetch(page, page_size):
+        return compute.get_jobs(base_url, group_id, token, page=page, page_size=page_size)
+    return paginate(fetch, "jobs", page_size, prefetch)
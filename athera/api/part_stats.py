@@ -0,0 +1,305 @@
+"""
+Progress and timing of compute jobs, computed over their parts held in columns.
+
+A PartTable keeps one array per field (job, status, start and finish times, frame count) instead of a dict per part,
+and answers dashboard questions over one job or many with passes over those arrays:
+
+    from athera.api import part_stats
+    table = part_stats.load_parts(base_url, group_id, token, job_ids)
+    print(table.completion(job_id), table.throughput(job_id), table.eta(job_id))
+    print(table.percentiles([50, 90, 99]))
+
+Times are seconds since the epoch. A part without a start time holds NaN there, as does the finish time of a part
+which is not complete.
+"""
+import itertools
+import math
+import operator
+import time
+from array import array
+from datetime import datetime
+
+from athera.api import bulk, models
+
+# Part statuses counting as rendered frames
+COMPLETE_STATUS = ("COMPLETE",)
+
+_NAN = float("nan")
+_EPOCH = datetime(1970, 1, 1)
+_repeat = itertools.repeat
+
+# datetime.fromisoformat accepts the API's timestamps, including a trailing Z, from Python 3.11
+try:
+    datetime.fromisoformat("2020-01-01T00:00:00Z")
+    _fromisoformat = datetime.fromisoformat
+except (AttributeError, ValueError):
+    _fromisoformat = None
+
+
+def _seconds(value):
+    """
+    Seconds since the epoch of a timestamp, a datetime or a number, NaN if missing or unparseable.
+    """
+    if value is None:
+        return _NAN
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not isinstance(value, datetime):
+        parsed = None
+        if _fromisoformat is not None:
+            try:
+                parsed = _fromisoformat(value)
+            except (TypeError, ValueError):
+                pass
+        value = parsed if parsed is not None else models.parse_time(value)
+        if not isinstance(value, datetime):
+            return _NAN
+    if value.tzinfo is not None:
+        return value.timestamp()
+    return (value - _EPOCH).total_seconds()
+
+
+def _frame_count(frame_range):
+    if not frame_range or frame_range.get("start") is None:
+        return 0
+    start = frame_range["start"]
+    finish = frame_range.get("finish")
+    return len(range(start, (finish if finish is not None else start) + 1, frame_range.get("increment") or 1))
+
+
+def percentile(ordered, q):
+    """
+    The q-th percentile (0-100) of an ascending sequence, interpolating linearly between values. None if empty.
+    """
+    if not ordered:
+        return None
+    rank = (len(ordered) - 1) * q / 100.0
+    low = int(math.floor(rank))
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+class PartTable(object):
+    """
+    Parts of any number of jobs, in columns.
+
+    'job_ids':  Job ids, indexed by the 'job' column.
+    'statuses': Status strings, indexed by the 'status' column.
+    'errors':   Dict of job_id -> the error raised fetching its parts, see load_parts.
+    """
+
+    def __init__(self):
+        self.job_ids = []
+        self.statuses = []
+        self.errors = {}
+        self._job_codes = {}
+        self._status_codes = {}
+        self.job = array("l")
+        self.status = array("b")
+        self.started = array("d")
+        self.finished = array("d")
+        self.frames = array("l")
+
+    def __len__(self):
+        return len(self.job)
+
+    def _code(self, codes, values, value):
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(values)
+            values.append(value)
+        return code
+
+    def add_parts(self, job_id, parts):
+        """
+        Append the parts of a job: dicts as returned by get_parts, or athera.api.models.Part. Adding the same job
+        again replaces its parts.
+
+        Dicts are read directly, without building models. Only the times used later are parsed: the start of
+        every part, and the finish of complete parts.
+        """
+        if job_id in self._job_codes:
+            self.remove_job(job_id)
+        job = self._code(self._job_codes, self.job_ids, job_id)
+        complete = frozenset(COMPLETE_STATUS)
+        status_codes, statuses = self._status_codes, self.statuses
+        append_status, append_started = self.status.append, self.started.append
+        append_finished, append_frames = self.finished.append, self.frames.append
+        # Parts of a job often share timestamps, to the second, so each distinct one is parsed once
+        seen = {}
+
+        def seconds(value):
+            if not isinstance(value, str):
+                return _seconds(value)
+            result = seen.get(value)
+            if result is None:
+                result = seen[value] = _seconds(value)
+            return result
+
+        count = 0
+        for part in parts:
+            if isinstance(part, dict):
+                status, started, frame_range = part.get("status"), part.get("startedAt"), part.get("frameRange")
+                finished = part.get("finishedAt") if status in complete else None
+            else:
+                status, started, frame_range = part.status, part.started_at, part.frame_range
+                finished = part.finished_at if status in complete else None
+            code = status_codes.get(status)
+            if code is None:
+                code = self._code(status_codes, statuses, status)
+            append_status(code)
+            append_started(seconds(started))
+            append_finished(seconds(finished))
+            append_frames(_frame_count(frame_range))
+            count += 1
+        self.job.extend(_repeat(job, count))
+        return self
+
+    def remove_job(self, job_id):
+        job = self._job_codes.get(job_id)
+        if job is None:
+            return
+        keep = list(map(operator.ne, self.job, _repeat(job)))
+        for name in ("job", "status", "started", "finished", "frames"):
+            column = getattr(self, name)
+            setattr(self, name, array(column.typecode, itertools.compress(column, keep)))
+
+    @classmethod
+    def from_parts(cls, job_id, parts):
+        return cls().add_parts(job_id, parts)
+
+    def _mask(self, job_id):
+        # Which rows belong to 'job_id', or None for every row
+        if job_id is None:
+            return None
+        job = self._job_codes.get(job_id)
+        if job is None:
+            return []
+        return list(map(operator.eq, self.job, _repeat(job)))
+
+    def _rows(self, column, mask):
+        return column if mask is None else itertools.compress(column, mask)
+
+    def _select(self, job_id):
+        """
+        The row mask of 'job_id' (None for every row) and the mask of its complete rows, computed once per query.
+        """
+        mask = self._mask(job_id)
+        codes = frozenset(self._status_codes[status] for status in COMPLETE_STATUS if status in self._status_codes)
+        complete = list(map(codes.__contains__, self.status))
+        if mask is not None:
+            complete = list(map(operator.and_, complete, mask))
+        return mask, complete
+
+    def _totals(self, mask, complete):
+        return sum(itertools.compress(self.frames, complete)), sum(self._rows(self.frames, mask))
+
+    def _durations(self, complete):
+        durations = map(operator.sub, itertools.compress(self.finished, complete),
+                        itertools.compress(self.started, complete))
+        # NaN never equals itself, which drops parts missing a time
+        return sorted(duration for duration in durations if duration == duration)
+
+    def _throughput(self, mask, complete, done):
+        finished = [value for value in itertools.compress(self.finished, complete) if value == value]
+        started = [value for value in self._rows(self.started, mask) if value == value]
+        if not finished or not started:
+            return None
+        elapsed = max(finished) - min(started)
+        return done / elapsed if elapsed > 0 else None
+
+    def _eta(self, done, total, rate):
+        if total and done >= total:
+            return 0.0
+        return (total - done) / rate if rate else None
+
+    def counts(self, job_id=None):
+        """
+        Number of parts in each status.
+        """
+        result = {}
+        for code in self._rows(self.status, self._mask(job_id)):
+            status = self.statuses[code]
+            result[status] = result.get(status, 0) + 1
+        return result
+
+    def frame_totals(self, job_id=None):
+        """
+        (frames rendered, frames in total).
+        """
+        return self._totals(*self._select(job_id))
+
+    def completion(self, job_id=None):
+        """
+        Percentage of frames rendered, None if there are no frames.
+        """
+        done, total = self.frame_totals(job_id)
+        return 100.0 * done / total if total else None
+
+    def durations(self, job_id=None):
+        """
+        Seconds taken by each complete part with both times, in ascending order.
+        """
+        return self._durations(self._select(job_id)[1])
+
+    def percentiles(self, qs=(50, 90, 99), job_id=None):
+        """
+        Dict of q -> the q-th percentile of part durations.
+        """
+        ordered = self.durations(job_id)
+        return dict((q, percentile(ordered, q)) for q in qs)
+
+    def throughput(self, job_id=None):
+        """
+        Frames rendered per second, from the first part start to the last part finish. None before any part
+        finished.
+        """
+        mask, complete = self._select(job_id)
+        return self._throughput(mask, complete, self._totals(mask, complete)[0])
+
+    def eta(self, job_id=None):
+        """
+        Seconds until every frame is rendered at the current throughput, 0 when done and None when unknown.
+        """
+        mask, complete = self._select(job_id)
+        done, total = self._totals(mask, complete)
+        return self._eta(done, total, self._throughput(mask, complete, done))
+
+    def summary(self, job_id=None, qs=(50, 90, 99), now=None):
+        """
+        Every figure at once, eg for a dashboard row. 'finish_at' is the estimated finish time.
+        """
+        mask, complete = self._select(job_id)
+        done, total = self._totals(mask, complete)
+        rate = self._throughput(mask, complete, done)
+        eta = self._eta(done, total, rate)
+        ordered = self._durations(complete)
+        counts = {}
+        for code in self._rows(self.status, mask):
+            counts[code] = counts.get(code, 0) + 1
+        return {
+            "parts": len(self) if mask is None else sum(mask),
+            "counts": dict((self.statuses[code], count) for code, count in counts.items()),
+            "frames_done": done,
+            "frames_total": total,
+            "completion": 100.0 * done / total if total else None,
+            "throughput": rate,
+            "eta": eta,
+            "finish_at": (now if now is not None else time.time()) + eta if eta is not None else None,
+            "percentiles": dict((q, percentile(ordered, q)) for q in qs),
+        }
+
+
+def load_parts(base_url, group_id, token, job_ids, max_workers=bulk.DEFAULT_MAX_WORKERS, table=None):
+    """
+    Fetch the parts of many jobs concurrently into a PartTable. Jobs whose parts could not be fetched are recorded
+    in 'errors'.
+    """
+    table = table if table is not None else PartTable()
+    for job_id, response, error in bulk.get_parts_for_jobs(base_url, group_id, token, job_ids, max_workers):
+        if error is not None:
+            table.errors[job_id] = error
+            continue
+        table.add_parts(job_id, response.json().get("parts") or [])
+        table.errors.pop(job_id, None)
+    return table
@@ -0,0 +1,195 @@
+"""
+Choose part_count and node_count for a compute job from a cost model, instead of guessing.
+
+Too few parts leave a long tail, with one node still rendering after the others are idle. Too many parts pay the
+per-part overhead (starting the app, loading the scene) over and over. plan_job estimates the wall-clock time of each
+(node_count, part_count) within a node budget and returns the fastest Plan:
+
+    from athera.api import partition
+    plan = partition.plan_job(1001, 1240, 1, cost=45.0, node_budget=10)
+    payload = plan.make_job_request(user_id, group_id, app_id, file_path, name, region, arguments)
+
+The per-frame cost may be a constant number of seconds, a list with one value per frame, or a function of the frame
+number. costs_from_parts derives such a function from the timings of the parts of a previous job:
+
+    cost = partition.costs_from_parts(compute.get_parts(base_url, group_id, token, job_id).json()["parts"])
+
+The model: a job pays 'node_overhead' once while its nodes are provisioned, each part pays 'part_overhead' plus the
+cost of its frames, and parts are handed out in order to whichever node is free first. With balance="frames" parts get
+equal frame counts, as the server splits them. With balance="cost" the splits equalise cost instead, for callers
+submitting each split as its own job.
+"""
+import bisect
+import heapq
+
+from athera.api import compute, models
+
+DEFAULT_PART_OVERHEAD      = 30.0
+DEFAULT_NODE_OVERHEAD      = 120.0
+DEFAULT_MAX_PARTS_PER_NODE = 8
+
+
+class Plan(object):
+    """
+    A partition of a frame range.
+
+    'splits':     (first_frame, last_frame) of each part, in order.
+    'part_costs': Estimated seconds of each part, including its overhead.
+    'wall_time':  Estimated seconds from submission until the last part finishes.
+    """
+    __slots__ = ("frame_start", "frame_finish", "frame_increment", "part_count", "node_count", "splits",
+                 "part_costs", "wall_time")
+
+    def __init__(self, frame_start, frame_finish, frame_increment, node_count, splits, part_costs, wall_time):
+        self.frame_start = frame_start
+        self.frame_finish = frame_finish
+        self.frame_increment = frame_increment
+        self.part_count = len(splits)
+        self.node_count = node_count
+        self.splits = splits
+        self.part_costs = part_costs
+        self.wall_time = wall_time
+
+    def make_job_request(self, user_id, group_id, app_id, file_path, name, region, arguments):
+        """
+        The job payload for this plan. See athera.api.compute.make_job_request.
+        """
+        return compute.make_job_request(user_id, group_id, app_id, file_path, name,
+                                        self.frame_start, self.frame_finish, self.frame_increment, region, arguments,
+                                        part_count=self.part_count, node_count=self.node_count)
+
+    def __repr__(self):
+        return "<Plan parts={} nodes={} wall_time={:.0f}s>".format(self.part_count, self.node_count, self.wall_time)
+
+
+def frame_costs(frames, cost):
+    """
+    Expand a cost estimate to a list of seconds, one per frame. 'cost' is a number, a list or a function of the frame.
+    """
+    if callable(cost):
+        return [float(cost(frame)) for frame in frames]
+    if isinstance(cost, (int, float)):
+        return [float(cost)] * len(frames)
+    costs = [float(value) for value in cost]
+    if len(costs) != len(frames):
+        raise ValueError("Expected {} frame costs, got {}".format(len(frames), len(costs)))
+    return costs
+
+
+def costs_from_parts(parts, part_overhead=0.0, default=None):
+    """
+    A per-frame cost function learnt from finished parts (dicts from get_parts, or athera.api.models.Part).
+
+    Frames covered by a past part cost that part's seconds per frame, after subtracting 'part_overhead'. Other frames
+    cost the mean rate. Raises ValueError if no part has usable timings and no 'default' is given.
+    """
+    rates = []
+    for part in parts:
+        if isinstance(part, dict):
+            part = models.Part(part, keep_extra=False)
+        started, finished = part.started_at, part.finished_at
+        if not hasattr(started, "year") or not hasattr(finished, "year") or part.frame_start is None:
+            continue
+        frame_finish = part.frame_finish if part.frame_finish is not None else part.frame_start
+        frames = len(range(part.frame_start, frame_finish + 1, part.frame_increment or 1))
+        seconds = (finished - started).total_seconds() - part_overhead
+        if frames and seconds > 0:
+            rates.append((part.frame_start, frame_finish, seconds / frames))
+
+    if not rates:
+        if default is None:
+            raise ValueError("No finished parts with start and finish times")
+        return lambda frame: default
+
+    rates.sort()
+    starts = [rate[0] for rate in rates]
+    mean = sum(rate[2] for rate in rates) / len(rates)
+
+    def cost(frame):
+        i = bisect.bisect_right(starts, frame) - 1
+        if i >= 0 and frame <= rates[i][1]:
+            return rates[i][2]
+        return mean
+    return cost
+
+
+def _prefix_sums(costs):
+    prefix = [0.0]
+    total = 0.0
+    for value in costs:
+        total += value
+        prefix.append(total)
+    return prefix
+
+
+def split_points(prefix, part_count, balance="frames"):
+    """
+    Indexes at which a frame list is cut into 'part_count' non-empty parts: part i covers frames
+    [points[i], points[i + 1]). 'prefix' holds the prefix sums of the frame costs.
+    """
+    count = len(prefix) - 1
+    if balance == "frames":
+        return [count * i // part_count for i in range(part_count + 1)]
+    if balance != "cost":
+        raise ValueError("balance must be 'frames' or 'cost'")
+    total = prefix[-1]
+    points = [0]
+    for i in range(1, part_count):
+        point = bisect.bisect_left(prefix, total * i / part_count)
+        # Keep every part non-empty: at least one frame after the previous cut, and one left for each later part
+        points.append(min(max(point, points[-1] + 1), count - (part_count - i)))
+    points.append(count)
+    return points
+
+
+def makespan(part_costs, node_count):
+    """
+    Seconds until the last part finishes when parts are handed out in order to the first free node.
+    """
+    nodes = [0.0] * min(node_count, len(part_costs))
+    for cost in part_costs:
+        heapq.heapreplace(nodes, nodes[0] + cost)
+    return max(nodes) if nodes else 0.0
+
+
+def plan_job(frame_start, frame_finish, frame_increment, cost, node_budget, part_overhead=DEFAULT_PART_OVERHEAD,
+             node_overhead=DEFAULT_NODE_OVERHEAD, max_parts_per_node=DEFAULT_MAX_PARTS_PER_NODE, balance="frames"):
+    """
+    Find the (node_count, part_count) with the lowest estimated wall-clock time using at most 'node_budget' nodes,
+    trying up to 'max_parts_per_node' parts per node. Ties go to fewer nodes, then fewer parts. With more than eight
+    nodes the part counts tried step by an eighth of the node count, which keeps large budgets fast.
+    """
+    frames = range(frame_start, frame_finish + 1, frame_increment)
+    if not len(frames):
+        raise ValueError("Empty frame range {}-{}x{}".format(frame_start, frame_finish, frame_increment))
+    if node_budget < 1:
+        raise ValueError("node_budget must be at least 1")
+    costs = frame_costs(frames, cost)
+    prefix = _prefix_sums(costs)
+    total, longest = prefix[-1], part_overhead + max(costs)
+
+    def bound(node_count, part_count):
+        # No plan beats perfectly shared work, nor the single most expensive frame
+        return node_overhead + max((total + part_count * part_overhead) / node_count, longest)
+
+    best = None
+    # Most nodes first, so the lower bound on the wall time lets the search stop early
+    for node_count in range(min(node_budget, len(frames)), 0, -1):
+        if best is not None and bound(node_count, node_count) > best[4] + 1e-6:
+            # Even one part per node cannot beat the best plan, and fewer nodes only do worse
+            break
+        # Try every part count on a few nodes, and steps of an eighth of a wave on many
+        step = max(1, node_count // 8)
+        for part_count in range(node_count, min(node_count * max_parts_per_node, len(frames)) + 1, step):
+            if best is not None and bound(node_count, part_count) > best[4] + 1e-6:
+                break
+            points = split_points(prefix, part_count, balance)
+            part_costs = [part_overhead + prefix[b] - prefix[a] for a, b in zip(points, points[1:])]
+            wall_time = node_overhead + makespan(part_costs, node_count)
+            rank = (round(wall_time, 6), node_count, part_count)
+            if best is None or rank < best[0]:
+                best = (rank, node_count, points, part_costs, wall_time)
+
+    _, node_count, points, part_costs, wall_time = best
+    splits = [(frames[a], frames[b - 1]) for a, b in zip(points, points[1:])]
+    return Plan(frame_start, frame_finish, frame_increment, node_count, splits, part_costs, wall_time)
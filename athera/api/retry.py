@@ -0,0 +1,154 @@
+"""
+Retries with backoff, and client-side rate limiting, for the shared transport.
+
+Under load the API answers with 429 Too Many Requests and transient 5xx errors. A RetryPolicy installed on a
+transport retries those for you, waiting between attempts with exponential backoff and full jitter, or for exactly as
+long as a Retry-After header asks. Only idempotent requests are retried after a 5xx or a connection error, because a
+POST such as create_job or start_session may already have been applied. A 429 means the request was rejected before
+it was processed, so every request may retry it.
+
+A RateLimiter keeps each (api host, active group) under a request rate with a token bucket, and pauses the bucket
+when the API asks us to back off.
+
+    from athera.api.retry import RetryPolicy, RateLimiter
+    configure_transport(retry=RetryPolicy(max_attempts=5), rate_limiter=RateLimiter(rate=20, burst=40))
+"""
+import random
+import threading
+import time
+
+import requests
+
+from athera.api import compute, sessions
+from athera.api.common import parse_retry_after
+
+DEFAULT_RETRY_STATUS = (429, 500, 502, 503, 504)
+IDEMPOTENT_METHODS   = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE")
+
+# POST routes which are safe to repeat, because stopping something twice has the same effect as stopping it once
+IDEMPOTENT_POST_ROUTES = (
+    compute.route_job_stop,
+    sessions.route_session_stop,
+)
+
+
+class RetryPolicy(object):
+    """
+    When, and how long, to retry a request.
+
+    'max_attempts':    Total attempts including the first. 1 disables retries.
+    'backoff_factor':  Base delay in seconds. Attempt n waits a random time up to backoff_factor * 2 ** (n - 1).
+    'max_backoff':     Upper bound for any single wait, including one requested by Retry-After.
+    'retry_status':    Status codes which may be retried.
+    'retry_non_idempotent': Also retry non-idempotent requests after a 5xx or connection error. Off by default, as
+                       it can duplicate jobs or sessions.
+    'idempotent_post_routes': POST routes treated as idempotent.
+    """
+
+    def __init__(self, max_attempts=3, backoff_factor=0.5, max_backoff=30.0, retry_status=DEFAULT_RETRY_STATUS,
+                 retry_non_idempotent=False, idempotent_post_routes=IDEMPOTENT_POST_ROUTES, sleep=time.sleep):
+        self.max_attempts = max_attempts
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.retry_status = frozenset(retry_status)
+        self.retry_non_idempotent = retry_non_idempotent
+        self.idempotent_post_routes = frozenset(idempotent_post_routes)
+        self.sleep = sleep
+
+    def is_idempotent(self, method, route):
+        return method in IDEMPOTENT_METHODS or (method == "POST" and route in self.idempotent_post_routes)
+
+    def should_retry(self, method, route, attempt, response=None, error=None):
+        """
+        Whether attempt number 'attempt' (1-based), which produced 'response' or raised 'error', should be retried.
+        """
+        if attempt >= self.max_attempts:
+            return False
+        if error is not None:
+            if not isinstance(error, (requests.ConnectionError, requests.Timeout)):
+                return False
+            return self.retry_non_idempotent or self.is_idempotent(method, route)
+        if response.status_code not in self.retry_status:
+            return False
+        if response.status_code == 429:
+            return True
+        return self.retry_non_idempotent or self.is_idempotent(method, route)
+
+    def backoff(self, attempt, response=None):
+        """
+        Seconds to wait before attempt number attempt + 1.
+        """
+        if response is not None:
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if retry_after is not None:
+                return min(retry_after, self.max_backoff)
+        return random.uniform(0, min(self.max_backoff, self.backoff_factor * 2 ** (attempt - 1)))
+
+
+class TokenBucket(object):
+    """
+    A token bucket refilling at 'rate' tokens per second, holding at most 'burst' tokens.
+    """
+
+    def __init__(self, rate, burst, clock=time.time):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.clock = clock
+        self.tokens = float(burst)
+        self.updated = clock()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        """
+        Take a token, returning the number of seconds the caller must wait before using it.
+        """
+        with self.lock:
+            now = self.clock()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            wait = 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+            return max(wait, self.paused_until - now)
+
+    def pause(self, seconds):
+        """
+        Hold back every request for 'seconds', eg when the API answers 429 with Retry-After.
+        """
+        with self.lock:
+            self.paused_until = max(self.paused_until, self.clock() + seconds)
+
+
+class RateLimiter(object):
+    """
+    One token bucket per (api host, active group), so each group stays under its own quota.
+
+    'rate':  Sustained requests per second.
+    'burst': Requests which may be sent back to back after a quiet period.
+    """
+
+    def __init__(self, rate=10.0, burst=20, clock=time.time, sleep=time.sleep):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.sleep = sleep
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def bucket(self, key):
+        with self.lock:
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                bucket = self.buckets[key] = TokenBucket(self.rate, self.burst, self.clock)
+            return bucket
+
+    def acquire(self, key):
+        """
+        Block until a request may be sent for 'key'.
+        """
+        wait = self.bucket(key).reserve()
+        if wait > 0:
+            self.sleep(wait)
+
+    def pause(self, key, seconds):
+        self.bucket(key).pause(seconds)
@@ -0,0 +1,313 @@
+"""
+A pool of pre-started sessions, so users get a READY session without waiting for host assignment and container start.
+
+A SessionPool keeps a number of READY sessions per (app_id, region) and hands one out on acquire(). A background
+thread starts replacements as sessions are handed out, and stops surplus sessions with stop_session when demand drops.
+The number kept warm for each (app_id, region) follows demand: the number of sessions acquired within the last
+'demand_window' seconds, bounded by 'min_size' and 'max_size':
+
+    from athera.api.session_pool import SessionPool
+    pool = SessionPool(base_url, group_id, token, user_id, min_size=2, max_size=10).start()
+    pool.warm(app_id, "europe-west1")
+    session = pool.acquire(app_id, "europe-west1", timeout=600)
+"""
+import threading
+import time
+from collections import deque
+
+from athera.api import sessions
+from athera.api.metrics import logger
+from athera.api.watchers import SessionWaiter, is_permanent_error
+
+DEFAULT_MIN_SIZE       = 1
+DEFAULT_MAX_SIZE       = 4
+DEFAULT_DEMAND_WINDOW  = 600
+DEFAULT_CHECK_INTERVAL = 5.0
+DEFAULT_DISPLAY        = (1920, 1080, 96)
+
+
+class _Slot(object):
+    """
+    The warm sessions and recent demand of one (app_id, region).
+    """
+    __slots__ = ("warm", "starting", "demand", "min_size", "max_size", "hits", "misses")
+
+    def __init__(self, min_size, max_size):
+        self.warm = deque()
+        self.starting = 0
+        self.demand = deque()
+        self.min_size = min_size
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+    def target(self, now, window):
+        while self.demand and self.demand[0] < now - window:
+            self.demand.popleft()
+        return max(self.min_size, min(self.max_size, len(self.demand)))
+
+
+class SessionPool(object):
+    """
+    Warm sessions per (app_id, region), started on behalf of 'user_id' in 'group_id'.
+
+    'min_size':       Sessions kept warm per (app_id, region) however quiet it is.
+    'max_size':       Upper bound on the sessions kept warm per (app_id, region).
+    'demand_window':  Seconds of acquire() history which set the number kept warm.
+    'check_interval': Seconds between background refill / trim passes.
+    'display':        (width, height, dpi) of the sessions started.
+    'name':           Name given to the sessions started.
+    'waiter':         The athera.api.watchers.SessionWaiter following new sessions to READY.
+    """
+
+    def __init__(self, base_url, group_id, token, user_id, min_size=DEFAULT_MIN_SIZE, max_size=DEFAULT_MAX_SIZE,
+                 demand_window=DEFAULT_DEMAND_WINDOW, check_interval=DEFAULT_CHECK_INTERVAL, display=DEFAULT_DISPLAY,
+                 name="warm-pool", waiter=None, clock=time.time):
+        self.base_url = base_url
+        self.group_id = group_id
+        self.token = token
+        self.user_id = user_id
+        self.min_size = min_size
+        self.max_size = max_size
+        self.demand_window = demand_window
+        self.check_interval = check_interval
+        self.display = display
+        self.name = name
+        self.waiter = waiter if waiter is not None else SessionWaiter(base_url, token)
+        self.clock = clock
+
+        self.slots = {}
+        # session_id -> (app_id, region) of the warm sessions started but not yet READY
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def make_payload(self, app_id, region):
+        width, height, dpi = self.display
+        return sessions.make_session_request(self.user_id, self.group_id, app_id, region, width, height, dpi,
+                                             self.name)
+
+    def start_session(self, payload):
+        """
+        Start one session. Override to change how sessions are started.
+        """
+        return sessions.start_session(self.base_url, self.group_id, self.token, payload)
+
+    def stop_session(self, session_id):
+        """
+        Stop one session. Override to change how sessions are stopped.
+        """
+        return sessions.stop_session(self.base_url, self.group_id, self.token, session_id)
+
+    def fetch_session(self, session_id):
+        """
+        Fetch one session. Override to change how sessions are fetched.
+        """
+        return sessions.get_session(self.base_url, self.group_id, self.token, session_id)
+
+    def warm(self, app_id, region, min_size=None, max_size=None):
+        """
+        Keep sessions of an (app_id, region) warm, overriding the pool's sizes if given.
+        """
+        with self.lock:
+            slot = self._slot((app_id, region))
+            if min_size is not None:
+                slot.min_size = min_size
+            if max_size is not None:
+                slot.max_size = max_size
+        self.wakeup.set()
+
+    def _slot(self, key):
+        slot = self.slots.get(key)
+        if slot is None:
+            slot = self.slots[key] = _Slot(self.min_size, self.max_size)
+        return slot
+
+    def acquire(self, app_id, region, timeout=None):
+        """
+        Hand out a READY session, starting one if none is warm. The session is no longer managed by the pool.
+        Returns the session, or None if a new session could not be made READY within 'timeout' seconds.
+        """
+        key = (app_id, region)
+        while True:
+            with self.lock:
+                slot = self._slot(key)
+                slot.demand.append(self.clock())
+                session = slot.warm.popleft() if slot.warm else None
+                if session is None:
+                    slot.misses += 1
+                else:
+                    slot.hits += 1
+            self.wakeup.set()
+            if session is None:
+                return self._start_now(app_id, region, timeout)
+
+            # A warm session may have been stopped or expired since it became READY
+            try:
+                response = self.fetch_session(session["id"])
+            except Exception as e:
+                logger.warning("Checking warm session %s failed: %s", session["id"], e)
+                response = None
+            if response is not None and response.ok:
+                current = response.json()
+                if current.get("status") in sessions.ready_status:
+                    return current
+            elif response is not None and is_permanent_error(response):
+                # It can no longer be checked, so it must not be left running
+                self._stop(session["id"])
+            else:
+                # It may well still be READY: keep it for later, and start a session for this caller
+                with self.lock:
+                    slot.warm.appendleft(session)
+                    slot.hits -= 1
+                    slot.misses += 1
+                return self._start_now(app_id, region, timeout)
+            with self.lock:
+                slot.demand.pop()
+                slot.hits -= 1
+
+    def _start_now(self, app_id, region, timeout):
+        self.waiter.start()
+        response = self.start_session(self.make_payload(app_id, region))
+        if not response.ok:
+            logger.warning("Starting a %s session in %s failed: %s", app_id, region, response.status_code)
+            return None
+        future = self.waiter.add(self.group_id, response.json()["id"])
+        try:
+            session = future.result(timeout)
+        except Exception as e:
+            logger.warning("Waiting for a %s session in %s failed: %s", app_id, region, e)
+            return None
+        return session if session.get("status") in sessions.ready_status else None
+
+    def maintain(self):
+        """
+        Run one refill / trim pass: start sessions where fewer than the target are warm or starting, and stop the
+        oldest warm sessions beyond the target.
+        """
+        now = self.clock()
+        starts = []
+        surplus = []
+        with self.lock:
+            for key, slot in self.slots.items():
+                target = slot.target(now, self.demand_window)
+                missing = target - len(slot.warm) - slot.starting
+                if missing > 0:
+                    slot.starting += missing
+                    starts.extend([key] * missing)
+                while len(slot.warm) > target:
+                    surplus.append(slot.warm.popleft())
+
+        for session in surplus:
+            self._stop(session["id"])
+        for key in starts:
+            self._start_warm(key)
+
+    def _start_warm(self, key):
+        try:
+            response = self.start_session(self.make_payload(*key))
+            response.raise_for_status()
+            session_id = response.json()["id"]
+        except Exception as e:
+            logger.warning("Starting a warm %s session in %s failed: %s", key[0], key[1], e)
+            with self.lock:
+                self.slots[key].starting -= 1
+            return
+        with self.lock:
+            self.pending[session_id] = key
+        future = self.waiter.add(self.group_id, session_id)
+        future.add_done_callback(lambda done: self._warmed(key, session_id, done))
+
+    def _warmed(self, key, session_id, future):
+        session = None
+        if not future.cancelled() and future.exception() is None:
+            session = future.result()
+        ready = session is not None and session.get("status") in sessions.ready_status
+        with self.lock:
+            slot = self.slots[key]
+            slot.starting -= 1
+            # close() takes the pending sessions over, and stops them itself
+            owned = self.pending.pop(session_id, None) is not None
+            if ready and owned and not self.stopped.is_set():
+                slot.warm.append(session)
+                return
+        if not owned:
+            return
+        if ready:
+            # The pool was closed while the session was starting
+            self._stop(session_id)
+        else:
+            logger.warning("Warm %s session in %s did not become READY", key[0], key[1])
+
+    def stats(self):
+        """
+        Per (app_id, region): sessions warm and starting, the current target, and acquire() hits and misses.
+        """
+        now = self.clock()
+        with self.lock:
+            return dict((key, {
+                "warm": len(slot.warm),
+                "starting": slot.starting,
+                "target": slot.target(now, self.demand_window),
+                "hits": slot.hits,
+                "misses": slot.misses,
+            }) for key, slot in self.slots.items())
+
+    def run(self):
+        while not self.stopped.is_set():
+            self.wakeup.clear()
+            try:
+                self.maintain()
+            except Exception:
+                logger.exception("Session pool maintenance failed")
+            self.wakeup.wait(self.check_interval)
+
+    def start(self):
+        """
+        Refill and trim the pool in a background thread.
+        """
+        if self.thread is None or not self.thread.is_alive():
+            self.stopped.clear()
+            self.waiter.start()
+            self.thread = threading.Thread(target=self.run, name="athera-session-pool")
+            self.thread.daemon = True
+            self.thread.start()
+        return self
+
+    def close(self, stop_warm=True):
+        """
+        Stop the background thread, and with 'stop_warm' stop every warm session too, along with those still
+        starting: once the waiter is stopped they would never be followed to READY.
+        """
+        self.stopped.set()
+        self.wakeup.set()
+        if self.thread is not None:
+            self.thread.join()
+        self.waiter.stop()
+        if stop_warm:
+            with self.lock:
+                session_ids = [session["id"] for slot in self.slots.values() for session in slot.warm]
+                for slot in self.slots.values():
+                    slot.warm.clear()
+                session_ids.extend(self.pending)
+                self.pending.clear()
+            for session_id in session_ids:
+                self._stop(session_id)
+
+    def _stop(self, session_id):
+        # Failures are logged rather than raised, so one failed stop never leaves the other sessions running
+        try:
+            response = self.stop_session(session_id)
+        except Exception as e:
+            logger.warning("Stopping session %s failed: %s", session_id, e)
+            return
+        if not response.ok:
+            logger.warning("Stopping session %s failed: %s", session_id, response.status_code)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.close()
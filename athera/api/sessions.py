@@ -1,5 +1,5 @@
-import requests
-from athera.api.common import headers, api_debug
+from athera.api.transport import get_transport
+from athera.api.common import headers
 
 route_user_sessions = "/users/{user_id}/sessions"
 route_session       = "/sessions/{session_id}"
@@ -27,7 +27,6 @@ def make_session_request(user_id, group_id, app_id, region, display_width, displ
         "name": name,
     }
 
-@api_debug
 def get_user_sessions(base_url, group_id, token, user_id):
     """
     Get all Sessions owned by the provided user_id
@@ -35,10 +34,9 @@ def get_user_sessions(base_url, group_id, token, user_id):
     Response: [404 Not Found] Incorrect user_id
     """
     url = base_url + route_user_sessions.format(user_id=user_id)
-    response = requests.get(url, headers=headers(group_id, token))
+    response = get_transport().get(url, route=route_user_sessions, headers=headers(group_id, token))
     return response
 
-@api_debug
 def get_session(base_url, group_id, token, session_id):
     """
     Get a single Session
@@ -46,10 +44,9 @@ def get_session(base_url, group_id, token, session_id):
     Response: [404 Not Found] Incorrect session_id
     """
     url = base_url + route_session.format(session_id=session_id)
-    response = requests.get(url, headers=headers(group_id, token))
+    response = get_transport().get(url, route=route_session, headers=headers(group_id, token))
     return response
 
-@api_debug
 def start_session(base_url, group_id, token, payload):
     """
     Start a new Session with the provided payload specification
@@ -57,10 +54,9 @@ def start_session(base_url, group_id, token, payload):
     Response: [400 Bad Request] Malformed payload
     """
     url = base_url + route_sessions
-    response = requests.post(url, headers=headers(group_id, token), json=payload)
+    response = get_transport().post(url, route=route_sessions, headers=headers(group_id, token), json=payload)
     return response
 
-@api_debug
 def stop_session(base_url, group_id, token, session_id):
     """
     Stop a Session in the READY state
@@ -68,5 +64,5 @@ def stop_session(base_url, group_id, token, session_id):
     Response: [404 Not Found] Incorrect session_id
     """
     url = base_url + route_session_stop.format(session_id=session_id)
-    response = requests.post(url, headers=headers(group_id, token))
+    response = get_transport().post(url, route=route_session_stop, headers=headers(group_id, token))
     return response
@@ -1,12 +1,11 @@
-import requests
-from athera.api.common import headers, api_debug
+from athera.api.transport import get_transport
+from athera.api.common import headers
 
 route_driver  = "/storage/driver"
 route_drivers  = "/storage/drivers"
 route_driver_id  = "/storage/driver/{driver_id}"
 
 # Drivers
-@api_debug
 def get_drivers(base_url, group_id, token):
     """
     Get all user storage drivers. It gets the drivers associated with the active-group-id and the one of its group lineage. 
@@ -14,27 +13,25 @@ def get_drivers(base_url, group_id, token):
     Response: [403 Forbidden] Incorrect or inaccessible group_id
     """
     url = base_url + route_drivers
-    response = requests.get(url, headers=headers(group_id, token))
+    response = get_transport().get(url, route=route_drivers, headers=headers(group_id, token))
     return response
 
-@api_debug
 def get_driver(base_url, group_id, token, driver_id):
     """
     Get storage driver from driver_id, you will get information such as on its type, its mounts and its indexing-status.
     Response: [403 Forbidden] Incorrect or inaccessible group_id
     """
     url = base_url + route_driver_id.format(driver_id=driver_id)
-    response = requests.get(url, headers=headers(group_id, token))
+    response = get_transport().get(url, route=route_driver_id, headers=headers(group_id, token))
     return response
 
-@api_debug
 def delete_driver(base_url, group_id, token, driver_id):
     """
     Get storage driver from driver_id, you will get information such as on its type, its mounts and its indexing-status.
     Response: [403 Forbidden] Incorrect or inaccessible group_id
     """
     url = base_url + route_driver_id.format(driver_id=driver_id)
-    response = requests.delete(url, headers=headers(group_id, token))
+    response = get_transport().delete(url, route=route_driver_id, headers=headers(group_id, token))
     return response
 
 def create_gcs_storage_driver_request(name, bucket_id, client_secret):
@@ -49,7 +46,6 @@ def create_gcs_storage_driver_request(name, bucket_id, client_secret):
         }
     }
 
-@api_debug
 def create_driver(base_url, group_id, token, storage_driver_request):
     """
     storage_driver_request parameter must be generated using the following function:
@@ -57,11 +53,10 @@ def create_driver(base_url, group_id, token, storage_driver_request):
     Response: [403 Forbidden] Incorrect or inaccessible group_id
     """
     url = base_url + route_driver
-    response = requests.post(url, headers=headers(group_id, token), json=storage_driver_request)
+    response = get_transport().post(url, route=route_driver, headers=headers(group_id, token), json=storage_driver_request)
     return response
 
 
-@api_debug
 def rescan_driver(base_url, group_id, token, driver_id, path):
     """
     Response: [403 Forbidden] Incorrect or inaccessible group_id
@@ -71,10 +66,9 @@ def rescan_driver(base_url, group_id, token, driver_id, path):
         "path": path
     }
     url = base_url + route_driver_id.format(driver_id=driver_id)
-    response = requests.post(url, headers=headers(group_id, token), json=body)
+    response = get_transport().post(url, route=route_driver_id, headers=headers(group_id, token), json=body)
     return response
 
-@api_debug
 def dropcache_driver(base_url, group_id, token, driver_id):
     """
     This action should be avoided as much as possible. Use rescan driver if want a reindex.
@@ -84,7 +78,7 @@ def dropcache_driver(base_url, group_id, token, driver_id):
         "type": "DROP"
     }
     url = base_url + route_driver_id.format(driver_id=driver_id)
-    response = requests.post(url, headers=headers(group_id, token), json=body)
+    response = get_transport().post(url, route=route_driver_id, headers=headers(group_id, token), json=body)
     return response
 
 
@@ -0,0 +1,184 @@
+"""
+Streaming decoding of large list responses.
+
+get_jobs and get_parts can return bodies of many megabytes. response.json() waits for the whole body and then builds
+one dict holding every item before the first one can be looked at. The generators here request the body with
+stream=True and decode it incrementally as it arrives, yielding each job or part as soon as it is complete, so memory
+use stays flat however long the list is and processing overlaps the download:
+
+    from athera.api import streaming
+    for part in streaming.stream_parts(base_url, group_id, token, job_id):
+        print(part['id'], part['status'])
+
+Failed requests raise requests.HTTPError, and malformed bodies raise ValueError.
+"""
+import codecs
+import functools
+import json
+import re
+
+from athera.api import compute
+from athera.api.pagination import next_page
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE  = re.compile(r"[ \t\n\r]*")
+_NUMBER_TAIL = re.compile(r"[0-9eE.+-]*")
+_decoder = json.JSONDecoder()
+
+
+class _Reader(object):
+    """
+    A text buffer over an iterable of byte (or text) chunks, holding only the part of the body not yet decoded.
+    """
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.buffer = u""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        """
+        Append the next chunk to the buffer, returning False at the end of the body.
+        """
+        if self.eof:
+            return False
+        text = u""
+        for chunk in self.chunks:
+            text = self.decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+            if text:
+                break
+        else:
+            text = self.decoder.decode(b"", final=True)
+            self.eof = True
+        # Drop the decoded prefix, so the buffer never grows beyond the item being decoded plus one chunk
+        self.buffer = self.buffer[self.pos:] + text
+        self.pos = 0
+        return bool(text) or not self.eof
+
+    def peek(self):
+        """
+        Skip whitespace and return the next character, or "" at the end of the body.
+        """
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill():
+                return u""
+
+    def expect(self, chars):
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError("Expecting one of {!r} at offset {}, found {!r}".format(chars, self.pos, char))
+        self.pos += 1
+        return char
+
+    def value(self):
+        """
+        Decode one complete JSON value.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+            except ValueError:
+                if not self.fill():
+                    raise
+                continue
+            # A number running up to the end of the buffer may continue in the next chunk, eg "12" + "34"
+            if (not self.eof and isinstance(value, (int, float)) and
+                    _NUMBER_TAIL.match(self.buffer, end).end() == len(self.buffer) and self.fill()):
+                continue
+            self.pos = end
+            return value
+
+
+def _array_items(reader):
+    if reader.peek() == "]":
+        reader.pos += 1
+        return
+    while True:
+        yield reader.value()
+        if reader.expect(",]") == "]":
+            return
+
+
+def iter_items(chunks, key, meta=None):
+    """
+    Incrementally decode a JSON body from an iterable of chunks, yielding each item of the list found under 'key' at
+    the top level (or of the body itself, if it is a list) as soon as it has been received.
+
+    'meta': An optional dict filled with the other top-level values, eg 'pagination'. Values after the list are only
+            present once the generator is exhausted.
+    """
+    reader = _Reader(chunks)
+    if reader.expect("{[") == "[":
+        for item in _array_items(reader):
+            yield item
+        return
+
+    if reader.peek() == "}":
+        return
+    while True:
+        name = reader.value()
+        reader.expect(":")
+        if name == key and reader.peek() == "[":
+            reader.pos += 1
+            for item in _array_items(reader):
+                yield item
+        else:
+            value = reader.value()
+            if meta is not None:
+                meta[name] = value
+        if reader.expect(",}") == "}":
+            return
+
+
+def iter_response(response, key, meta=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yield the items of the list under 'key' in a response sent with stream=True, closing it once done.
+    """
+    try:
+        response.raise_for_status()
+        for item in iter_items(response.iter_content(chunk_size), key, meta):
+            yield item
+    finally:
+        response.close()
+
+
+def stream_pages(fetch, key, page_size=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Like athera.api.pagination.paginate, but each page is streamed and decoded item by item.
+
+    'fetch': Called as fetch(page=..., page_size=..., stream=True) and returning a requests.Response for that page.
+    """
+    page = None
+    while True:
+        meta = {}
+        count = 0
+        for item in iter_response(fetch(page=page, page_size=page_size, stream=True), key, meta, chunk_size):
+            count += 1
+            yield item
+        following = next_page(meta.get("pagination"), page if page is not None else 1)
+        if following is None or not count:
+            return
+        page = following
+
+
+def stream_jobs(base_url, group_id, token, page_size=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yield every Compute Job in the provided Group, decoding each page as it is downloaded.
+    """
+    fetch = functools.partial(compute.get_jobs, base_url, group_id, token)
+    return stream_pages(fetch, "jobs", page_size, chunk_size)
+
+
+def stream_parts(base_url, group_id, token, job_id, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yield every Compute Part of the provided Job, decoding the body as it is downloaded.
+    """
+    return iter_response(compute.get_parts(base_url, group_id, token, job_id, stream=True), "parts",
+                         chunk_size=chunk_size)
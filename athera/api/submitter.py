@@ -0,0 +1,269 @@
+"""
+Submit compute jobs for many shots at once, without duplicating work when a request fails midway.
+
+A create_job which times out, or fails with a 5xx, may still have created the job. Blindly resubmitting it can render
+a shot twice. BatchSubmitter gives every shot a key derived from the batch id and the shot, sends the key as an
+Idempotency-Key header, and also appends it to the job name. After an ambiguous failure it lists the group's jobs and
+looks for the key before deciding to submit again. Submitting the same batch again, eg after a crash, finds the jobs
+already created the same way, so only the missing shots are submitted:
+
+    from athera.api.submitter import BatchSubmitter
+    shots = [
+        {"name": "sh010", "file_path": "/data/Group/sh010.nk", "frame_start": 1001, "frame_finish": 1120},
+        {"name": "sh020", "file_path": "/data/Group/sh020.nk", "frame_start": 1001, "frame_finish": 1064},
+    ]
+    submitter = BatchSubmitter(base_url, group_id, token, user_id, app_id, "europe-west1", arguments,
+                               batch_id="dailies-2020-06-01")
+    for key, submission in submitter.submit(shots).items():
+        print(key, submission.status, submission.job_id)
+
+Shots may come straight from csv.DictReader: frame and count columns are converted to integers.
+"""
+import hashlib
+import re
+import time
+import uuid
+from collections import OrderedDict
+
+import requests
+
+from athera.api import bulk, compute, pagination
+from athera.api.metrics import logger
+
+DEFAULT_MAX_ATTEMPTS    = 3
+DEFAULT_RECONCILE_DELAY = 2.0
+
+# Submission statuses
+SUBMIT_PENDING  = "PENDING"
+SUBMIT_CREATED  = "CREATED"
+SUBMIT_EXISTING = "EXISTING"
+SUBMIT_UNKNOWN  = "UNKNOWN"
+SUBMIT_FAILED   = "FAILED"
+
+# Status codes after which a job may or may not have been created
+AMBIGUOUS_STATUS = (408, 500, 502, 503, 504)
+
+_REQUIRED_COLUMNS = ("name", "file_path", "frame_start", "frame_finish")
+_KEY_PATTERN = re.compile(r"\[([0-9a-f]{16})\]$")
+
+
+def idempotency_key(batch_id, shot_key):
+    """
+    A short key identifying a shot within a batch, the same every time the batch is submitted.
+    """
+    return hashlib.sha1(u"{}\n{}".format(batch_id, shot_key).encode("utf-8")).hexdigest()[:16]
+
+
+def tag_name(name, key):
+    return u"{} [{}]".format(name, key)
+
+
+def name_key(name):
+    """
+    The idempotency key in a job name made by tag_name, or None.
+    """
+    match = _KEY_PATTERN.search(name or "")
+    return match.group(1) if match else None
+
+
+def is_ambiguous(response=None, error=None):
+    """
+    Whether a create_job which returned 'response' or raised 'error' may still have created the job.
+    """
+    if error is not None:
+        # A connection which could not be opened sent nothing, but one which broke or timed out may have
+        if isinstance(error, requests.ConnectTimeout):
+            return False
+        return isinstance(error, (requests.ConnectionError, requests.Timeout))
+    return response.status_code in AMBIGUOUS_STATUS
+
+
+def _never_sent(response, error):
+    # A 429 is rejected before it is processed, and a connect timeout never reached the API
+    if response is not None:
+        return response.status_code == 429
+    return isinstance(error, requests.ConnectTimeout)
+
+
+class Submission(object):
+    """
+    The outcome of one shot of a batch.
+
+    'status':  One of SUBMIT_PENDING, SUBMIT_CREATED, SUBMIT_EXISTING (found already created by reconciliation),
+               SUBMIT_UNKNOWN (still ambiguous after every attempt) or SUBMIT_FAILED.
+    'job':     The created or matching job, as returned by the API.
+    """
+    __slots__ = ("key", "shot", "payload", "status", "job", "attempts", "error")
+
+    def __init__(self, key, shot, payload):
+        self.key = key
+        self.shot = shot
+        self.payload = payload
+        self.status = SUBMIT_PENDING
+        self.job = None
+        self.attempts = 0
+        self.error = None
+
+    @property
+    def job_id(self):
+        return self.job.get("id") if self.job else None
+
+    @property
+    def ok(self):
+        return self.status in (SUBMIT_CREATED, SUBMIT_EXISTING)
+
+    def __repr__(self):
+        return "<Submission {} {} {}>".format(self.key, self.status, self.job_id)
+
+
+class BatchSubmitter(object):
+    """
+    Submit jobs for many shots in one group.
+
+    Each shot is a dict with 'name', 'file_path', 'frame_start' and 'frame_finish', and optionally 'frame_increment',
+    'part_count', 'node_count', 'app_id', 'region', 'arguments' and 'key'. The key, by default the name, must be unique
+    within the batch.
+
+    'batch_id':        Identifies the batch. Submitting the same shots with the same batch_id creates no new jobs
+                       for shots already submitted. A random id is used if none is given.
+    'max_in_flight':   create_job requests in flight at once.
+    'max_attempts':    Submissions of each shot, including the first.
+    'reconcile_delay': Seconds to wait after ambiguous failures before listing jobs, so just created jobs show up.
+    'reconcile':       List jobs before the first submission too, skipping shots created by an earlier run.
+    """
+
+    def __init__(self, base_url, group_id, token, user_id, app_id, region, arguments=None, batch_id=None,
+                 max_in_flight=bulk.DEFAULT_MAX_WORKERS, max_attempts=DEFAULT_MAX_ATTEMPTS,
+                 reconcile_delay=DEFAULT_RECONCILE_DELAY, reconcile=True, page_size=None, sleep=time.sleep):
+        self.base_url = base_url
+        self.group_id = group_id
+        self.token = token
+        self.user_id = user_id
+        self.app_id = app_id
+        self.region = region
+        self.arguments = arguments if arguments is not None else []
+        self.batch_id = batch_id if batch_id is not None else uuid.uuid4().hex
+        self.max_in_flight = max_in_flight
+        self.max_attempts = max_attempts
+        self.reconcile_delay = reconcile_delay
+        self.reconcile = reconcile
+        self.page_size = page_size
+        self.sleep = sleep
+
+    def create_job(self, payload, key):
+        """
+        Create one job. Override to change how jobs are created.
+        """
+        return compute.create_job(self.base_url, self.group_id, self.token, payload, idempotency_key=key)
+
+    def list_jobs(self):
+        """
+        Iterate over the group's jobs. Override to change how jobs are listed.
+        """
+        return pagination.iter_jobs(self.base_url, self.group_id, self.token, self.page_size)
+
+    def make_payload(self, shot, key):
+        """
+        The create_job payload of a shot, its name tagged with the idempotency key.
+        """
+        def number(column, default):
+            value = shot.get(column)
+            return int(value) if value not in (None, "") else default
+        return compute.make_job_request(
+            self.user_id, self.group_id, shot.get("app_id") or self.app_id, shot["file_path"],
+            tag_name(shot["name"], key), number("frame_start", None), number("frame_finish", None),
+            number("frame_increment", 1), shot.get("region") or self.region, shot.get("arguments", self.arguments),
+            part_count=number("part_count", 1), node_count=number("node_count", 1))
+
+    def prepare(self, shots):
+        """
+        A Submission per shot, in order, by shot key. Raises ValueError on a duplicate key or a missing column.
+        """
+        submissions = OrderedDict()
+        for shot in shots:
+            shot_key = shot.get("key") or shot.get("name")
+            if shot_key in submissions:
+                raise ValueError("Duplicate shot {}".format(shot_key))
+            missing = [column for column in _REQUIRED_COLUMNS if shot.get(column) in (None, "")]
+            if missing:
+                raise ValueError("Shot {} has no {}".format(shot_key, ", ".join(missing)))
+            key = idempotency_key(self.batch_id, shot_key)
+            submissions[shot_key] = Submission(key, shot, self.make_payload(shot, key))
+        return submissions
+
+    def submit(self, shots):
+        """
+        Submit every shot and return an OrderedDict of shot key -> Submission. With 'reconcile', an error listing the
+        existing jobs is raised before anything is submitted.
+        """
+        submissions = self.prepare(shots)
+        if self.reconcile:
+            self._reconcile(submissions.values())
+
+        pending = [submission for submission in submissions.values() if submission.status == SUBMIT_PENDING]
+        while pending:
+            pending, ambiguous = self._submit(pending)
+            if not pending and not ambiguous:
+                break
+            self.sleep(self.reconcile_delay)
+            if not ambiguous:
+                continue
+            # Ambiguous failures may have created their jobs: look for them before submitting again
+            try:
+                self._reconcile(ambiguous)
+            except Exception as e:
+                # Without a listing nothing is known, so leave them SUBMIT_UNKNOWN rather than risk duplicates
+                logger.warning("Listing jobs to reconcile the batch failed: %s", e)
+                continue
+            for submission in ambiguous:
+                if submission.status == SUBMIT_UNKNOWN and submission.attempts < self.max_attempts:
+                    submission.status = SUBMIT_PENDING
+                    pending.append(submission)
+        return submissions
+
+    def _submit(self, pending):
+        """
+        Submit 'pending' concurrently. Returns the submissions which were rejected with a 429, so can be submitted
+        again, and those whose outcome is unknown.
+        """
+        rejected = []
+        ambiguous = []
+
+        def create(submission):
+            submission.attempts += 1
+            return self.create_job(submission.payload, submission.key)
+
+        for submission, response, error in bulk.fetch_many(create, pending, self.max_in_flight):
+            submission.error = error
+            if error is None:
+                submission.status = SUBMIT_CREATED
+                submission.job = response.json()
+            elif _never_sent(response, error) and submission.attempts < self.max_attempts:
+                rejected.append(submission)
+            elif is_ambiguous(response, None if response is not None else error):
+                submission.status = SUBMIT_UNKNOWN
+                ambiguous.append(submission)
+            else:
+                submission.status = SUBMIT_FAILED
+                logger.warning("Submitting %s failed: %s", submission.shot.get("name"), error)
+        return rejected, ambiguous
+
+    def _reconcile(self, submissions):
+        """
+        Mark submissions whose job already exists, matched by the key in the job name, as SUBMIT_EXISTING.
+        """
+        by_key = dict((submission.key, submission) for submission in submissions)
+        for job in self.list_jobs():
+            submission = by_key.get(name_key(job.get("name")))
+            if submission is not None and submission.status in (SUBMIT_PENDING, SUBMIT_UNKNOWN):
+                submission.status = SUBMIT_EXISTING
+                submission.job = job
+                submission.error = None
+
+
+def submit_batch(base_url, group_id, token, user_id, app_id, region, shots, arguments=None, batch_id=None, **kwargs):
+    """
+    Submit a job for every shot, see BatchSubmitter. Returns an OrderedDict of shot key -> Submission.
+    """
+    return BatchSubmitter(base_url, group_id, token, user_id, app_id, region, arguments, batch_id,
+                          **kwargs).submit(shots)
@@ -0,0 +1,217 @@
+"""
+Shared HTTP transport for the Athera API.
+
+Every route function in athera.api sends its request through a single pooled requests.Session, so TCP and TLS
+connections to the API are kept alive and reused between calls instead of being set up again for every request.
+
+The default transport is created lazily on first use. Call configure_transport() before making any API calls to
+change its pool settings, or set_transport() to install your own.
+"""
+import threading
+from timeit import default_timer
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.compat import cookielib, urlsplit
+
+from athera.api.coalesce import SingleFlight
+from athera.api.common import parse_retry_after, request_key
+from athera.api.metrics import CACHE_HIT, COALESCED, Metrics, default_log_sample_rate
+
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE     = 32
+
+# The session is shared by every caller and token, so a cookie set in reply to one caller must not be sent for another
+_REJECT_COOKIES = cookielib.DefaultCookiePolicy(allowed_domains=[])
+
+
+class Transport(object):
+    """
+    A connection-pooled, keep-alive HTTP transport.
+
+    'pool_connections': Number of per-host connection pools to cache.
+    'pool_maxsize':     Maximum number of connections kept alive per host. Raise this if many threads share the transport.
+    'pool_block':       Block when no free connection is available for a host, rather than opening a throwaway one.
+    'keep_alive':       Reuse connections between requests. Disabling it closes the connection after each response.
+    'timeout':          Default (connect, read) timeout in seconds, or None to wait forever as requests does.
+    'cache':            An optional athera.api.cache.ResponseCache serving repeat GETs of cached routes.
+    'coalesce':         Share one in-flight request between concurrent identical GETs (same url, group and token).
+    'retry':            An optional athera.api.retry.RetryPolicy for 429s, transient 5xx errors and connection errors.
+    'rate_limiter':     An optional athera.api.retry.RateLimiter keeping each api host and active group under quota.
+    'metrics':          The athera.api.metrics.Metrics recording per-route counts and latencies. One is created if
+                        not supplied.
+    """
+
+    def __init__(self, pool_connections=DEFAULT_POOL_CONNECTIONS, pool_maxsize=DEFAULT_POOL_MAXSIZE,
+                 pool_block=False, keep_alive=True, timeout=None, cache=None, coalesce=False,
+                 retry=None, rate_limiter=None, metrics=None):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.keep_alive = keep_alive
+        self.timeout = timeout
+        self.cache = cache
+        self.single_flight = SingleFlight() if coalesce else None
+        self.retry = retry
+        self.rate_limiter = rate_limiter
+        self.metrics = metrics if metrics is not None else Metrics(log_sample_rate=default_log_sample_rate())
+
+        self.session = requests.Session()
+        self.session.cookies.set_policy(_REJECT_COOKIES)
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=pool_block)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        if not keep_alive:
+            self.session.headers["Connection"] = "close"
+
+    def request(self, method, url, route=None, **kwargs):
+        """
+        Send a request. 'route' is the unformatted route template (eg compute.route_job) the url was built from.
+        """
+        if self.timeout is not None:
+            kwargs.setdefault("timeout", self.timeout)
+        return self._request(method, url, route, kwargs)
+
+    def _request(self, method, url, route, kwargs):
+        cache = self.cache if route is not None else None
+        if method != "GET":
+            try:
+                return self.send(method, url, route, kwargs)
+            finally:
+                # Even a failed write may have been applied, so always drop what it could have changed
+                if cache is not None:
+                    cache.invalidate(route)
+
+        # A streamed body is read by the caller after we return, so it can neither be cached nor shared
+        if kwargs.get("stream"):
+            return self.send(method, url, route, kwargs)
+
+        key = cache.key(route, url, kwargs.get("headers"), kwargs.get("params")) if cache is not None else None
+        if key is not None:
+            response, conditional, stale = cache.lookup(key)
+            if response is not None:
+                self.metrics.served(method, route, CACHE_HIT)
+                return response
+            fetch = lambda: self._fetch_cached(url, route, key, conditional, stale, kwargs)
+        else:
+            fetch = lambda: self.send(method, url, route, kwargs)
+
+        if self.single_flight is None:
+            return fetch()
+        flight_key = key if key is not None else request_key(url, kwargs.get("headers"), kwargs.get("params"))
+        sent = []
+
+        def lead():
+            sent.append(True)
+            return fetch()
+        try:
+            return self.single_flight.do(flight_key, lead)
+        finally:
+            if not sent:
+                self.metrics.served(method, route, COALESCED)
+
+    def _fetch_cached(self, url, route, key, conditional, stale, kwargs):
+        cache = self.cache
+        if conditional:
+            kwargs["headers"] = dict(kwargs.get("headers") or {}, **conditional)
+        response = self.send("GET", url, route, kwargs)
+        if conditional and response.status_code == 304:
+            return cache.not_modified(key, response, stale)
+        cache.put(key, route, response)
+        return response
+
+    def send(self, method, url, route, kwargs):
+        """
+        Send a request over the pool, applying the rate limiter and retry policy if installed.
+        """
+        retry = self.retry
+        limiter = self.rate_limiter
+        if retry is None and limiter is None:
+            return self._attempt(method, url, route, kwargs)
+
+        limit_key = (urlsplit(url).netloc, (kwargs.get("headers") or {}).get("active-group"))
+        attempt = 0
+        while True:
+            attempt += 1
+            if limiter is not None:
+                limiter.acquire(limit_key)
+            try:
+                response = self._attempt(method, url, route, kwargs)
+            except requests.RequestException as e:
+                if retry is None or not retry.should_retry(method, route, attempt, error=e):
+                    raise
+                retry.sleep(retry.backoff(attempt))
+                continue
+
+            if response.status_code == 429 and limiter is not None:
+                limiter.pause(limit_key, parse_retry_after(response.headers.get("Retry-After")) or 1.0)
+            if retry is None or not retry.should_retry(method, route, attempt, response=response):
+                return response
+            delay = retry.backoff(attempt, response)
+            response.close()
+            retry.sleep(delay)
+
+    def _attempt(self, method, url, route, kwargs):
+        """
+        Send a request once and record it. With stream=True the recorded latency ends when the response headers
+        arrive.
+        """
+        start = default_timer()
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except Exception as e:
+            self.metrics.observe(method, route, url, default_timer() - start, error=e, body=kwargs.get("json"))
+            raise
+        self.metrics.observe(method, route, url, default_timer() - start, response=response, body=kwargs.get("json"))
+        return response
+
+    def get(self, url, route=None, **kwargs):
+        return self.request("GET", url, route, **kwargs)
+
+    def post(self, url, route=None, **kwargs):
+        return self.request("POST", url, route, **kwargs)
+
+    def delete(self, url, route=None, **kwargs):
+        return self.request("DELETE", url, route, **kwargs)
+
+    def close(self):
+        """
+        Close all pooled connections.
+        """
+        self.session.close()
+
+
+_transport = None
+_transport_lock = threading.Lock()
+
+
+def get_transport():
+    """
+    Return the shared transport used by the athera.api route functions, creating it on first use.
+    """
+    global _transport
+    if _transport is None:
+        with _transport_lock:
+            if _transport is None:
+                _transport = Transport()
+    return _transport
+
+
+def set_transport(transport):
+    """
+    Replace the shared transport. The previous transport is closed.
+    """
+    global _transport
+    with _transport_lock:
+        previous, _transport = _transport, transport
+    if previous is not None and previous is not transport:
+        previous.close()
+
+
+def configure_transport(**kwargs):
+    """
+    Build a new shared transport with the supplied Transport arguments, eg configure_transport(pool_maxsize=100).
+    """
+    transport = Transport(**kwargs)
+    set_transport(transport)
+    return transport
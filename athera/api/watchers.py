@@ -0,0 +1,489 @@
+"""
+Watchers which follow the status of many jobs and sessions without a hand-rolled loop per item.
+
+A JobWatcher tracks any number of job ids. On each tick it lists the jobs of every group with watched jobs, stopping
+as soon as all of that group's watched jobs have been seen, instead of calling get_job once per job. Callbacks fire,
+and futures resolve, only when a job's status changes. The polling interval drops to 'min_interval' whenever
+something changed and grows towards 'max_interval' while nothing does:
+
+    from athera.api.watchers import JobWatcher
+    with JobWatcher(base_url, token) as watcher:
+        future = watcher.watch(group_id, job_id, lambda job, old, new: print(job['id'], old, '->', new))
+        final_job = future.result()
+
+A SessionWaiter waits for sessions to leave the pending states, polling get_session with intervals fitted to each
+pending phase: a host assignment can take minutes, while a container usually starts within seconds of being pulled.
+One background thread polls every session due for a look. wait_for_session(s) wrap it for blocking callers, and
+AsyncClient.wait_for_session(s) do the same on an event loop:
+
+    from athera.api.watchers import wait_for_sessions
+    for session_id, session in wait_for_sessions(base_url, group_id, token, session_ids, timeout=900).items():
+        print(session_id, session['status'] if session else 'unknown')
+"""
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future, wait
+
+import requests
+
+from athera.api import bulk, compute, sessions
+from athera.api.metrics import logger
+from athera.api.pagination import iter_jobs
+
+DEFAULT_MIN_INTERVAL = 2.0
+DEFAULT_MAX_INTERVAL = 60.0
+DEFAULT_BACKOFF      = 1.5
+
+# Seconds between the first polls of a session in each pending phase. Intervals grow by the backoff factor while a
+# session stays in the same phase, and start again from the phase's interval when it moves on.
+DEFAULT_PHASE_INTERVALS = {
+    "CREATED":               1.0,
+    "HOST_ASSIGNMENT":       3.0,
+    "WAITING_FOR_HOST":      10.0,
+    "WAITING_FOR_CONTAINER": 2.0,
+}
+DEFAULT_SESSION_MAX_INTERVAL = 30.0
+
+# Sessions in these states will not become READY by waiting
+SESSION_DONE_STATUS = frozenset(sessions.ready_status + sessions.failed_status + sessions.completed_status)
+
+
+class _Watch(object):
+    __slots__ = ("group_id", "status", "job", "future", "callbacks")
+
+    def __init__(self, group_id):
+        self.group_id = group_id
+        self.status = None
+        self.job = None
+        self.future = Future()
+        self.callbacks = []
+
+
+class JobWatcher(object):
+    """
+    Follow the status of many compute jobs with one listing per group per tick.
+
+    'min_interval': Seconds between ticks while statuses are changing.
+    'max_interval': Upper bound on the seconds between ticks while nothing changes.
+    'backoff':      Factor applied to the interval after each tick without a change.
+    'page_size':    Page size of the get_jobs listings.
+    'final_status': Statuses after which a job is no longer watched and its future resolves.
+    """
+
+    def __init__(self, base_url, token, min_interval=DEFAULT_MIN_INTERVAL, max_interval=DEFAULT_MAX_INTERVAL,
+                 backoff=DEFAULT_BACKOFF, page_size=None, final_status=compute.final_status):
+        self.base_url = base_url
+        self.token = token
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.page_size = page_size
+        self.final_status = frozenset(final_status)
+
+        self.interval = min_interval
+        self.watches = {}
+        self.callbacks = []
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def list_jobs(self, group_id):
+        """
+        Yield the jobs of a group. Override to change how jobs are listed.
+        """
+        return iter_jobs(self.base_url, group_id, self.token, page_size=self.page_size, prefetch=False)
+
+    def fetch_job(self, group_id, job_id):
+        """
+        Fetch a single job missing from its group's listing. Override to change how jobs are fetched.
+        """
+        return compute.get_job(self.base_url, group_id, self.token, job_id)
+
+    def watch(self, group_id, job_id, callback=None):
+        """
+        Start watching a job of the provided Group. Returns a concurrent.futures.Future resolved with the job once it
+        reaches a final status. The future raises requests.HTTPError if the job cannot be fetched, eg a 404.
+        'callback' is called as callback(job, old_status, new_status) on each change, the
+        first time with old_status None.
+        """
+        with self.lock:
+            watch = self.watches.get(job_id)
+            if watch is None:
+                watch = self.watches[job_id] = _Watch(group_id)
+            if callback is not None:
+                watch.callbacks.append(callback)
+            # Notice a new job quickly, even if the watcher had slowed down
+            self.interval = self.min_interval
+            return watch.future
+
+    def unwatch(self, job_id):
+        """
+        Stop watching a job. Its future is cancelled.
+        """
+        with self.lock:
+            watch = self.watches.pop(job_id, None)
+        if watch is not None:
+            watch.future.cancel()
+
+    def on_change(self, callback):
+        """
+        Call callback(job, old_status, new_status) for changes of every watched job.
+        """
+        self.callbacks.append(callback)
+
+    def status(self, job_id):
+        """
+        The last status seen for a watched job, or None.
+        """
+        watch = self.watches.get(job_id)
+        return watch.status if watch is not None else None
+
+    def poll(self):
+        """
+        Run one tick: list every group with watched jobs and fire the changes. Returns the number of changes.
+        """
+        with self.lock:
+            by_group = {}
+            for job_id, watch in self.watches.items():
+                by_group.setdefault(watch.group_id, set()).add(job_id)
+
+        changes = 0
+        for group_id, job_ids in by_group.items():
+            try:
+                jobs = self._find(group_id, job_ids)
+            except Exception as e:
+                logger.warning("Listing jobs of group %s failed: %s", group_id, e)
+                continue
+            for job in jobs:
+                changes += self._update(job)
+
+        if changes:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.max_interval, self.interval * self.backoff)
+        return changes
+
+    def _find(self, group_id, job_ids):
+        wanted = set(job_ids)
+        found = []
+        for job in self.list_jobs(group_id):
+            if job.get("id") in wanted:
+                wanted.discard(job["id"])
+                found.append(job)
+                if not wanted:
+                    break
+        # Jobs not in the listing at all, eg if the listing is filtered, are fetched one by one
+        for job_id in wanted:
+            try:
+                response = self.fetch_job(group_id, job_id)
+            except Exception as e:
+                # Like a transient error: the job is fetched again on the next tick
+                logger.warning("Fetching job %s failed: %s", job_id, e)
+                continue
+            if response.ok:
+                found.append(response.json())
+            elif is_permanent_error(response):
+                self._fail(job_id, response)
+            else:
+                logger.warning("Fetching job %s failed with status %s", job_id, response.status_code)
+        return found
+
+    def _fail(self, job_id, response):
+        # A job which cannot be fetched, eg a 404, would never resolve, so its future fails and it is no longer watched
+        with self.lock:
+            watch = self.watches.pop(job_id, None)
+        if watch is not None:
+            watch.future.set_exception(requests.HTTPError(
+                "{} Error for url: {}".format(response.status_code, response.url), response=response))
+
+    def _update(self, job):
+        with self.lock:
+            watch = self.watches.get(job.get("id"))
+            if watch is None or watch.status == job.get("status"):
+                return 0
+            old, watch.status, watch.job = watch.status, job.get("status"), job
+            final = watch.status in self.final_status
+            if final:
+                del self.watches[job["id"]]
+            callbacks = watch.callbacks + self.callbacks
+
+        for callback in callbacks:
+            try:
+                callback(job, old, watch.status)
+            except Exception:
+                logger.exception("Job watcher callback failed")
+        if final:
+            watch.future.set_result(job)
+        return 1
+
+    def run(self):
+        """
+        Poll until stop() is called.
+        """
+        while not self.stopped.is_set():
+            if self.watches:
+                self.poll()
+            # Sleep in 'min_interval' steps, so a watch() resetting the interval is picked up promptly
+            waited = 0.0
+            while waited < self.interval and not self.stopped.wait(self.min_interval):
+                waited += self.min_interval
+
+    def start(self):
+        """
+        Poll in a background thread.
+        """
+        if self.thread is None or not self.thread.is_alive():
+            self.stopped.clear()
+            self.thread = threading.Thread(target=self.run, name="athera-job-watcher")
+            self.thread.daemon = True
+            self.thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        """
+        Stop polling. The futures of jobs still watched are cancelled, as they would otherwise never resolve.
+        """
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+        with self.lock:
+            watches = list(self.watches.values())
+            self.watches.clear()
+        for watch in watches:
+            watch.future.cancel()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+class SessionBackoff(object):
+    """
+    Poll intervals for a session, fitted to its pending phase.
+
+    'phase_intervals': Dict of status -> seconds before the first repeat poll in that status.
+    'backoff':         Factor applied to the interval for each further poll in the same status.
+    'max_interval':    Upper bound for any interval. Also used for statuses without an entry.
+    """
+
+    def __init__(self, phase_intervals=None, backoff=DEFAULT_BACKOFF, max_interval=DEFAULT_SESSION_MAX_INTERVAL):
+        self.phase_intervals = dict(DEFAULT_PHASE_INTERVALS if phase_intervals is None else phase_intervals)
+        self.backoff = backoff
+        self.max_interval = max_interval
+
+    def interval(self, status, polls):
+        """
+        Seconds to wait after the 'polls'-th consecutive poll (0-based) which found the session in 'status'.
+        """
+        base = self.phase_intervals.get(status, self.max_interval)
+        return min(self.max_interval, base * self.backoff ** polls)
+
+
+class SessionState(object):
+    """
+    What a waiter knows about one session.
+    """
+    __slots__ = ("session_id", "group_id", "status", "session", "polls", "due")
+
+    def __init__(self, session_id, group_id, due):
+        self.session_id = session_id
+        self.group_id = group_id
+        self.status = None
+        self.session = None
+        self.polls = 0
+        self.due = due
+
+    def update(self, session, backoff, now):
+        """
+        Record a get_session body. Returns True once the session is done waiting, otherwise schedules the next poll.
+        """
+        status = session.get("status")
+        self.polls = self.polls + 1 if status == self.status else 0
+        self.status = status
+        self.session = session
+        if status in SESSION_DONE_STATUS:
+            return True
+        self.due = now + backoff.interval(status, self.polls)
+        return False
+
+    def retry(self, backoff, now):
+        """
+        Schedule another poll after a failed one.
+        """
+        self.polls += 1
+        self.due = now + backoff.interval(self.status, self.polls)
+
+
+def is_permanent_error(response):
+    """
+    Whether a failed get_session or get_job response will fail again if repeated, eg 403 or 404.
+    """
+    return response is not None and 400 <= response.status_code < 500 and response.status_code != 429
+
+
+class SessionWaiter(object):
+    """
+    Wait for many sessions to become READY, or to fail, with one polling thread.
+
+    'backoff':     A SessionBackoff.
+    'max_workers': get_session requests in flight at once when many sessions are due together.
+    """
+
+    def __init__(self, base_url, token, backoff=None, max_workers=bulk.DEFAULT_MAX_WORKERS, clock=time.time):
+        self.base_url = base_url
+        self.token = token
+        self.backoff = backoff if backoff is not None else SessionBackoff()
+        self.max_workers = max_workers
+        self.clock = clock
+
+        self.states = {}
+        self.futures = {}
+        self.queue = []
+        self.counter = itertools.count()
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def fetch_session(self, group_id, session_id):
+        """
+        Fetch a session. Override to change how sessions are fetched.
+        """
+        return sessions.get_session(self.base_url, group_id, self.token, session_id)
+
+    def add(self, group_id, session_id):
+        """
+        Start waiting for a session. Returns a concurrent.futures.Future resolved with the session once it is READY,
+        failed or terminated. The future raises requests.HTTPError if the session cannot be fetched, eg a 404.
+        """
+        with self.lock:
+            future = self.futures.get(session_id)
+            if future is not None:
+                return future
+            state = self.states[session_id] = SessionState(session_id, group_id, self.clock())
+            future = self.futures[session_id] = Future()
+            heapq.heappush(self.queue, (state.due, next(self.counter), session_id))
+        self.wakeup.set()
+        return future
+
+    def remove(self, session_id):
+        with self.lock:
+            self.states.pop(session_id, None)
+            future = self.futures.pop(session_id, None)
+        if future is not None:
+            future.cancel()
+
+    def state(self, session_id):
+        return self.states.get(session_id)
+
+    def poll(self):
+        """
+        Poll every session which is due. Returns the seconds until the next session is due, or None if none are left.
+        """
+        now = self.clock()
+        due = []
+        with self.lock:
+            while self.queue and self.queue[0][0] <= now:
+                _, _, session_id = heapq.heappop(self.queue)
+                if session_id in self.states:
+                    due.append(self.states[session_id])
+
+        def fetch(state):
+            return self.fetch_session(state.group_id, state.session_id)
+
+        for state, response, error in bulk.fetch_many(fetch, due, self.max_workers):
+            self._update(state, response, error)
+
+        with self.lock:
+            if not self.queue:
+                return None
+            return max(0.0, self.queue[0][0] - self.clock())
+
+    def _update(self, state, response, error):
+        now = self.clock()
+        done = False
+        if error is None:
+            done = state.update(response.json(), self.backoff, now)
+        elif is_permanent_error(response):
+            done = True
+        else:
+            logger.warning("Polling session %s failed: %s", state.session_id, error)
+            state.retry(self.backoff, now)
+
+        with self.lock:
+            if self.states.get(state.session_id) is not state:
+                return
+            if not done:
+                heapq.heappush(self.queue, (state.due, next(self.counter), state.session_id))
+                return
+            del self.states[state.session_id]
+            future = self.futures.pop(state.session_id)
+        if error is None:
+            future.set_result(state.session)
+        else:
+            future.set_exception(error)
+
+    def run(self):
+        """
+        Poll until stop() is called.
+        """
+        while not self.stopped.is_set():
+            self.wakeup.clear()
+            delay = self.poll()
+            self.wakeup.wait(delay)
+
+    def start(self):
+        """
+        Poll in a background thread.
+        """
+        if self.thread is None or not self.thread.is_alive():
+            self.stopped.clear()
+            self.thread = threading.Thread(target=self.run, name="athera-session-waiter")
+            self.thread.daemon = True
+            self.thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self.stopped.set()
+        self.wakeup.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def wait_for_sessions(base_url, group_id, token, session_ids, timeout=None, backoff=None,
+                      max_workers=bulk.DEFAULT_MAX_WORKERS):
+    """
+    Block until every session is READY, failed or terminated, or 'timeout' seconds have passed.
+    Returns a dict of session_id -> the last session seen, None for sessions which could not be fetched.
+    """
+    waiter = SessionWaiter(base_url, token, backoff, max_workers)
+    with waiter:
+        futures = dict((session_id, waiter.add(group_id, session_id)) for session_id in session_ids)
+        wait(list(futures.values()), timeout)
+
+    result = {}
+    for session_id, future in futures.items():
+        if future.done() and not future.cancelled() and future.exception() is None:
+            result[session_id] = future.result()
+        else:
+            state = waiter.state(session_id)
+            result[session_id] = state.session if state is not None else None
+    return result
+
+
+def wait_for_session(base_url, group_id, token, session_id, timeout=None, backoff=None):
+    """
+    Block until a session is READY, failed or terminated, or 'timeout' seconds have passed, and return the last
+    session seen. Check its status against athera.api.sessions.ready_status.
+    """
+    return wait_for_sessions(base_url, group_id, token, [session_id], timeout, backoff)[session_id]
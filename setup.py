@@ -13,4 +13,7 @@ setup(
     install_requires=[
         "requests",
     ],
+    extras_require={
+        "async": ["aiohttp"],
+    },
 )
@@ -0,0 +1,123 @@
+import unittest
+
+try:
+    from aiohttp import web
+    from aiohttp.test_utils import TestServer
+    from athera.api.async_client import AsyncClient
+except ImportError:
+    web = None
+
+import requests
+
+JOBS = [{"id": "job{}".format(i)} for i in range(5)]
+
+
+def make_app(calls):
+    """ A fake API: jobs listed two per page, and sessions which are READY on the second poll """
+    polls = {}
+
+    async def get_jobs(request):
+        calls.append(("GET", request.path, dict(request.query), dict(request.headers)))
+        page = int(request.query.get("page", 1))
+        size = int(request.query.get("pageSize", 2))
+        return web.json_response({
+            "jobs": JOBS[(page - 1) * size:page * size],
+            "pagination": {"page": page, "totalPages": -(-len(JOBS) // size)},
+        })
+
+    async def create_job(request):
+        calls.append(("POST", request.path, await request.json(), dict(request.headers)))
+        return web.json_response({"id": "new"})
+
+    async def get_job(request):
+        calls.append(("GET", request.path, None, dict(request.headers)))
+        if request.match_info["job_id"] == "missing":
+            return web.json_response({"message": "not found"}, status=404)
+        return web.json_response({"id": request.match_info["job_id"]})
+
+    async def get_session(request):
+        session_id = request.match_info["session_id"]
+        if session_id == "gone":
+            return web.json_response({}, status=404)
+        polls[session_id] = polls.get(session_id, 0) + 1
+        status = "READY" if polls[session_id] > 1 else "CREATED"
+        return web.json_response({"id": session_id, "status": status})
+
+    app = web.Application()
+    app.router.add_get("/api/v1/compute/jobs", get_jobs)
+    app.router.add_post("/api/v1/compute/jobs", create_job)
+    app.router.add_get("/api/v1/compute/jobs/{job_id}", get_job)
+    app.router.add_get("/api/v1/sessions/{session_id}", get_session)
+    return app
+
+
+@unittest.skipIf(web is None, "aiohttp is not installed")
+class AsyncClientTest(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.calls = []
+        self.server = TestServer(make_app(self.calls))
+        await self.server.start_server()
+        self.client = AsyncClient(str(self.server.make_url("/api/v1")), "token", "group", group_concurrency=2)
+
+    async def asyncTearDown(self):
+        await self.client.close()
+        await self.server.close()
+
+    async def test_get_job(self):
+        """ Positive test - the response body is read and the group headers are sent """
+        response = await self.client.get_job("job1")
+        self.assertTrue(response.ok)
+        self.assertEqual(response.json(), {"id": "job1"})
+        headers = self.calls[0][3]
+        self.assertEqual(headers["active-group"], "group")
+        self.assertEqual(headers["Authorization"], "Bearer: token")
+
+    async def test_get_job_missing(self):
+        """ Negative test - an error status is returned, and raise_for_status raises requests.HTTPError """
+        response = await self.client.get_job("missing")
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response)
+        with self.assertRaises(requests.HTTPError):
+            response.raise_for_status()
+
+    async def test_create_job_idempotency_key(self):
+        """ Positive test - the idempotency key is sent as a header, without changing the client's headers """
+        response = await self.client.create_job({"name": "shot"}, idempotency_key="batch-1")
+        self.assertEqual(response.json(), {"id": "new"})
+        method, _, body, headers = self.calls[0]
+        self.assertEqual((method, body), ("POST", {"name": "shot"}))
+        self.assertEqual(headers["Idempotency-Key"], "batch-1")
+        self.assertNotIn("Idempotency-Key", self.client.headers)
+
+    async def test_iter_jobs(self):
+        """ Positive test - every page is walked, with or without prefetch """
+        for prefetch in (True, False):
+            del self.calls[:]
+            jobs = [job async for job in self.client.iter_jobs(page_size=2, prefetch=prefetch)]
+            self.assertEqual(jobs, JOBS)
+            self.assertEqual([call[2].get("page") for call in self.calls], [None, "2", "3"])
+
+    async def test_wait_for_sessions(self):
+        """ Positive test - sessions are polled to READY, and a missing session ends as None """
+        result = await self.client.wait_for_sessions(["s1", "s2", "gone"], timeout=10)
+        self.assertEqual(result["s1"]["status"], "READY")
+        self.assertEqual(result["s2"]["status"], "READY")
+        self.assertIsNone(result["gone"])
+
+    async def test_for_group_shares_pool(self):
+        """ Positive test - clients for other groups share the pool and send their own group """
+        other = self.client.for_group("other")
+        self.assertIs(other.pool, self.client.pool)
+        await other.get_job("job1")
+        self.assertEqual(self.calls[0][3]["active-group"], "other")
+
+    async def test_for_group_close_keeps_pool(self):
+        """ Positive test - closing a client for another group leaves the shared pool open """
+        await self.client.get_job("job1")
+        other = self.client.for_group("other")
+        self.assertFalse(other.owns_pool)
+        await other.close()
+        self.assertIsNotNone(self.client.pool.session)
+        response = await self.client.get_job("job1")
+        self.assertTrue(response.ok)
@@ -0,0 +1,53 @@
+from fakes import FakeResponse
+from athera.api import bulk
+
+import unittest
+import threading
+import time
+
+
+class BulkTest(unittest.TestCase):
+
+    def test_fetch_many_reports_per_item(self):
+        """ Negative test - failures are reported per item, without stopping the others """
+        def fetch(item):
+            if item == "raise":
+                raise ValueError(item)
+            if item == "missing":
+                return FakeResponse(status_code=404)
+            return FakeResponse(status_code=200)
+
+        results = {item: (response, error) for item, response, error in
+                   bulk.fetch_many(fetch, ["a", "raise", "missing", "b"], max_workers=2)}
+        self.assertEqual(set(results), {"a", "b", "raise", "missing"})
+        self.assertIsNone(results["a"][1])
+        self.assertIsNone(results["raise"][0])
+        self.assertIsInstance(results["raise"][1], ValueError)
+        self.assertEqual(results["missing"][0].status_code, 404)
+        self.assertEqual(results["missing"][1].response.status_code, 404)
+
+    def test_fetch_many_is_bounded(self):
+        """ Positive test - no more than max_workers calls are in flight """
+        lock = threading.Lock()
+        state = {"in_flight": 0, "peak": 0}
+
+        def fetch(item):
+            with lock:
+                state["in_flight"] += 1
+                state["peak"] = max(state["peak"], state["in_flight"])
+            time.sleep(0.01)
+            with lock:
+                state["in_flight"] -= 1
+            return FakeResponse(status_code=200)
+
+        self.assertEqual(len(list(bulk.fetch_many(fetch, range(30), max_workers=3))), 30)
+        self.assertLessEqual(state["peak"], 3)
+
+    def test_fetch_many_streams_in_completion_order(self):
+        """ Positive test - a fast item is yielded before a slow one submitted earlier """
+        def fetch(item):
+            time.sleep(item)
+            return FakeResponse(status_code=200)
+
+        order = [item for item, response, error in bulk.fetch_many(fetch, [0.2, 0.0], max_workers=2)]
+        self.assertEqual(order, [0.0, 0.2])
@@ -0,0 +1,163 @@
+from fakes import Clock, FakeResponse, FakeSession
+from athera.api import apps, storage
+from athera.api.cache import ResponseCache
+from athera.api.transport import Transport
+
+import unittest
+
+
+class EtagSession(FakeSession):
+    """ Answers every request with status_code, and a request revalidating 'etag' with a 304 """
+    def __init__(self, status_code=200):
+        super(EtagSession, self).__init__()
+        self.status_code = status_code
+        self.etag = None
+
+    def request(self, method, url, **kwargs):
+        headers = kwargs.get("headers") or {}
+        self.calls.append((method, url, headers))
+        if self.etag:
+            if headers.get("If-None-Match") == self.etag:
+                return FakeResponse(status_code=304, headers={"ETag": self.etag})
+            return FakeResponse(status_code=self.status_code, headers={"ETag": self.etag}, content=b"x" * 100)
+        return FakeResponse(status_code=self.status_code, content=b"{}")
+
+
+class CacheTest(unittest.TestCase):
+    base_url = "https://api.example/api/v1"
+
+    def setUp(self):
+        self.clock = Clock()
+        self.cache = ResponseCache(max_entries=2, negative_ttl=10, clock=self.clock)
+        self.transport = Transport(cache=self.cache)
+        self.session = self.transport.session = EtagSession()
+
+    def get_app(self, app_id, group_id="group", token="token"):
+        url = self.base_url + apps.route_app.format(app_id=app_id)
+        return self.transport.get(url, route=apps.route_app, headers={"active-group": group_id, "Authorization": token})
+
+    def test_repeat_get_is_served_from_cache(self):
+        """ Positive test """
+        first = self.get_app("a")
+        second = self.get_app("a")
+        self.assertIs(first, second)
+        self.assertEqual(len(self.session.calls), 1)
+
+    def test_key_includes_group_and_token(self):
+        """ Positive test - a different group or token is a different entry """
+        self.get_app("a")
+        self.get_app("a", group_id="other")
+        self.get_app("a", token="other")
+        self.assertEqual(len(self.session.calls), 3)
+
+    def test_expiry(self):
+        """ Positive test - entries are fetched again after their TTL """
+        self.get_app("a")
+        self.clock.now += self.cache.ttls[apps.route_app] + 1
+        self.get_app("a")
+        self.assertEqual(len(self.session.calls), 2)
+
+    def test_lru_eviction(self):
+        """ Positive test - the least recently used entry is evicted first """
+        self.get_app("a")
+        self.get_app("b")
+        self.get_app("a")
+        self.get_app("c")
+        self.assertEqual(len(self.cache), 2)
+        self.get_app("a")
+        self.assertEqual(len(self.session.calls), 3)
+        self.get_app("b")
+        self.assertEqual(len(self.session.calls), 4)
+
+    def test_negative_caching(self):
+        """ Negative test - 404s are cached for negative_ttl only, 500s are never cached """
+        self.session.status_code = 404
+        self.get_app("missing")
+        self.get_app("missing")
+        self.assertEqual(len(self.session.calls), 1)
+        self.clock.now += 11
+        self.get_app("missing")
+        self.assertEqual(len(self.session.calls), 2)
+
+        self.session.status_code = 500
+        self.get_app("broken")
+        self.get_app("broken")
+        self.assertEqual(len(self.session.calls), 4)
+
+    def test_write_invalidates(self):
+        """ Positive test - creating a driver drops cached driver listings for every group """
+        headers = {"active-group": "group", "Authorization": "token"}
+        url = self.base_url + storage.route_drivers
+        self.transport.get(url, route=storage.route_drivers, headers=headers)
+        self.transport.get(url, route=storage.route_drivers, headers=dict(headers, **{"active-group": "child"}))
+        self.transport.post(self.base_url + storage.route_driver, route=storage.route_driver, headers=headers)
+        self.assertEqual(len(self.cache), 0)
+        self.transport.get(url, route=storage.route_drivers, headers=headers)
+        self.assertEqual(len(self.session.calls), 4)
+
+    def test_uncached_route(self):
+        """ Negative test - routes without a TTL always go to the API """
+        headers = {"active-group": "group", "Authorization": "token"}
+        url = self.base_url + "/compute/jobs"
+        self.transport.get(url, route="/compute/jobs", headers=headers)
+        self.transport.get(url, route="/compute/jobs", headers=headers)
+        self.assertEqual(len(self.session.calls), 2)
+
+    def test_conditional_revalidation(self):
+        """ Positive test - an expired entry with an ETag is revalidated, and a 304 serves the stored body """
+        self.session.etag = '"v1"'
+        first = self.get_app("a")
+        self.clock.now += self.cache.ttls[apps.route_app] + 1
+        second = self.get_app("a")
+        self.assertIs(first, second)
+        self.assertEqual(self.session.calls[1][2]["If-None-Match"], '"v1"')
+        stats = self.cache.stats()
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["revalidations"], 1)
+        self.assertEqual(stats["revalidated_bytes"], 100)
+
+        # Renewed, so served without a request until it expires again
+        self.get_app("a")
+        self.assertEqual(len(self.session.calls), 2)
+        self.assertEqual(self.cache.stats()["hits"], 1)
+
+    def test_conditional_changed(self):
+        """ Positive test - a changed resource is downloaded and replaces the stored body """
+        self.session.etag = '"v1"'
+        first = self.get_app("a")
+        self.clock.now += self.cache.ttls[apps.route_app] + 1
+        self.session.etag = '"v2"'
+        second = self.get_app("a")
+        self.assertIsNot(first, second)
+        self.assertEqual(self.cache.stats()["misses"], 2)
+
+    def test_evicted_during_revalidation(self):
+        """ Positive test - a 304 for an entry invalidated while the request was in flight serves the stale body """
+        self.session.etag = '"v1"'
+        first = self.get_app("a")
+        self.clock.now += self.cache.ttls[apps.route_app] + 1
+        request = self.session.request
+
+        def invalidate_then_request(method, url, **kwargs):
+            # A concurrent write drops the entry after the conditional request left
+            self.cache.clear()
+            return request(method, url, **kwargs)
+
+        self.session.request = invalidate_then_request
+        second = self.get_app("a")
+        self.assertEqual(self.session.calls[-1][2]["If-None-Match"], '"v1"')
+        self.assertIs(second, first)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(len(self.cache), 0)
+
+    def test_validate_uncached(self):
+        """ Positive test - uncached routes are always revalidated when validate_uncached is set """
+        self.cache.validate_uncached = True
+        self.session.etag = '"jobs"'
+        headers = {"active-group": "group", "Authorization": "token"}
+        url = self.base_url + "/compute/jobs"
+        first = self.transport.get(url, route="/compute/jobs", headers=headers)
+        second = self.transport.get(url, route="/compute/jobs", headers=headers)
+        self.assertIs(first, second)
+        self.assertEqual(len(self.session.calls), 2)
+        self.assertEqual(self.cache.stats()["revalidations"], 1)
@@ -0,0 +1,78 @@
+from settings import environment
+from athera.api.client import Client
+
+import unittest
+import uuid
+from requests import codes
+import os
+from unittest import mock
+
+
+class ClientCloseTest(unittest.TestCase):
+
+    def test_close_keeps_shared_transport(self):
+        """ Negative test - closing a client never closes a pool it was given or shares with siblings """
+        transport = mock.Mock()
+        client = Client("https://api.example", "token", "group", transport=transport)
+        client.for_group("other").close()
+        client.close()
+        transport.close.assert_not_called()
+
+    def test_close_owned_transport(self):
+        """ Positive test - a client closes the pool it created, and its siblings leave it open """
+        client = Client("https://api.example", "token", "group")
+        with mock.patch.object(client.transport, "close") as close:
+            client.for_group("other").close()
+            close.assert_not_called()
+            client.close()
+            close.assert_called_once_with()
+
+
+class ClientTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.token = os.getenv("ATHERA_API_TEST_TOKEN")
+        if not cls.token:
+            raise ValueError("ATHERA_API_TEST_TOKEN environment variable must be set")
+        cls.client = Client(
+            environment.ATHERA_API_TEST_BASE_URL,
+            cls.token,
+            environment.ATHERA_API_TEST_GROUP_ID,
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.client.close()
+
+    def test_get_orgs(self):
+        """ Positive test """
+        response = self.client.get_orgs()
+        self.assertEqual(response.status_code, codes.ok)
+        data = response.json()
+        self.assertNotEqual(len(data['groups']), 0)
+
+    def test_get_group(self):
+        """ Positive test """
+        response = self.client.get_group()
+        self.assertEqual(response.status_code, codes.ok)
+        group_data = response.json()
+        self.assertEqual(environment.ATHERA_API_TEST_GROUP_ID, group_data['id'])
+
+    def test_get_job(self):
+        """ Positive test - repeated calls reuse the client's pool """
+        for _ in range(3):
+            response = self.client.get_job(environment.ATHERA_API_TEST_JOB_ID)
+            self.assertEqual(response.status_code, codes.ok)
+            self.assertEqual(environment.ATHERA_API_TEST_JOB_ID, response.json()['id'])
+
+    def test_get_job_random_job_id(self):
+        """ Negative test - Confirm we respond correctly to a non-existent job id """
+        response = self.client.get_job(str(uuid.uuid4()))
+        self.assertEqual(response.status_code, codes.not_found)
+
+    def test_for_group_wrong_group(self):
+        """ Negative test - a sibling client for an inaccessible group is forbidden """
+        other = self.client.for_group(environment.ATHERA_API_TEST_OTHER_GROUP_ID)
+        self.assertIs(other.transport, self.client.transport)
+        response = other.get_jobs()
+        self.assertEqual(response.status_code, codes.forbidden)
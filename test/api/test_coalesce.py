@@ -0,0 +1,69 @@
+from athera.api.coalesce import SingleFlight
+
+import unittest
+import threading
+
+
+class SingleFlightTest(unittest.TestCase):
+
+    def run_concurrently(self, flight, key, func, count):
+        results = [None] * count
+        errors = [None] * count
+
+        def worker(i):
+            try:
+                results[i] = flight.do(key, func)
+            except Exception as e:
+                errors[i] = e
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+        for t in threads:
+            t.start()
+        return threads, results, errors
+
+    def test_concurrent_calls_share_one_result(self):
+        """ Positive test - one call is made and every caller gets its result """
+        flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def func():
+            calls.append(1)
+            release.wait(5)
+            return object()
+
+        threads, results, errors = self.run_concurrently(flight, "key", func, 20)
+        # Let every waiter join the flight before the leader finishes
+        while flight.coalesced < 19 and threads[0].is_alive():
+            threading.Event().wait(0.01)
+        release.set()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(r is results[0] for r in results))
+        self.assertEqual(flight.in_flight(), 0)
+
+    def test_errors_are_shared(self):
+        """ Negative test - every waiter sees the leader's exception """
+        flight = SingleFlight()
+        release = threading.Event()
+
+        def func():
+            release.wait(5)
+            raise ValueError("boom")
+
+        threads, results, errors = self.run_concurrently(flight, "key", func, 5)
+        while flight.coalesced < 4 and threads[0].is_alive():
+            threading.Event().wait(0.01)
+        release.set()
+        for t in threads:
+            t.join()
+        self.assertTrue(all(isinstance(e, ValueError) for e in errors))
+
+    def test_sequential_calls_are_not_coalesced(self):
+        """ Positive test - once a call has finished the next one runs again """
+        flight = SingleFlight()
+        self.assertEqual(flight.do("key", lambda: 1), 1)
+        self.assertEqual(flight.do("key", lambda: 2), 2)
+        self.assertEqual(flight.coalesced, 0)
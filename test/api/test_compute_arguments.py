@@ -0,0 +1,58 @@
+from athera.api import compute_arguments
+from athera.api.compute_arguments import ArgumentTemplate
+from athera.api.frames import FrameSet
+from athera.api.partition import plan_job
+
+import unittest
+
+
+class ComputeArgumentsTest(unittest.TestCase):
+
+    def test_expand_nuke(self):
+        """ Positive test - placeholders are replaced and other arguments kept """
+        template = ArgumentTemplate(compute_arguments.get_nuke_arguments("Write1"))
+        self.assertEqual(template.expand("/data/shot.nk", 1001, 1060),
+                         ["-X", "Write1", "/data/shot.nk", "1001-1060"])
+        self.assertEqual(template.placeholders, set(["FILE_PATH", "FRAME_RANGE_START", "FRAME_RANGE_FINISH"]))
+
+    def test_expand_splits(self):
+        """ Positive test - one argument list per split, with the increment """
+        template = ArgumentTemplate(compute_arguments.get_houdini_arguments("/out/mantra1"), prefix=["hython"])
+        result = template.expand_splits("/data/shot.hip", [(1, 10), (11, 20)], 2)
+        self.assertEqual(result[1], ["hython", "11", "20", "2", "/data/shot.hip", "/out/mantra1"])
+        self.assertEqual(len(result), 2)
+
+    def test_expand_plan(self):
+        """ Positive test - a partition plan expands to a command per part """
+        plan = plan_job(1, 100, 1, 60.0, node_budget=4)
+        result = ArgumentTemplate(compute_arguments.get_modo_arguments()).expand_plan(plan, "/data/scene.lxo")
+        self.assertEqual(len(result), plan.part_count)
+        self.assertEqual(result[0][2], "1")
+        self.assertEqual(result[-1][3], "100")
+
+    def test_expand_frames(self):
+        """ Positive test - a chunk which is not one range needs a part per range """
+        template = ArgumentTemplate(compute_arguments.get_katana_arguments("Render"))
+        result = template.expand_frames("/data/a.katana", FrameSet.parse("1-10,20-29"), 2)
+        self.assertEqual([arguments[-1] for arguments in result], ["1-10", "20-29"])
+        result = template.expand_frames("/data/a.katana", FrameSet.parse("1-10,20-29"), 3)
+        self.assertEqual([arguments[-1] for arguments in result], ["1-6", "7-10", "20-22", "23-29"])
+
+    def test_variables_and_braces(self):
+        """ Positive test - extra placeholders come from variables, and literal braces survive """
+        template = ArgumentTemplate(["{{OUTPUT}}/{{FRAME_RANGE_START}}.exr", "{not a placeholder}"],
+                                    variables={"OUTPUT": "/out"})
+        self.assertEqual(template.expand("/f", 5, 5), ["/out/5.exr", "{not a placeholder}"])
+
+    def test_unknown_placeholder(self):
+        """ Negative test - a placeholder without a value is rejected when compiled """
+        with self.assertRaises(ValueError):
+            ArgumentTemplate(["{{FRAME_RANGE_START}}", "{{OUTPUT}}"])
+
+    def test_format_command(self):
+        """ Positive test - arguments are quoted for display """
+        self.assertEqual(compute_arguments.format_command(["nuke", "-X", "Write 1"]), "nuke -X 'Write 1'")
+
+
+if __name__ == "__main__":
+    unittest.main()
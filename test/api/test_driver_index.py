@@ -0,0 +1,73 @@
+from fakes import FakeResponse
+from athera.api import hierarchy
+from athera.api.driver_index import DriverIndex
+
+import unittest
+
+# org -> team -> project, plus org -> other
+OWN = {
+    "org":     ["d-org"],
+    "team":    ["d-team1", "d-team2"],
+    "project": [],
+    "other":   ["d-other"],
+}
+
+
+class DriverIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tree = hierarchy.GroupTree()
+        self.tree.add({"id": "org"})
+        self.tree.add({"id": "team"}, "org")
+        self.tree.add({"id": "other"}, "org")
+        self.tree.add({"id": "project"}, "team")
+        self.calls = []
+
+    def fetch_drivers(self, group_id):
+        """ Like get_drivers: the group's own drivers followed by its ancestors' """
+        self.calls.append(group_id)
+        node = self.tree[group_id]
+        lineage = [node] + node.ancestors()
+        return FakeResponse({"drivers": [{"id": driver_id, "name": driver_id}
+                                         for group in lineage for driver_id in OWN[group.id]]})
+
+    def test_ownership_and_visibility(self):
+        """ Positive test - each group is fetched once and each driver stored once """
+        index = DriverIndex.build(self.tree, self.fetch_drivers, max_workers=2)
+        self.assertEqual(sorted(self.calls), ["org", "other", "project", "team"])
+        self.assertEqual(len(index), 4)
+        self.assertEqual(index.owner_of("d-org"), "org")
+        self.assertEqual(index.owner_of("d-team2"), "team")
+        self.assertEqual([d["id"] for d in index.own_drivers("team")], ["d-team1", "d-team2"])
+        self.assertEqual([d["id"] for d in index.own_drivers("project")], [])
+        self.assertEqual([d["id"] for d in index.visible_drivers("project")], ["d-team1", "d-team2", "d-org"])
+        self.assertEqual([d["id"] for d in index.inherited_drivers("team")], ["d-org"])
+        self.assertEqual(sorted(index.groups_seeing("d-team1")), ["project", "team"])
+        self.assertIs(index.visible_drivers("project")[-1], index.visible_drivers("other")[-1])
+
+    def test_group_field_wins(self):
+        """ Positive test - a driver's own group id field decides its owner """
+        index = DriverIndex()
+        index.add_group("org", None, [{"id": "d1", "groupId": "elsewhere"}, {"id": "d2"}])
+        self.assertEqual(index.owner_of("d1"), "elsewhere")
+        self.assertEqual(index.owner_of("d2"), "org")
+        self.assertEqual(index.visible_ids("org"), ["d2"])
+
+    def test_add_and_remove(self):
+        """ Positive test """
+        index = DriverIndex.build(self.tree, self.fetch_drivers)
+        index.add_driver("project", {"id": "d-new"})
+        self.assertEqual(index.visible_ids("project")[0], "d-new")
+        index.remove_driver("d-team1")
+        self.assertEqual(index.visible_ids("project"), ["d-new", "d-team2", "d-org"])
+
+    def test_failed_group(self):
+        """ Negative test - a failed fetch is recorded and the other groups are indexed """
+        def fetch_drivers(group_id):
+            if group_id == "other":
+                raise RuntimeError("boom")
+            return self.fetch_drivers(group_id)
+
+        index = DriverIndex.build(self.tree, fetch_drivers)
+        self.assertIsInstance(index.errors["other"], RuntimeError)
+        self.assertEqual(index.visible_ids("other"), ["d-org"])
@@ -0,0 +1,153 @@
+from athera.api.frames import FrameSet
+
+import random
+import unittest
+
+
+class FramesTest(unittest.TestCase):
+
+    def test_parse_format(self):
+        """ Positive test - text round trips, stepped ranges included """
+        frames = FrameSet.parse("1-100x2, 150,200-300")
+        self.assertEqual(len(frames), 50 + 1 + 101)
+        self.assertEqual(frames.format(), "1-99x2,150,200-300")
+        self.assertEqual(FrameSet.parse(frames.format()), frames)
+        self.assertEqual(FrameSet.parse("5,1-3,2-4").format(), "1-5")
+        self.assertEqual(FrameSet.parse("-10--8,0").format(), "-10--8,0")
+        self.assertEqual(FrameSet.parse("1,3").format(), "1,3")
+        self.assertEqual(FrameSet.parse("").format(), "")
+
+    def test_parse_invalid(self):
+        """ Negative test - malformed and descending ranges are rejected """
+        for text in ("a", "1-", "10-1", "1-10x0", "1-10y2"):
+            with self.assertRaises(ValueError):
+                FrameSet.parse(text)
+
+    def test_ranges(self):
+        """ Positive test - ranges give the fewest (start, finish, increment) triples """
+        frames = FrameSet.parse("1-9x2,20-30,40")
+        self.assertEqual(frames.ranges(), [(1, 9, 2), (20, 30, 1), (40, 40, 1)])
+        self.assertEqual(FrameSet.from_frame_range({"start": 1, "finish": 9, "increment": 2}), FrameSet.parse("1-9x2"))
+
+    def test_membership_and_index(self):
+        """ Positive test - membership and indexing follow the runs """
+        frames = FrameSet.parse("1-10,20-30")
+        self.assertIn(5, frames)
+        self.assertIn(20, frames)
+        self.assertNotIn(15, frames)
+        self.assertNotIn(0, frames)
+        self.assertEqual((frames[0], frames[10], frames[-1]), (1, 20, 30))
+        self.assertEqual((frames.first, frames.last), (1, 30))
+        with self.assertRaises(IndexError):
+            frames[21]
+
+    def test_algebra(self):
+        """ Positive test - set operations agree with Python sets """
+        rng = random.Random(7)
+        for _ in range(50):
+            a = set(rng.sample(range(200), 80))
+            b = set(rng.sample(range(200), 80))
+            fa, fb = FrameSet.from_frames(a), FrameSet.from_frames(b)
+            self.assertEqual(list(fa | fb), sorted(a | b))
+            self.assertEqual(list(fa & fb), sorted(a & b))
+            self.assertEqual(list(fa - fb), sorted(a - b))
+            self.assertEqual(list(fa ^ fb), sorted(a ^ b))
+            self.assertEqual(fa | fb, FrameSet.from_frames(a | b))
+
+    def test_split(self):
+        """ Positive test - chunks are consecutive, cover every frame and differ by at most one frame """
+        frames = FrameSet.parse("1-10,15,20-40x3,100-130")
+        chunks = frames.split(4)
+        self.assertEqual(len(chunks), 4)
+        self.assertEqual([frame for chunk in chunks for frame in chunk], list(frames))
+        sizes = [len(chunk) for chunk in chunks]
+        self.assertLessEqual(max(sizes) - min(sizes), 1)
+        self.assertEqual(len(FrameSet.parse("1-3").split(10)), 3)
+        with self.assertRaises(ValueError):
+            frames.split(0)
+
+    def test_large(self):
+        """ Positive test - millions of contiguous frames stay a handful of runs """
+        frames = FrameSet.from_range(1, 5000000)
+        holes = FrameSet.parse("100,2000000-2000100,4999999")
+        remaining = frames - holes
+        self.assertEqual(len(remaining), 5000000 - 103)
+        self.assertEqual(len(remaining.runs()), 4)
+        self.assertEqual(sum(len(chunk) for chunk in remaining.split(1000)), len(remaining))
+        self.assertNotIn(2000050, remaining)
+
+    def test_large_stepped(self):
+        """ Positive test - millions of stepped frames stay a handful of runs through parse, algebra and split """
+        odd = FrameSet.parse("1-4000000x2")
+        self.assertEqual(odd.ranges(), [(1, 3999999, 2)])
+        self.assertEqual(len(odd), 2000000)
+        self.assertEqual((odd[1000], odd[-1]), (2001, 3999999))
+        self.assertIn(3999999, odd)
+        self.assertNotIn(2000000, odd)
+        self.assertEqual((odd | FrameSet.parse("2-4000000x2")).ranges(), [(1, 4000000, 1)])
+        self.assertEqual((FrameSet.from_range(1, 4000000) - odd).ranges(), [(2, 4000000, 2)])
+        self.assertEqual((odd & FrameSet.parse("3-4000000x3")).ranges(), [(3, 3999999, 6)])
+        chunks = odd.split(1000)
+        self.assertEqual(chunks[1].ranges(), [(4001, 7999, 2)])
+        self.assertEqual(sum(len(chunk) for chunk in chunks), len(odd))
+
+    def test_large_phases(self):
+        """ Positive test - millions of frames with the same step in other phases combine as runs """
+        odd, even = FrameSet.parse("1-2000000x2"), FrameSet.parse("2-2000000x2")
+        self.assertEqual((odd - even).ranges(), [(1, 1999999, 2)])
+        self.assertFalse(odd & even)
+        first, second = FrameSet.parse("1-3000000x3"), FrameSet.parse("2-3000000x3")
+        self.assertEqual((first - second).ranges(), [(1, 2999998, 3)])
+        self.assertEqual((second - first).ranges(), [(2, 2999999, 3)])
+        self.assertFalse(first & second)
+        both = first | second
+        self.assertEqual(len(both), 2000000)
+        self.assertEqual(both.ranges()[:2], [(1, 2, 1), (4, 5, 1)])
+        self.assertEqual(both.ranges()[-1], (2999998, 2999999, 1))
+        self.assertEqual((FrameSet.parse("1-2000000x4") | FrameSet.parse("3-2000000x4")).ranges(), [(1, 1999999, 2)])
+
+    def test_large_lcm(self):
+        """ Positive test - millions of frames with different steps combine one period of their steps at a time """
+        twos, threes = FrameSet.parse("1-2000000x2"), FrameSet.parse("1-2000000x3")
+        union = twos | threes
+        self.assertEqual(len(union), 1333333)
+        self.assertEqual(union.ranges()[:4], [(1, 1, 1), (3, 5, 1), (7, 7, 1), (9, 11, 1)])
+        self.assertIn(1999999, union)
+        self.assertNotIn(1999998, union)
+        self.assertEqual((twos & threes).ranges(), [(1, 1999999, 6)])
+        difference = twos - threes
+        self.assertEqual(len(difference), 666666)
+        self.assertEqual(difference.ranges()[:3], [(3, 3, 1), (5, 5, 1), (9, 9, 1)])
+        # The union of a partial overlap keeps the stepped runs either side of it
+        tail = twos | FrameSet.parse("1000000-1500000x3")
+        self.assertEqual(tail.ranges()[:2], [(1, 999997, 2), (999999, 1000001, 1)])
+        self.assertEqual(tail.ranges()[-1], (1500001, 1999999, 2))
+        sparse = (FrameSet.parse("1-2000000x1000"), FrameSet.parse("1-2000000x1001"))
+        frames = (set(range(1, 2000001, 1000)), set(range(1, 2000001, 1001)))
+        self.assertEqual(sparse[0] ^ sparse[1], FrameSet.from_frames(frames[0] ^ frames[1]))
+
+    def test_stepped_algebra(self):
+        """ Positive test - set operations on stepped ranges agree with Python sets and give canonical runs """
+        rng = random.Random(11)
+        for _ in range(200):
+            texts, sets = [], []
+            for _ in range(2):
+                tokens, frames = [], set()
+                for _ in range(rng.randint(1, 4)):
+                    start = rng.randint(-5, 60)
+                    finish = start + rng.randint(0, 40)
+                    increment = rng.choice([1, 2, 3, 4, 7])
+                    tokens.append("{}-{}x{}".format(start, finish, increment))
+                    frames.update(range(start, finish + 1, increment))
+                texts.append(",".join(tokens))
+                sets.append(frames)
+            fa, fb = FrameSet.parse(texts[0]), FrameSet.parse(texts[1])
+            a, b = sets
+            self.assertEqual(fa, FrameSet.from_frames(a))
+            for result, expected in ((fa | fb, a | b), (fa & fb, a & b), (fa - fb, a - b), (fa ^ fb, a ^ b)):
+                self.assertEqual(list(result), sorted(expected))
+                self.assertEqual(result, FrameSet.from_frames(expected))
+
+
+if __name__ == "__main__":
+    unittest.main()
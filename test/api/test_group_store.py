@@ -0,0 +1,193 @@
+from fakes import Clock
+from athera.api.group_store import GroupStore
+
+import contextlib
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+_GROUP_ID = re.compile(r"(?:VALUES \('org', | id = )'([^']*)'")
+
+
+class FakeApi(object):
+    def __init__(self):
+        self.children = {"org": ["a", "b"], "a": ["a1"], "b": []}
+        self.calls = []
+        self.fail = set()
+
+    def fetch_root(self):
+        return {"id": "org", "name": "Org"}
+
+    def iter_children(self, group_id):
+        self.calls.append(group_id)
+        if group_id in self.fail:
+            raise RuntimeError("listing failed")
+        return [{"id": child, "name": child.upper()} for child in self.children.get(group_id, [])]
+
+
+class TracedStore(GroupStore):
+    """ Records the SQL statements writing to the groups table """
+    def __init__(self, *args, **kwargs):
+        self.writes = []
+        super(TracedStore, self).__init__(*args, **kwargs)
+
+    @contextlib.contextmanager
+    def transaction(self):
+        with super(TracedStore, self).transaction() as connection:
+            connection.set_trace_callback(self.trace)
+            yield connection
+
+    def trace(self, statement):
+        if statement.split(" ", 1)[0] in ("INSERT", "UPDATE", "DELETE") and " groups " in statement:
+            self.writes.append(statement)
+
+    def written(self, verb):
+        # The ids of the groups written by the statements starting with 'verb'
+        return sorted(_GROUP_ID.search(statement).group(1) for statement in self.writes if statement.startswith(verb))
+
+
+class GroupStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "groups.db")
+        self.clock = Clock()
+        self.api = FakeApi()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def store(self, store_class=GroupStore, **kwargs):
+        kwargs.setdefault("max_age", 60)
+        return store_class(self.path, "org", self.api.fetch_root, self.api.iter_children, clock=self.clock, **kwargs)
+
+    def test_first_load_crawls_and_persists(self):
+        """ Positive test - a second store loads from disk without any listing """
+        tree = self.store().load()
+        self.assertEqual(sorted(tree.nodes), ["a", "a1", "b", "org"])
+
+        self.api.calls = []
+        tree = self.store().load()
+        self.assertEqual(self.api.calls, [])
+        self.assertEqual(tree.lineage("a1"), ["org", "a", "a1"])
+        self.assertEqual(tree["a1"].name, "A1")
+
+    def test_stale_snapshot_refreshes_in_background(self):
+        """ Positive test - the old tree is returned at once and the refresh picks up changes """
+        self.store().load()
+        self.api.children["b"] = ["b1"]
+        self.api.children["a"] = []
+        self.clock.now += 61
+
+        store = self.store()
+        tree = store.load()
+        self.assertIn("a1", tree)
+        store.wait()
+        self.assertIsNone(store.error)
+        self.assertEqual(sorted(store.tree.nodes), ["a", "b", "b1", "org"])
+        self.assertEqual(sorted(self.store().load().nodes), ["a", "b", "b1", "org"])
+
+    def test_only_changed_rows_are_rewritten(self):
+        """ Positive test - unchanged groups keep their rows, removed subtrees are deleted """
+        store = self.store(TracedStore)
+        store.load()
+        self.assertEqual(store.written("INSERT"), ["a", "a1", "b", "org"])
+        self.api.children["a"] = []
+        self.clock.now += 61
+        store.writes = []
+        store.refresh()
+        # Only 'a' changed. 'org' and 'b' were listed again, unchanged, so just their check time is updated
+        self.assertEqual(store.written("INSERT"), ["a"])
+        self.assertEqual(store.written("DELETE"), ["a1"])
+        self.assertEqual(store.written("UPDATE"), ["b", "org"])
+        connection = sqlite3.connect(self.path)
+        rows = connection.execute("SELECT id FROM groups ORDER BY id").fetchall()
+        connection.close()
+        self.assertEqual([row[0] for row in rows], ["a", "b", "org"])
+
+    def test_fresh_groups_are_not_listed_again(self):
+        """ Positive test - groups checked within max_age are served from the snapshot """
+        store = self.store()
+        store.load()
+        self.api.calls = []
+        store.refresh()
+        self.assertEqual(self.api.calls, [])
+
+    def test_max_stale_blocks(self):
+        """ Positive test - beyond max_stale, load refreshes before returning """
+        self.store().load()
+        self.api.children["b"] = ["b1"]
+        self.clock.now += 120
+        tree = self.store(max_stale=90).load()
+        self.assertIn("b1", tree)
+
+    def test_max_stale_lists_every_stale_group(self):
+        """ Positive test - below max_age, load still lists again every group listed longer ago than max_stale """
+        store = self.store(max_age=300, max_stale=10)
+        store.load()
+        self.api.children["b"] = ["b1"]
+        self.api.calls = []
+        self.clock.now += 20
+        self.assertEqual(store.age(), 20)
+
+        tree = store.load()
+        self.assertEqual(sorted(self.api.calls), ["a", "a1", "b", "b1", "org"])
+        self.assertIn("b1", tree)
+        self.assertEqual(store.age(), 0)
+
+    def test_age_is_oldest_listing(self):
+        """ Positive test - a refresh listing only the groups due leaves age() at the least recently listed group """
+        self.api.children["org"] = ["g{}".format(i) for i in range(20)]
+        store = self.store(stagger=0.5)
+        store.load()
+        self.clock.now += 45
+        store.refresh()
+        self.assertEqual(store.age(), 45)
+
+    def test_failed_listing_keeps_subtree(self):
+        """ Negative test - a group whose listing fails keeps its previous children """
+        store = self.store()
+        store.load()
+        self.api.fail.add("a")
+        self.clock.now += 61
+        tree = store.refresh()
+        self.assertIn("a1", tree)
+
+    def test_rechecks_are_staggered(self):
+        """ Positive test - groups crawled together come due at different times, and refreshes list only those due """
+        self.api.children["org"] = ["g{}".format(i) for i in range(20)]
+        store = self.store(stagger=0.5)
+        store.load()
+        intervals = sorted(store.interval(group_id) for group_id in store.rows)
+        self.assertTrue(30 <= intervals[0] < intervals[-1] <= 60)
+        self.assertEqual(store.due_at, 1000.0 + intervals[0])
+
+        # Three quarters of max_age later only the groups due have their children listed again
+        self.api.calls = []
+        self.clock.now += 45
+        store.load()
+        store.wait()
+        due = sorted(group_id for group_id in store.rows if store.interval(group_id) <= 45)
+        self.assertEqual(sorted(self.api.calls), due)
+        self.assertTrue(0 < len(due) < len(store.rows))
+
+        # Those listed now come due again later than the rest
+        self.api.calls = []
+        self.clock.now += 16
+        store.refresh()
+        self.assertEqual(sorted(self.api.calls), sorted(set(store.rows) - set(due)))
+
+    def test_no_stagger(self):
+        """ Positive test - without stagger every group is listed again at once, max_age after the crawl """
+        store = self.store(stagger=0)
+        store.load()
+        self.api.calls = []
+        self.clock.now += 59
+        store.refresh()
+        self.assertEqual(self.api.calls, [])
+        self.clock.now += 1
+        store.refresh()
+        self.assertEqual(sorted(self.api.calls), ["a", "a1", "b", "org"])
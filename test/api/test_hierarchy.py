@@ -0,0 +1,84 @@
+from athera.api import hierarchy
+
+import threading
+import time
+import unittest
+
+# org -> a, b; a -> a1, a2; a1 -> a1x; b -> b1
+CHILDREN = {
+    "org": ["a", "b"],
+    "a":   ["a1", "a2"],
+    "a1":  ["a1x"],
+    "b":   ["b1"],
+}
+
+
+def group(group_id):
+    return {"id": group_id, "name": group_id.upper(), "type": "org" if group_id == "org" else "group"}
+
+
+class HierarchyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = []
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def iter_children(self, group_id):
+        with self.lock:
+            self.calls.append(group_id)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(0.01)
+        with self.lock:
+            self.in_flight -= 1
+        return [group(child) for child in CHILDREN.get(group_id, [])]
+
+    def test_crawl_builds_index(self):
+        """ Positive test - every group is fetched once and indexed with parent and depth """
+        tree = hierarchy.crawl(group("org"), self.iter_children, max_workers=4)
+        self.assertEqual(len(tree), 7)
+        self.assertEqual(sorted(self.calls), sorted(["org", "a", "b", "a1", "a2", "a1x", "b1"]))
+        self.assertEqual(tree["a1x"].depth, 3)
+        self.assertEqual(tree["a1x"].parent_id, "a1")
+        self.assertEqual(tree["a1x"].name, "A1X")
+        self.assertEqual(tree.lineage("a1x"), ["org", "a", "a1", "a1x"])
+        self.assertEqual([node.id for node in tree.ancestors("a1x")], ["a1", "a", "org"])
+        self.assertFalse(tree.errors)
+
+    def test_crawl_is_concurrent(self):
+        """ Positive test - siblings are listed in parallel, within max_workers """
+        hierarchy.crawl(group("org"), self.iter_children, max_workers=2)
+        self.assertEqual(self.max_in_flight, 2)
+
+    def test_queries(self):
+        """ Positive test """
+        tree = hierarchy.crawl(group("org"), self.iter_children)
+        self.assertEqual([node.id for node in tree.walk()], ["org", "a", "a1", "a1x", "a2", "b", "b1"])
+        self.assertEqual([node.id for node in tree][:3], ["org", "a", "b"])
+        self.assertEqual(sorted(node.id for node in tree.descendants("a")), ["a1", "a1x", "a2"])
+        self.assertEqual(sorted(node.id for node in tree.leaves()), ["a1x", "a2", "b1"])
+        self.assertTrue(tree.is_ancestor("org", "a1x"))
+        self.assertTrue(tree.is_ancestor("a", "a1x"))
+        self.assertFalse(tree.is_ancestor("b", "a1x"))
+        self.assertFalse(tree.is_ancestor("a1x", "a1x"))
+        self.assertEqual(tree.common_ancestor("a1x", "a2").id, "a")
+        self.assertEqual(tree.common_ancestor("a1x", "b1").id, "org")
+
+    def test_max_depth(self):
+        """ Positive test - nothing below max_depth is fetched """
+        tree = hierarchy.crawl(group("org"), self.iter_children, max_depth=1)
+        self.assertEqual(sorted(tree.nodes), ["a", "b", "org"])
+        self.assertEqual(self.calls, ["org"])
+
+    def test_failed_subtree(self):
+        """ Negative test - a failed listing is recorded and the rest of the tree is still crawled """
+        def iter_children(group_id):
+            if group_id == "a":
+                raise RuntimeError("boom")
+            return self.iter_children(group_id)
+
+        tree = hierarchy.crawl(group("org"), iter_children)
+        self.assertEqual(sorted(tree.nodes), ["a", "b", "b1", "org"])
+        self.assertIsInstance(tree.errors["a"], RuntimeError)
@@ -0,0 +1,132 @@
+from athera.api import job_store
+from athera.api.job_store import RecordStore
+
+import os
+import shutil
+import tempfile
+import unittest
+
+
+def job(job_id, status="CREATED", name=None, updated="2020-01-01T00:00:00Z", created="2020-01-01T00:00:00Z"):
+    return {"id": job_id, "status": status, "name": name or job_id, "updatedAt": updated, "createdAt": created}
+
+
+LISTING = [
+    job("j1", "RUNNING", "sh010", created="2020-01-01T00:00:00Z"),
+    job("j2", "CREATED", "sh020", created="2020-01-01T01:00:00Z"),
+    job("j3", "COMPLETE", "sh030", created="2020-01-01T02:00:00Z"),
+]
+
+
+class JobStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "jobs.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_deltas(self):
+        """ Positive test - only added, changed and removed records are reported """
+        store = RecordStore()
+        changes = store.apply(LISTING, scope="group")
+        self.assertEqual([change.kind for change in changes], ["added"] * 3)
+        self.assertEqual(store.apply(LISTING, scope="group"), [])
+
+        listing = [job("j1", "COMPLETE", "sh010", updated="2020-01-01T03:00:00Z"), LISTING[1],
+                   job("j4", name="sh040")]
+        changes = store.apply(listing, scope="group")
+        self.assertEqual(sorted((change.kind, change.id) for change in changes),
+                         [("added", "j4"), ("changed", "j1"), ("removed", "j3")])
+        changed = [change for change in changes if change.kind == "changed"][0]
+        self.assertEqual((changed.previous["status"], changed.record["status"]), ("RUNNING", "COMPLETE"))
+        self.assertEqual(len(store), 3)
+
+    def test_status_change_without_update_time(self):
+        """ Positive test - a status change is seen even if the update time did not move """
+        store = RecordStore()
+        store.apply(LISTING, scope="group")
+        changes = store.apply([job("j1", "COMPLETE", "sh010")] + LISTING[1:], scope="group")
+        self.assertEqual([change.id for change in changes], ["j1"])
+
+    def test_scopes(self):
+        """ Positive test - a complete listing only removes records of its own scope """
+        store = RecordStore()
+        store.apply([{"id": "p1", "status": "COMPLETE"}, {"id": "p2", "status": "RUNNING"}], scope="job-a")
+        store.apply([{"id": "p3", "status": "RUNNING"}], scope="job-b")
+        changes = store.apply([{"id": "p1", "status": "COMPLETE"}], scope="job-a")
+        self.assertEqual([(change.kind, change.id) for change in changes], [("removed", "p2")])
+        self.assertEqual([record["id"] for record in store.in_scope("job-b")], ["p3"])
+        self.assertEqual(store.apply([{"id": "p4"}], scope="job-a", complete=False)[0].kind, "added")
+        self.assertIn("p1", store)
+
+    def test_queries(self):
+        """ Positive test - indexes follow every change """
+        store = RecordStore()
+        store.apply(LISTING, scope="group")
+        self.assertEqual([record["id"] for record in store.by_status("RUNNING")], ["j1"])
+        self.assertEqual(sorted(record["id"] for record in store.by_status("RUNNING", "CREATED")), ["j1", "j2"])
+        self.assertEqual([record["id"] for record in store.by_name("sh020")], ["j2"])
+        self.assertEqual(sorted(record["id"] for record in store.match_name("sh0[12]*")), ["j1", "j2"])
+        start = 1577836800 + 1800
+        self.assertEqual([record["id"] for record in store.between(start)], ["j2", "j3"])
+        self.assertEqual([record["id"] for record in store.between(None, start)], ["j1"])
+
+        store.apply([job("j1", "COMPLETE", "sh010", updated="2020-01-01T05:00:00Z")] + LISTING[1:], scope="group")
+        self.assertEqual(store.by_status("RUNNING"), [])
+        self.assertEqual(sorted(record["id"] for record in store.by_status("COMPLETE")), ["j1", "j3"])
+        self.assertEqual([record["id"] for record in store.between(start + 3600, field="updated_at")], ["j1"])
+
+    def test_feed(self):
+        """ Positive test - the feed replays changes after a seq, and listeners are told """
+        seen = []
+        store = RecordStore(max_changes=4)
+        store.subscribe(seen.extend)
+        store.apply(LISTING, scope="group")
+        seq = store.seq
+        store.apply(LISTING[:2], scope="group")
+        self.assertEqual([(change.kind, change.id) for change in store.changes(seq)], [("removed", "j3")])
+        self.assertEqual(store.changes(store.seq), [])
+        self.assertEqual(len(seen), 4)
+
+    def test_feed_overflow(self):
+        """ Negative test - a reader behind the feed is told to start again """
+        store = RecordStore(max_changes=2)
+        store.apply(LISTING, scope="group")
+        self.assertIsNone(store.changes(0))
+        self.assertEqual(len(store.changes(1)), 2)
+
+    def test_persistence(self):
+        """ Positive test - records and seq survive a restart, and writes are incremental """
+        store = RecordStore(self.path)
+        store.apply(LISTING, scope="group")
+        store.apply(LISTING[:2], scope="group")
+
+        reopened = RecordStore(self.path)
+        self.assertEqual(len(reopened), 2)
+        self.assertEqual(reopened.seq, store.seq)
+        self.assertEqual([record["id"] for record in reopened.by_status("RUNNING")], ["j1"])
+        self.assertEqual(reopened.apply(LISTING[:2], scope="group"), [])
+
+    def test_sync_jobs_failure(self):
+        """ Negative test - a listing which fails part way changes nothing """
+        store = RecordStore()
+        store.apply(LISTING, scope="group")
+
+        def failing(base_url, group_id, token, page_size):
+            yield LISTING[0]
+            raise RuntimeError("page 2 failed")
+
+        original = job_store.iter_jobs
+        job_store.iter_jobs = failing
+        try:
+            with self.assertRaises(RuntimeError):
+                job_store.sync_jobs(store, "https://api.example", "group", "token")
+        finally:
+            job_store.iter_jobs = original
+        self.assertEqual(len(store), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+from fakes import FakeResponse
+from athera.api.launcher import SessionLauncher, LAUNCH_FAILED
+from athera.api.retry import RetryPolicy
+from athera.api.watchers import SessionBackoff, SessionWaiter
+
+import itertools
+import threading
+import unittest
+
+FAST = SessionBackoff({"CREATED": 0.001, "WAITING_FOR_CONTAINER": 0.001}, 2.0, 0.01)
+
+
+class FakePlatform(object):
+    """ Sessions become READY after one poll, except for users whose first sessions run out of capacity """
+    def __init__(self, exhausted=None, rejected=(), throttled=None, vanished=()):
+        self.exhausted = dict(exhausted or {})
+        self.rejected = set(rejected)
+        # Users whose sessions are gone, a 404, by the time they are polled
+        self.vanished = set(vanished)
+        self.throttled = dict(throttled or {})
+        self.sessions = {}
+        self.counter = itertools.count()
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.starts = []
+
+    def start_session(self, payload):
+        with self.lock:
+            user = payload["user_id"]
+            self.starts.append(user)
+            if user in self.rejected:
+                return FakeResponse({}, 400)
+            if self.throttled.get(user):
+                self.throttled[user] -= 1
+                return FakeResponse({}, 429)
+            session_id = "s{}".format(next(self.counter))
+            if user in self.vanished:
+                self.sessions[session_id] = None
+                return FakeResponse({"id": session_id, "status": "CREATED"})
+            final = "READY"
+            if self.exhausted.get(user):
+                self.exhausted[user] -= 1
+                final = "ALLOCATION_EXHAUSTED"
+            self.sessions[session_id] = ["CREATED", final]
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            return FakeResponse({"id": session_id, "status": "CREATED"})
+
+    def get_session(self, session_id):
+        with self.lock:
+            timeline = self.sessions[session_id]
+            if timeline is None:
+                return FakeResponse({}, 404)
+            status = timeline.pop(0) if len(timeline) > 1 else timeline[0]
+            if len(timeline) == 1 and status != "CREATED":
+                self.in_flight -= 1
+                timeline.append(status)
+            return FakeResponse({"id": session_id, "status": status})
+
+
+class FakeWaiter(SessionWaiter):
+    def __init__(self, platform):
+        super(FakeWaiter, self).__init__("https://api.example", "token", FAST)
+        self.platform = platform
+
+    def fetch_session(self, group_id, session_id):
+        return self.platform.get_session(session_id)
+
+
+class FakeLauncher(SessionLauncher):
+    def __init__(self, platform, **kwargs):
+        kwargs.setdefault("retry", RetryPolicy(max_attempts=3, backoff_factor=0.001, max_backoff=0.01))
+        super(FakeLauncher, self).__init__("https://api.example", "group", "token", waiter=FakeWaiter(platform),
+                                           **kwargs)
+        self.platform = platform
+
+    def start_session(self, payload):
+        return self.platform.start_session(payload)
+
+
+def payloads(count):
+    return dict(("user{}".format(i), {"user_id": "user{}".format(i)}) for i in range(count))
+
+
+class LauncherTest(unittest.TestCase):
+
+    def test_launch_all_ready(self):
+        """ Positive test - every session reaches READY and its time to READY is recorded """
+        platform = FakePlatform()
+        handle = FakeLauncher(platform, max_in_flight=3).launch(payloads(10))
+        self.assertTrue(handle.wait(10))
+        self.assertEqual(handle.counts(), {"READY": 10})
+        self.assertEqual(sorted(handle.time_to_ready()), sorted(payloads(10)))
+        self.assertLessEqual(platform.max_in_flight, 3)
+
+    def test_allocation_exhausted_is_retried(self):
+        """ Positive test - a session which runs out of capacity is started again """
+        platform = FakePlatform(exhausted={"user1": 1})
+        handle = FakeLauncher(platform).launch(payloads(3))
+        self.assertTrue(handle.wait(10))
+        self.assertEqual(handle.counts(), {"READY": 3})
+        self.assertEqual(platform.starts.count("user1"), 2)
+        self.assertEqual(handle.states["user1"].attempts, 2)
+
+    def test_retries_are_bounded(self):
+        """ Negative test - after max_attempts the failure status is kept """
+        platform = FakePlatform(exhausted={"user0": 5})
+        handle = FakeLauncher(platform).launch(payloads(1))
+        self.assertTrue(handle.wait(10))
+        self.assertEqual(handle.counts(), {"ALLOCATION_EXHAUSTED": 1})
+        self.assertEqual(len(handle.failed()), 1)
+        self.assertEqual(platform.starts.count("user0"), 3)
+
+    def test_rejected_start(self):
+        """ Negative test - a 400 from start_session is not retried """
+        platform = FakePlatform(rejected=["user0"])
+        handle = FakeLauncher(platform).launch(payloads(2))
+        self.assertTrue(handle.wait(10))
+        self.assertEqual(handle.counts(), {LAUNCH_FAILED: 1, "READY": 1})
+        self.assertEqual(platform.starts.count("user0"), 1)
+        self.assertIsNotNone(handle.states["user0"].error)
+
+    def test_vanished_session(self):
+        """ Negative test - a session which cannot be polled, eg a 404, is counted as failed """
+        platform = FakePlatform(vanished=["user0"])
+        handle = FakeLauncher(platform).launch(payloads(2))
+        self.assertTrue(handle.wait(10))
+        self.assertEqual(handle.counts(), {LAUNCH_FAILED: 1, "READY": 1})
+        self.assertEqual([state.key for state in handle.failed()], ["user0"])
+        self.assertEqual(handle.states["user0"].error.response.status_code, 404)
+
+    def test_throttled_start_is_retried(self):
+        """ Positive test - a 429 from start_session is retried """
+        platform = FakePlatform(throttled={"user0": 1})
+        handle = FakeLauncher(platform).launch(payloads(2))
+        self.assertTrue(handle.wait(10))
+        self.assertEqual(handle.counts(), {"READY": 2})
+        self.assertEqual(platform.starts.count("user0"), 2)
+        self.assertIsNone(handle.states["user0"].error)
@@ -0,0 +1,120 @@
+from fakes import FakeResponse, FakeSession
+from athera.api import apps, storage
+from athera.api.cache import ResponseCache
+from athera.api.metrics import Metrics, ERROR_STATUS, CACHE_HIT, COALESCED, REDACTED, redact
+from athera.api.retry import RetryPolicy
+from athera.api.transport import Transport
+
+import threading
+import unittest
+
+
+class MetricsTest(unittest.TestCase):
+
+    def test_counts_and_statuses(self):
+        """ Positive test - requests are counted per method, route and status """
+        metrics = Metrics()
+        metrics.observe("GET", "/jobs", "u", 0.01, response=FakeResponse(status_code=200))
+        metrics.observe("GET", "/jobs", "u", 0.02, response=FakeResponse(status_code=404))
+        metrics.observe("GET", "/jobs", "u", 0.03, error=IOError("down"))
+        metrics.observe("POST", "/jobs", "u", 0.04, response=FakeResponse(status_code=200))
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot[("GET", "/jobs")]["count"], 3)
+        self.assertEqual(snapshot[("GET", "/jobs")]["statuses"], {200: 1, 404: 1, ERROR_STATUS: 1})
+        self.assertEqual(snapshot[("POST", "/jobs")]["count"], 1)
+
+    def test_quantiles(self):
+        """ Positive test - quantiles are estimated within the right histogram bucket """
+        metrics = Metrics(buckets=(0.1, 1.0, 10.0))
+        for _ in range(90):
+            metrics.observe("GET", "/jobs", "u", 0.05, response=FakeResponse(status_code=200))
+        for _ in range(10):
+            metrics.observe("GET", "/jobs", "u", 5.0, response=FakeResponse(status_code=200))
+        stats = metrics.snapshot()[("GET", "/jobs")]
+        self.assertLessEqual(stats["p50"], 0.1)
+        self.assertGreater(stats["p95"], 1.0)
+        self.assertLessEqual(stats["p99"], 5.0)
+        self.assertEqual(stats["max"], 5.0)
+
+    def test_prometheus(self):
+        """ Positive test - histogram buckets are cumulative and end with +Inf """
+        metrics = Metrics(buckets=(0.1, 1.0))
+        metrics.observe("GET", "/jobs", "u", 0.05, response=FakeResponse(status_code=200))
+        metrics.observe("GET", "/jobs", "u", 3.0, response=FakeResponse(status_code=200))
+        text = metrics.prometheus()
+        self.assertIn('athera_api_requests_total{method="GET",route="/jobs",status="200"} 2', text)
+        self.assertIn('athera_api_request_duration_seconds_bucket{method="GET",route="/jobs",le="0.1"} 1', text)
+        self.assertIn('athera_api_request_duration_seconds_bucket{method="GET",route="/jobs",le="+Inf"} 2', text)
+        self.assertIn('athera_api_request_duration_seconds_count{method="GET",route="/jobs"} 2', text)
+
+    def test_sampled_logging(self):
+        """ Positive test - a sample rate of 1 logs every request at DEBUG, with its response body """
+        metrics = Metrics(log_sample_rate=1.0)
+        response = FakeResponse(status_code=200, content=b'{"id": "job1"}')
+        with self.assertLogs("athera.api", level="DEBUG") as logs:
+            metrics.observe("POST", "/jobs", "https://api/jobs", 0.5, response=response, body={"a": 1})
+        self.assertEqual([record.levelname for record in logs.records], ["DEBUG"] * 3)
+        self.assertIn("POST https://api/jobs [200]", logs.output[0])
+        self.assertIn("{'a': 1}", logs.output[1])
+        self.assertIn("{'id': 'job1'}", logs.output[2])
+
+    def test_logging_redacts_secrets(self):
+        """ Positive test - secret fields of the request and response bodies are never logged """
+        metrics = Metrics(log_sample_rate=1.0)
+        body = storage.create_gcs_storage_driver_request("bucket", "bucket-id", "hunter2")
+        response = FakeResponse(status_code=200, content=b'{"token": "abc", "items": [{"password": "pw"}]}')
+        with self.assertLogs("athera.api", level="DEBUG") as logs:
+            metrics.observe("POST", "/drivers", "https://api/drivers", 0.5, response=response, body=body)
+        output = "\n".join(logs.output)
+        for secret in ("hunter2", "abc", "pw"):
+            self.assertNotIn(secret, output)
+        self.assertIn("'client_secret': '<redacted>'", logs.output[1])
+        self.assertEqual(redact([{"Authorization": "Bearer: x", "name": "n"}]),
+                         [{"Authorization": REDACTED, "name": "n"}])
+
+    def test_logging_truncates_bodies(self):
+        """ Positive test - long and non JSON response bodies are cut to log_body_length """
+        metrics = Metrics(log_sample_rate=1.0, log_body_length=10)
+        with self.assertLogs("athera.api", level="DEBUG") as logs:
+            metrics.observe("GET", "/jobs", "https://api/jobs", 0.5, response=FakeResponse(content=b"x" * 50))
+        self.assertEqual(logs.output[1].split("Response: ")[1], "x" * 10 + "...")
+
+    def test_transport_records_each_attempt(self):
+        """ Positive test - every retry is recorded as a request of its own """
+        transport = Transport(retry=RetryPolicy(sleep=lambda seconds: None), metrics=Metrics())
+        transport.session = FakeSession([503, 503, 200])
+        transport.get("https://api/apps/a", route=apps.route_app)
+        stats = transport.metrics.snapshot()[("GET", apps.route_app)]
+        self.assertEqual(stats["count"], 3)
+        self.assertEqual(stats["statuses"], {503: 2, 200: 1})
+        self.assertEqual(stats["served"], {})
+
+    def test_transport_counts_cache_hits_apart(self):
+        """ Positive test - a cache hit is counted as served, not as a request """
+        transport = Transport(cache=ResponseCache(), metrics=Metrics())
+        transport.session = FakeSession([200])
+        for _ in range(3):
+            transport.get("https://api/apps/a", route=apps.route_app)
+        stats = transport.metrics.snapshot()[("GET", apps.route_app)]
+        self.assertEqual(stats["count"], 1)
+        self.assertEqual(stats["served"], {CACHE_HIT: 2})
+        self.assertIn('athera_api_served_total{method="GET",route="/apps/{app_id}",source="cache"} 2',
+                      transport.metrics.prometheus())
+
+    def test_transport_counts_coalesced_apart(self):
+        """ Positive test - callers sharing an in-flight request are counted as served, not as requests """
+        release = threading.Event()
+        transport = Transport(coalesce=True, metrics=Metrics())
+        transport.session = FakeSession([200], release)
+        threads = [threading.Thread(target=transport.get, args=("https://api/apps/a", apps.route_app))
+                   for _ in range(5)]
+        for t in threads:
+            t.start()
+        while transport.single_flight.coalesced < 4:
+            threading.Event().wait(0.01)
+        release.set()
+        for t in threads:
+            t.join()
+        stats = transport.metrics.snapshot()[("GET", apps.route_app)]
+        self.assertEqual(stats["count"], 1)
+        self.assertEqual(stats["served"], {COALESCED: 4})
@@ -0,0 +1,67 @@
+from fakes import FakeResponse
+from athera.api import models
+
+import unittest
+from datetime import datetime
+
+
+class ModelsTest(unittest.TestCase):
+
+    def test_fields(self):
+        """ Positive test - fields are read from their JSON keys, missing ones are None """
+        job = models.Job({"id": "j1", "name": "shot010", "status": "ACTIVE", "appID": "a1"})
+        self.assertEqual(job.id, "j1")
+        self.assertEqual(job.status, "ACTIVE")
+        self.assertEqual(job.app_id, "a1")
+        self.assertIsNone(job.region)
+        self.assertFalse(hasattr(job, "__dict__"))
+
+    def test_lazy_decode(self):
+        """ Positive test - timestamps are decoded on first access only """
+        job = models.Job({"id": "j1", "createdAt": "2018-10-01T12:30:00.250+01:00"})
+        self.assertEqual(job._created_at, "2018-10-01T12:30:00.250+01:00")
+        created = job.created_at
+        self.assertEqual(created, datetime(2018, 10, 1, 11, 30, 0, 250000))
+        self.assertIs(job.created_at, created)
+
+    def test_nested_models(self):
+        """ Positive test - driver mounts are decoded to Mount models """
+        driver = models.Driver({"id": "d1", "name": "Dropbox", "type": "Dropbox",
+                                "mounts": [{"id": "m1", "mountLocation": "/data/dropbox"}]})
+        self.assertEqual(driver.mounts[0].mount_location, "/data/dropbox")
+
+    def test_app_family(self):
+        """ Positive test - apps are read as {type: {version: app_id}}, as get_app_families returns them """
+        family = models.AppFamily({
+            "id": "f1",
+            "name": "Nuke",
+            "apps": {
+                "interactive": {"11.3v1": "app-i113", "12.0v3": "app-i120"},
+                "compute": {"12.0v3": "app-c120"},
+            },
+        })
+        self.assertEqual(family.apps["interactive"]["12.0v3"], "app-i120")
+        self.assertEqual(family.apps["compute"], {"12.0v3": "app-c120"})
+        self.assertIsNone(models.AppFamily({"id": "f2", "name": "Empty"}).apps)
+
+    def test_extra_fields(self):
+        """ Positive test - undeclared fields are kept unless keep_extra is False """
+        group = models.Group({"id": "g1", "name": "Org", "colour": "blue"})
+        self.assertEqual(group.get("colour"), "blue")
+        self.assertEqual(group.get("name"), "Org")
+        self.assertIsNone(models.Group({"id": "g1", "colour": "blue"}, keep_extra=False).get("colour"))
+
+    def test_from_response(self):
+        """ Positive test - lists and single objects """
+        parts = models.from_response(FakeResponse({"parts": [{"id": "p1", "frameRange": {"start": 1, "finish": 10}}]}),
+                                     models.Part, "parts")
+        self.assertEqual(parts[0].frame_start, 1)
+        self.assertEqual(parts[0].frame_finish, 10)
+        session = models.from_response(FakeResponse({"id": "s1", "status": "READY"}), models.Session)
+        self.assertEqual(session.status, "READY")
+
+    def test_parse_time(self):
+        """ Positive and negative test """
+        self.assertEqual(models.parse_time("2018-10-01T12:30:00Z"), datetime(2018, 10, 1, 12, 30))
+        self.assertEqual(models.parse_time(0), datetime(1970, 1, 1))
+        self.assertEqual(models.parse_time("yesterday"), "yesterday")
@@ -0,0 +1,72 @@
+from fakes import FakeResponse
+from athera.api import pagination
+
+import unittest
+import threading
+
+
+class PaginationTest(unittest.TestCase):
+
+    def make_fetch(self, pages, calls):
+        def fetch(page, page_size):
+            calls.append(page)
+            index = (page or 1) - 1
+            return FakeResponse({
+                "jobs": pages[index],
+                "pagination": {"page": index + 1, "totalPages": len(pages)},
+            })
+        return fetch
+
+    def test_next_page(self):
+        """ Positive test - the supported pagination shapes """
+        self.assertEqual(pagination.next_page({"page": 1, "totalPages": 3}, 1), 2)
+        self.assertIsNone(pagination.next_page({"page": 3, "totalPages": 3}, 3))
+        self.assertEqual(pagination.next_page({"total": 25, "pageSize": 10}, 2), 3)
+        self.assertIsNone(pagination.next_page({"total": 25, "pageSize": 10}, 3))
+        self.assertEqual(pagination.next_page({"nextPage": 4}, 1), 4)
+        self.assertIsNone(pagination.next_page({"nextPage": None, "page": 1, "totalPages": 3}, 1))
+        self.assertIsNone(pagination.next_page(None, 1))
+
+    def test_next_page_not_a_number(self):
+        """ Negative test - values which are not page numbers, eg a URL, end the walk instead of being sent back """
+        self.assertIsNone(pagination.next_page({"nextPage": "https://api.example/jobs?page=2"}, 1))
+        self.assertIsNone(pagination.next_page({"next": "https://api.example/jobs?page=2"}, 1))
+        self.assertIsNone(pagination.next_page({"page": "1", "totalPages": "3"}, 1))
+        self.assertIsNone(pagination.next_page({"page": 1, "totalPages": True}, 1))
+
+    def test_paginate_all_pages(self):
+        """ Positive test - every item of every page is yielded in order """
+        calls = []
+        fetch = self.make_fetch([[1, 2], [3, 4], [5]], calls)
+        self.assertEqual(list(pagination.paginate(fetch, "jobs")), [1, 2, 3, 4, 5])
+        self.assertEqual(calls, [None, 2, 3])
+
+    def test_paginate_without_prefetch(self):
+        """ Positive test """
+        calls = []
+        fetch = self.make_fetch([[1], [2]], calls)
+        self.assertEqual(list(pagination.paginate(fetch, "jobs", prefetch=False)), [1, 2])
+
+    def test_paginate_prefetches_next_page(self):
+        """ Positive test - page 2 is requested before page 1 has been consumed """
+        fetched = threading.Event()
+        calls = []
+        inner = self.make_fetch([[1], [2]], calls)
+
+        def fetch(page, page_size):
+            response = inner(page, page_size)
+            if page == 2:
+                fetched.set()
+            return response
+
+        items = pagination.paginate(fetch, "jobs")
+        self.assertEqual(next(items), 1)
+        self.assertTrue(fetched.wait(5))
+        self.assertEqual(list(items), [2])
+
+    def test_paginate_stops_on_empty_page(self):
+        """ Negative test - an empty page ends the walk even if more pages are advertised """
+        calls = []
+        fetch = self.make_fetch([[], [1]], calls)
+        self.assertEqual(list(pagination.paginate(fetch, "jobs")), [])
+        self.assertEqual(calls, [None])
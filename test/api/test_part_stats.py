@@ -0,0 +1,104 @@
+from fakes import FakeResponse
+from athera.api import models, part_stats
+from athera.api.part_stats import PartTable
+
+import unittest
+from unittest import mock
+
+
+def part(part_id, start, finish, status="COMPLETE", started=None, finished=None):
+    data = {"id": part_id, "status": status, "frameRange": {"start": start, "finish": finish, "increment": 1}}
+    if started is not None:
+        data["startedAt"] = "2020-01-01T00:{:02d}:00Z".format(started)
+    if finished is not None:
+        data["finishedAt"] = "2020-01-01T00:{:02d}:00Z".format(finished)
+    return data
+
+
+JOB_A = [
+    part("a1", 1, 10, started=0, finished=10),
+    part("a2", 11, 20, started=0, finished=20),
+    part("a3", 21, 30, "RUNNING", started=10),
+    part("a4", 31, 40, "CREATED"),
+]
+JOB_B = [
+    part("b1", 1, 5, started=0, finished=5),
+    part("b2", 6, 10, "FAILED", started=0, finished=1),
+]
+
+
+class PartStatsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.table = PartTable().add_parts("a", JOB_A).add_parts("b", JOB_B)
+
+    def test_progress(self):
+        """ Positive test - frames rendered and completion per job and overall """
+        self.assertEqual(len(self.table), 6)
+        self.assertEqual(self.table.frame_totals("a"), (20, 40))
+        self.assertEqual(self.table.completion("a"), 50.0)
+        self.assertEqual(self.table.frame_totals(), (25, 50))
+        self.assertEqual(self.table.counts("b"), {"COMPLETE": 1, "FAILED": 1})
+
+    def test_throughput_and_eta(self):
+        """ Positive test - throughput spans the first start to the last finish """
+        self.assertEqual(self.table.throughput("a"), 20 / 1200.0)
+        self.assertEqual(self.table.eta("a"), 20 / (20 / 1200.0))
+        done = PartTable.from_parts("c", JOB_A[:2])
+        self.assertEqual(done.eta("c"), 0.0)
+
+    def test_percentiles(self):
+        """ Positive test - durations of complete parts only, interpolated """
+        self.assertEqual(self.table.durations("a"), [600.0, 1200.0])
+        self.assertEqual(self.table.percentiles([0, 50, 100], "a"), {0: 600.0, 50: 900.0, 100: 1200.0})
+        self.assertEqual(self.table.durations(), [300.0, 600.0, 1200.0])
+
+    def test_summary(self):
+        """ Positive test - the summary gathers every figure """
+        summary = self.table.summary("a", now=1000.0)
+        self.assertEqual(summary["parts"], 4)
+        self.assertEqual(summary["completion"], 50.0)
+        self.assertEqual(summary["finish_at"], 1000.0 + summary["eta"])
+
+    def test_unknown(self):
+        """ Negative test - jobs without parts or timings give no estimates """
+        self.assertIsNone(self.table.completion("missing"))
+        self.assertIsNone(self.table.throughput("missing"))
+        self.assertEqual(self.table.percentiles([50], "missing"), {50: None})
+        table = PartTable.from_parts("c", [part("c1", 1, 10, "CREATED")])
+        self.assertIsNone(table.eta("c"))
+
+    def test_replace_job(self):
+        """ Positive test - adding a job again replaces its parts """
+        self.table.add_parts("a", JOB_A[:1])
+        self.assertEqual(len(self.table), 3)
+        self.assertEqual(self.table.frame_totals("a"), (10, 10))
+        self.assertEqual(self.table.frame_totals("b"), (5, 10))
+
+    def test_dicts_skip_models(self):
+        """ Positive test - dicts are read directly, without building a model per part """
+        with mock.patch.object(part_stats.models, "Part", None):
+            table = PartTable.from_parts("a", JOB_A)
+        self.assertEqual(table.frame_totals("a"), (20, 40))
+
+    def test_models(self):
+        """ Positive test - Part models give the same figures as dicts """
+        table = PartTable.from_parts("a", models.Part.from_list(JOB_A))
+        self.assertEqual(table.summary("a", now=0), self.table.summary("a", now=0))
+
+    def test_load_parts(self):
+        """ Positive test - parts of many jobs load concurrently, failures are recorded """
+        responses = {"a": FakeResponse({"parts": JOB_A}), "b": FakeResponse({"parts": JOB_B}),
+                     "c": FakeResponse({}, 404)}
+
+        def get_parts_for_jobs(base_url, group_id, token, job_ids, max_workers):
+            return part_stats.bulk.fetch_many(responses.get, job_ids, max_workers)
+
+        with mock.patch.object(part_stats.bulk, "get_parts_for_jobs", get_parts_for_jobs):
+            table = part_stats.load_parts("https://api.example", "group", "token", ["a", "b", "c"])
+        self.assertEqual(len(table), 6)
+        self.assertEqual(list(table.errors), ["c"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+from athera.api import partition
+
+import unittest
+
+
+def part(start, finish, started, finished):
+    return {
+        "id": "{}-{}".format(start, finish),
+        "frameRange": {"start": start, "finish": finish, "increment": 1},
+        "startedAt": "2020-01-01T00:{:02d}:00Z".format(started),
+        "finishedAt": "2020-01-01T00:{:02d}:00Z".format(finished),
+    }
+
+
+class PartitionTest(unittest.TestCase):
+
+    def test_splits_cover_range(self):
+        """ Positive test - splits are contiguous, non-empty and cover every frame """
+        plan = partition.plan_job(1, 100, 1, 10.0, node_budget=4)
+        self.assertEqual(plan.splits[0][0], 1)
+        self.assertEqual(plan.splits[-1][1], 100)
+        for (_, finish), (start, _) in zip(plan.splits, plan.splits[1:]):
+            self.assertEqual(start, finish + 1)
+        self.assertEqual(plan.part_count, len(plan.splits))
+        self.assertLessEqual(plan.node_count, 4)
+
+    def test_uses_budget_for_expensive_frames(self):
+        """ Positive test - expensive frames spread over every node, one part each """
+        plan = partition.plan_job(1, 100, 1, 60.0, node_budget=4, part_overhead=30, node_overhead=0)
+        self.assertEqual((plan.node_count, plan.part_count), (4, 4))
+        self.assertEqual(plan.wall_time, 30 + 25 * 60.0)
+
+    def test_overhead_limits_parts(self):
+        """ Positive test - parts beyond one per node only pay off when the overhead is small """
+        plan = partition.plan_job(1, 10, 1, 1.0, node_budget=1, part_overhead=100, node_overhead=0)
+        self.assertEqual((plan.node_count, plan.part_count), (1, 1))
+        # Two expensive frames at the end: smaller parts stop one node from taking both
+        costs = [10.0] * 8 + [100.0] * 2
+        plan = partition.plan_job(1, 10, 1, costs, node_budget=2, part_overhead=1, node_overhead=0)
+        self.assertEqual(plan.node_count, 2)
+        self.assertGreater(plan.part_count, 2)
+        self.assertLess(plan.wall_time, 200)
+
+    def test_increment(self):
+        """ Positive test - splits land on frames of the range """
+        plan = partition.plan_job(1, 19, 2, 50.0, node_budget=2, part_overhead=0, node_overhead=0)
+        self.assertEqual(plan.splits, [(1, 9), (11, 19)])
+
+    def test_cost_balance(self):
+        """ Positive test - balance='cost' cuts where the cost, not the frame count, is halved """
+        costs = [1.0] * 8 + [7.0] * 2
+        plan = partition.plan_job(1, 10, 1, costs, node_budget=2, part_overhead=0, node_overhead=0,
+                                  max_parts_per_node=1, balance="cost")
+        self.assertEqual(plan.splits, [(1, 9), (10, 10)])
+        even = partition.plan_job(1, 10, 1, costs, node_budget=2, part_overhead=0, node_overhead=0,
+                                  max_parts_per_node=1)
+        self.assertEqual(even.splits, [(1, 5), (6, 10)])
+        self.assertLess(plan.wall_time, even.wall_time)
+
+    def test_makespan(self):
+        """ Positive test - parts go to the first free node in order """
+        self.assertEqual(partition.makespan([5, 3, 3, 3], 2), 8)
+        self.assertEqual(partition.makespan([5], 4), 5)
+
+    def test_costs_from_parts(self):
+        """ Positive test - per-frame cost follows the part that rendered each frame """
+        cost = partition.costs_from_parts([part(1, 10, 0, 10), part(11, 20, 10, 40)])
+        self.assertEqual(cost(5), 60.0)
+        self.assertEqual(cost(15), 180.0)
+        self.assertEqual(cost(50), 120.0)
+
+    def test_costs_from_parts_overhead(self):
+        """ Positive test - part overhead is removed before the per-frame rate """
+        cost = partition.costs_from_parts([part(1, 10, 0, 10)], part_overhead=300)
+        self.assertEqual(cost(1), 30.0)
+
+    def test_costs_from_parts_unfinished(self):
+        """ Negative test - parts without timings give no estimate unless a default is given """
+        unfinished = {"id": "p", "frameRange": {"start": 1, "finish": 10, "increment": 1}}
+        with self.assertRaises(ValueError):
+            partition.costs_from_parts([unfinished])
+        self.assertEqual(partition.costs_from_parts([unfinished], default=12.0)(3), 12.0)
+
+    def test_bad_input(self):
+        """ Negative test - empty ranges, budgets and mismatched cost lists are rejected """
+        with self.assertRaises(ValueError):
+            partition.plan_job(10, 1, 1, 1.0, node_budget=2)
+        with self.assertRaises(ValueError):
+            partition.plan_job(1, 10, 1, 1.0, node_budget=0)
+        with self.assertRaises(ValueError):
+            partition.plan_job(1, 10, 1, [1.0, 2.0], node_budget=2)
+        with self.assertRaises(ValueError):
+            partition.plan_job(1, 10, 1, 1.0, node_budget=2, balance="random")
+
+    def test_make_job_request(self):
+        """ Positive test - the plan fills part and node counts of the payload """
+        plan = partition.plan_job(1, 100, 1, 60.0, node_budget=4)
+        payload = plan.make_job_request("u", "g", "a", "/f", "n", "europe-west1", ["x"])
+        self.assertEqual(payload["partCount"], plan.part_count)
+        self.assertEqual(payload["nodeCount"], plan.node_count)
+        self.assertEqual(payload["computeData"]["frameRange"], {"start": 1, "finish": 100, "increment": 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+from fakes import Clock, FakeResponse, FakeSession
+from athera.api import compute, sessions
+from athera.api.common import parse_retry_after
+from athera.api.retry import RetryPolicy, RateLimiter, TokenBucket
+from athera.api.transport import Transport
+
+import unittest
+import requests
+
+
+class RetryTest(unittest.TestCase):
+    url = "https://api.example/api/v1/compute/jobs"
+
+    def make_transport(self, script, **policy_kwargs):
+        self.sleeps = []
+        policy = RetryPolicy(sleep=self.sleeps.append, **policy_kwargs)
+        transport = Transport(retry=policy)
+        transport.session = FakeSession(script)
+        return transport
+
+    def test_get_retries_5xx(self):
+        """ Positive test - an idempotent GET is retried until it succeeds """
+        transport = self.make_transport([503, 502, 200])
+        response = transport.get(self.url, route=compute.route_jobs)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(transport.session.calls), 3)
+        self.assertEqual(len(self.sleeps), 2)
+
+    def test_gives_up_after_max_attempts(self):
+        """ Negative test - the last error response is returned """
+        transport = self.make_transport([503] * 3, max_attempts=3)
+        response = transport.get(self.url, route=compute.route_jobs)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(len(transport.session.calls), 3)
+
+    def test_post_not_retried_after_5xx(self):
+        """ Negative test - create_job may have been applied, so a 5xx is not retried """
+        transport = self.make_transport([503, 200])
+        response = transport.post(self.url, route=compute.route_jobs)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(len(transport.session.calls), 1)
+
+    def test_post_not_retried_after_connection_error(self):
+        """ Negative test """
+        transport = self.make_transport([requests.ConnectionError("reset"), 200])
+        with self.assertRaises(requests.ConnectionError):
+            transport.post(self.url, route=sessions.route_sessions)
+
+    def test_idempotent_post_retried(self):
+        """ Positive test - stopping a session twice is harmless """
+        transport = self.make_transport([503, 200])
+        response = transport.post(self.url, route=sessions.route_session_stop)
+        self.assertEqual(response.status_code, 200)
+
+    def test_post_retries_429_with_retry_after(self):
+        """ Positive test - a 429 was never processed, so even create_job retries it, waiting as asked """
+        transport = self.make_transport([FakeResponse(status_code=429, headers={"Retry-After": "7"}), 200])
+        response = transport.post(self.url, route=compute.route_jobs)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.sleeps, [7.0])
+
+    def test_backoff_bounds(self):
+        """ Positive test - exponential backoff with full jitter, capped by max_backoff """
+        policy = RetryPolicy(backoff_factor=1.0, max_backoff=5.0)
+        for attempt in range(1, 8):
+            delay = policy.backoff(attempt)
+            self.assertGreaterEqual(delay, 0)
+            self.assertLessEqual(delay, min(5.0, 2 ** (attempt - 1)))
+
+    def test_parse_retry_after(self):
+        """ Positive and negative test - seconds, HTTP dates and junk """
+        self.assertEqual(parse_retry_after("3"), 3.0)
+        self.assertEqual(parse_retry_after("Thu, 01 Jan 1970 00:01:40 GMT", now=40), 60)
+        self.assertIsNone(parse_retry_after("cheddar"))
+        self.assertIsNone(parse_retry_after(None))
+
+
+class RateLimiterTest(unittest.TestCase):
+
+    def test_token_bucket(self):
+        """ Positive test - a burst is free, then requests are spaced at the refill rate """
+        clock = Clock(0.0)
+        bucket = TokenBucket(rate=2, burst=2, clock=clock)
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertAlmostEqual(bucket.reserve(), 0.5)
+        clock.now += 10
+        self.assertEqual(bucket.reserve(), 0)
+
+    def test_limiter_per_group_and_pause(self):
+        """ Positive test - groups have separate buckets, and a pause holds back only its own group """
+        clock = Clock(0.0)
+        limiter = RateLimiter(rate=1, burst=1, clock=clock, sleep=clock.sleep)
+        limiter.acquire(("api", "a"))
+        limiter.acquire(("api", "b"))
+        self.assertEqual(clock.now, 0)
+        limiter.pause(("api", "a"), 30)
+        limiter.acquire(("api", "a"))
+        self.assertEqual(clock.now, 30)
@@ -0,0 +1,194 @@
+from fakes import Clock, FakeResponse
+from athera.api.session_pool import SessionPool
+from athera.api.watchers import SessionBackoff, SessionWaiter
+
+import itertools
+import threading
+import time
+import unittest
+
+FAST = SessionBackoff({"CREATED": 0.001}, 2.0, 0.01)
+
+
+class FakePlatform(object):
+    """ Sessions are CREATED when started and READY on the next poll """
+    def __init__(self):
+        self.sessions = {}
+        self.counter = itertools.count()
+        self.lock = threading.Lock()
+        self.started = []
+        self.stopped = []
+        # Session ids whose next get_session returns this status code, or raises this exception
+        self.errors = {}
+        self.unstoppable = set()
+
+    def start_session(self, payload):
+        with self.lock:
+            session_id = "s{}".format(next(self.counter))
+            self.sessions[session_id] = {"id": session_id, "status": "CREATED", "app_id": payload["app_id"]}
+            self.started.append(session_id)
+            return FakeResponse(dict(self.sessions[session_id]))
+
+    def get_session(self, session_id):
+        with self.lock:
+            error = self.errors.pop(session_id, None)
+            if isinstance(error, Exception):
+                raise error
+            if error is not None:
+                return FakeResponse({}, error)
+            session = self.sessions[session_id]
+            result = dict(session)
+            if session["status"] == "CREATED":
+                session["status"] = "READY"
+            return FakeResponse(result)
+
+    def stop_session(self, session_id):
+        with self.lock:
+            if session_id in self.unstoppable:
+                raise RuntimeError("connection reset")
+            self.sessions[session_id]["status"] = "TERMINATED"
+            self.stopped.append(session_id)
+            return FakeResponse({})
+
+
+class FakeWaiter(SessionWaiter):
+    def __init__(self, platform):
+        super(FakeWaiter, self).__init__("https://api.example", "token", FAST)
+        self.platform = platform
+
+    def fetch_session(self, group_id, session_id):
+        return self.platform.get_session(session_id)
+
+
+class FakePool(SessionPool):
+    def __init__(self, platform, **kwargs):
+        super(FakePool, self).__init__("https://api.example", "group", "token", "user", waiter=FakeWaiter(platform),
+                                       check_interval=0.01, **kwargs)
+        self.platform = platform
+
+    def start_session(self, payload):
+        return self.platform.start_session(payload)
+
+    def stop_session(self, session_id):
+        return self.platform.stop_session(session_id)
+
+    def fetch_session(self, session_id):
+        return self.platform.get_session(session_id)
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() > deadline:
+            raise AssertionError("condition not met")
+        time.sleep(0.005)
+
+
+class SessionPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.platform = FakePlatform()
+        self.clock = Clock()
+
+    def test_warm_and_acquire(self):
+        """ Positive test - a warm session is handed out READY and replaced in the background """
+        with FakePool(self.platform, min_size=2, clock=self.clock) as pool:
+            pool.warm("app", "europe-west1")
+            wait_until(lambda: pool.stats()[("app", "europe-west1")]["warm"] == 2)
+            session = pool.acquire("app", "europe-west1")
+            self.assertEqual(session["status"], "READY")
+            self.assertEqual(pool.stats()[("app", "europe-west1")]["hits"], 1)
+            wait_until(lambda: pool.stats()[("app", "europe-west1")]["warm"] == 2)
+            self.assertEqual(len(self.platform.started), 3)
+
+    def test_cold_acquire(self):
+        """ Positive test - with nothing warm, acquire starts a session and waits for it """
+        pool = FakePool(self.platform, min_size=0, clock=self.clock)
+        session = pool.acquire("app", "us-west1", timeout=5)
+        self.assertEqual(session["status"], "READY")
+        self.assertEqual(pool.stats()[("app", "us-west1")]["misses"], 1)
+        pool.close()
+
+    def test_target_follows_demand_and_trims(self):
+        """ Positive test - demand raises the target, and surplus is stopped once demand has passed """
+        pool = FakePool(self.platform, min_size=1, max_size=3, demand_window=60, clock=self.clock)
+        pool.warm("app", "r")
+        for _ in range(3):
+            pool._slot(("app", "r")).demand.append(self.clock())
+        self.assertEqual(pool.stats()[("app", "r")]["target"], 3)
+        pool.start()
+        wait_until(lambda: pool.stats()[("app", "r")]["warm"] == 3)
+
+        self.clock.now += 61
+        wait_until(lambda: pool.stats()[("app", "r")]["warm"] == 1)
+        self.assertEqual(len(self.platform.stopped), 2)
+        pool.close()
+        self.assertEqual(len(self.platform.stopped), 3)
+
+    def test_expired_warm_session_is_skipped(self):
+        """ Negative test - a warm session which is no longer READY is not handed out """
+        pool = FakePool(self.platform, min_size=1, clock=self.clock)
+        pool.warm("app", "r")
+        pool.start()
+        wait_until(lambda: pool.stats()[("app", "r")]["warm"] == 1)
+        pool.stopped.set()
+        pool.thread.join()
+        stale = pool.slots[("app", "r")].warm[0]
+        self.platform.sessions[stale["id"]]["status"] = "TERMINATED"
+        session = pool.acquire("app", "r", timeout=5)
+        self.assertNotEqual(session["id"], stale["id"])
+        self.assertEqual(session["status"], "READY")
+        pool.close()
+
+    def warm_pool(self):
+        # A pool with one warm session and no maintenance thread
+        pool = FakePool(self.platform, min_size=1, clock=self.clock)
+        pool.warm("app", "r")
+        pool.start()
+        wait_until(lambda: pool.stats()[("app", "r")]["warm"] == 1)
+        pool.stopped.set()
+        pool.thread.join()
+        return pool, pool.slots[("app", "r")].warm[0]
+
+    def test_warm_session_kept_on_transient_error(self):
+        """ Negative test - a warm session which cannot be checked for now stays in the pool, the caller gets another """
+        for error in (503, RuntimeError("connection reset")):
+            pool, warm = self.warm_pool()
+            self.platform.errors[warm["id"]] = error
+            session = pool.acquire("app", "r", timeout=5)
+            self.assertNotEqual(session["id"], warm["id"])
+            self.assertEqual(list(pool.slots[("app", "r")].warm), [warm])
+            self.assertNotIn(warm["id"], self.platform.stopped)
+            pool.close()
+            self.assertIn(warm["id"], self.platform.stopped)
+
+    def test_warm_session_stopped_on_permanent_error(self):
+        """ Negative test - a warm session which can no longer be fetched is stopped rather than leaked """
+        pool, warm = self.warm_pool()
+        self.platform.errors[warm["id"]] = 404
+        session = pool.acquire("app", "r", timeout=5)
+        self.assertNotEqual(session["id"], warm["id"])
+        self.assertEqual(self.platform.stopped, [warm["id"]])
+        pool.close()
+
+    def test_close_continues_after_failed_stop(self):
+        """ Negative test - a stop which raises does not leave the other sessions running """
+        pool = FakePool(self.platform, min_size=3, clock=self.clock)
+        pool.warm("app", "r")
+        pool.start()
+        wait_until(lambda: pool.stats()[("app", "r")]["warm"] == 3)
+        first = pool.slots[("app", "r")].warm[0]["id"]
+        self.platform.unstoppable.add(first)
+        pool.close()
+        self.assertEqual(sorted(self.platform.stopped), sorted(set(self.platform.started) - {first}))
+
+    def test_close_stops_starting_sessions(self):
+        """ Positive test - sessions still starting when the pool is closed are stopped """
+        pool = FakePool(self.platform, min_size=2, clock=self.clock)
+        pool.warm("app", "r")
+        # Without the waiter running the sessions never leave CREATED
+        pool.maintain()
+        self.assertEqual(pool.stats()[("app", "r")]["starting"], 2)
+        pool.close()
+        self.assertEqual(sorted(self.platform.stopped), sorted(self.platform.started))
+        self.assertEqual(len(self.platform.stopped), 2)
@@ -0,0 +1,105 @@
+from fakes import FakeResponse
+from athera.api import streaming
+from athera.api.cache import ResponseCache
+from athera.api.transport import Transport
+
+import json
+import unittest
+
+
+def chunked(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+class StreamedResponse(FakeResponse):
+    """ A response whose JSON body is read in chunks of 'chunk_size' bytes """
+    def __init__(self, data, chunk_size=7):
+        super(StreamedResponse, self).__init__(data, content=json.dumps(data).encode("utf-8"))
+        self.chunk_size = chunk_size
+
+    def iter_content(self, chunk_size):
+        return iter(chunked(self.content, self.chunk_size))
+
+
+class StreamingTest(unittest.TestCase):
+
+    def test_items_across_chunk_boundaries(self):
+        """ Positive test - every chunk size, including one byte, decodes the same items """
+        data = {
+            "pagination": {"page": 1},
+            "jobs": [{"id": "j{}".format(i), "name": u"rénder ✓", "partCount": 12345} for i in range(20)],
+            "total": 20,
+        }
+        body = json.dumps(data).encode("utf-8")
+        for size in (1, 2, 3, 5, 64, len(body)):
+            meta = {}
+            items = list(streaming.iter_items(chunked(body, size), "jobs", meta))
+            self.assertEqual(items, data["jobs"])
+            self.assertEqual(meta, {"pagination": {"page": 1}, "total": 20})
+
+    def test_numbers_split_between_chunks(self):
+        """ Positive test - a number at the end of a chunk is not cut short """
+        items = list(streaming.iter_items([b'{"parts": [12', b'34, 5', b'6.5e', b'1]}'], "parts"))
+        self.assertEqual(items, [1234, 565.0])
+
+    def test_top_level_list_and_empty(self):
+        """ Positive test """
+        self.assertEqual(list(streaming.iter_items([b' [1, ', b'{"a": []}] '], "parts")), [1, {"a": []}])
+        self.assertEqual(list(streaming.iter_items([b'{"parts": []}'], "parts")), [])
+        self.assertEqual(list(streaming.iter_items([b'{}'], "parts")), [])
+        self.assertEqual(list(streaming.iter_items([b'{"parts": null}'], "parts")), [])
+
+    def test_items_are_yielded_before_the_body_ends(self):
+        """ Positive test - the first item arrives while later chunks are still unread """
+        read = []
+
+        def chunks():
+            for chunk in (b'{"parts": [{"id": 1},', b' {"id": 2}', b']}'):
+                read.append(chunk)
+                yield chunk
+
+        items = streaming.iter_items(chunks(), "parts")
+        self.assertEqual(next(items), {"id": 1})
+        self.assertEqual(len(read), 1)
+
+    def test_malformed(self):
+        """ Negative test - truncated or invalid bodies raise ValueError """
+        with self.assertRaises(ValueError):
+            list(streaming.iter_items([b'{"parts": [{"id": 1}, {"id"'], "parts"))
+        with self.assertRaises(ValueError):
+            list(streaming.iter_items([b'{"parts": [1 2]}'], "parts"))
+        with self.assertRaises(ValueError):
+            list(streaming.iter_items([b'"parts"'], "parts"))
+
+    def test_stream_pages(self):
+        """ Positive test - pages are followed using the pagination object, and every response is closed """
+        pages = [[1, 2], [3]]
+        responses = []
+
+        def fetch(page, page_size, stream):
+            self.assertTrue(stream)
+            index = (page or 1) - 1
+            responses.append(StreamedResponse({"jobs": pages[index],
+                                               "pagination": {"page": index + 1, "totalPages": len(pages)}}))
+            return responses[-1]
+
+        self.assertEqual(list(streaming.stream_pages(fetch, "jobs")), [1, 2, 3])
+        self.assertEqual(len(responses), 2)
+        self.assertTrue(all(response.closed for response in responses))
+
+    def test_streamed_get_bypasses_cache(self):
+        """ Positive test - a stream=True response is never stored or shared """
+        cache = ResponseCache(ttls={"/route": 60})
+        transport = Transport(cache=cache, coalesce=True)
+        calls = []
+
+        class Session(object):
+            def request(self, method, url, **kwargs):
+                calls.append(kwargs.get("stream"))
+                return StreamedResponse({})
+
+        transport.session = Session()
+        transport.get("https://api.example/route", route="/route", stream=True)
+        transport.get("https://api.example/route", route="/route", stream=True)
+        self.assertEqual(calls, [True, True])
+        self.assertEqual(len(cache), 0)
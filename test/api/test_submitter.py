@@ -0,0 +1,160 @@
+from fakes import FakeResponse
+from athera.api import compute, submitter
+from athera.api.submitter import BatchSubmitter
+
+import itertools
+import threading
+import unittest
+
+import requests
+
+
+class FakeSubmitter(BatchSubmitter):
+    """ Jobs are created on a fake farm. 'failures' maps a shot name to what its next submissions return """
+    def __init__(self, failures=None, jobs=None, **kwargs):
+        kwargs.setdefault("batch_id", "batch")
+        kwargs.setdefault("sleep", lambda seconds: None)
+        super(FakeSubmitter, self).__init__("https://api.example", "group", "token", "user", "app", "europe-west1",
+                                            ["-x"], **kwargs)
+        self.failures = dict((name, list(outcomes)) for name, outcomes in (failures or {}).items())
+        self.jobs = list(jobs or [])
+        self.creates = []
+        self.listings = 0
+        self.counter = itertools.count()
+        self.lock = threading.Lock()
+
+    def create_job(self, payload, key):
+        name = payload["computeData"]["name"].split(" [")[0]
+        with self.lock:
+            self.creates.append((name, key))
+            outcome = self.failures.get(name, []).pop(0) if self.failures.get(name) else None
+            job = {"id": "j{}".format(next(self.counter)), "name": payload["computeData"]["name"]}
+            if outcome in ("timeout-created", "502-created"):
+                self.jobs.append(job)
+        if outcome in ("timeout", "timeout-created"):
+            raise requests.ReadTimeout("read timed out")
+        if outcome == "connect":
+            raise requests.ConnectTimeout("connect timed out")
+        if outcome in ("502", "502-created"):
+            return FakeResponse({}, 502)
+        if outcome in (400, 429):
+            return FakeResponse({}, outcome)
+        with self.lock:
+            self.jobs.append(job)
+        return FakeResponse(job)
+
+    def list_jobs(self):
+        with self.lock:
+            self.listings += 1
+            return list(self.jobs)
+
+
+def shots(*names):
+    return [{"name": name, "file_path": "/data/{}.nk".format(name), "frame_start": "1001", "frame_finish": "1010"}
+            for name in names]
+
+
+class SubmitterTest(unittest.TestCase):
+
+    def test_submit(self):
+        """ Positive test - every shot is created once, with a tagged name and its own key """
+        fake = FakeSubmitter(max_in_flight=4)
+        result = fake.submit(shots("sh010", "sh020", "sh030"))
+        self.assertEqual(list(result), ["sh010", "sh020", "sh030"])
+        self.assertTrue(all(submission.status == submitter.SUBMIT_CREATED for submission in result.values()))
+        self.assertEqual(len(fake.jobs), 3)
+        self.assertEqual(len(set(key for _, key in fake.creates)), 3)
+        payload = result["sh010"].payload["computeData"]
+        self.assertEqual(submitter.name_key(payload["name"]), result["sh010"].key)
+        self.assertEqual(payload["frameRange"], {"start": 1001, "finish": 1010, "increment": 1})
+        self.assertEqual(payload["arguments"], ["-x"])
+
+    def test_keys_are_stable(self):
+        """ Positive test - the same shot in the same batch always gets the same key """
+        self.assertEqual(submitter.idempotency_key("b", "sh010"), submitter.idempotency_key("b", "sh010"))
+        self.assertNotEqual(submitter.idempotency_key("b", "sh010"), submitter.idempotency_key("c", "sh010"))
+        self.assertIsNone(submitter.name_key("sh010"))
+
+    def test_resubmit_batch(self):
+        """ Positive test - submitting a batch again only creates the missing shots """
+        fake = FakeSubmitter()
+        fake.submit(shots("sh010", "sh020"))
+        result = fake.submit(shots("sh010", "sh020", "sh030"))
+        self.assertEqual(result["sh010"].status, submitter.SUBMIT_EXISTING)
+        self.assertEqual(result["sh030"].status, submitter.SUBMIT_CREATED)
+        self.assertEqual(len(fake.jobs), 3)
+
+    def test_ambiguous_created(self):
+        """ Positive test - a timeout whose job was created is found by listing, not submitted again """
+        fake = FakeSubmitter({"sh010": ["timeout-created"], "sh020": ["502-created"]})
+        result = fake.submit(shots("sh010", "sh020"))
+        self.assertEqual(result["sh010"].status, submitter.SUBMIT_EXISTING)
+        self.assertEqual(result["sh020"].status, submitter.SUBMIT_EXISTING)
+        self.assertEqual(len(fake.jobs), 2)
+        self.assertEqual(len(fake.creates), 2)
+        self.assertEqual(fake.listings, 2)
+
+    def test_ambiguous_missing(self):
+        """ Positive test - a timeout whose job does not exist is submitted again """
+        fake = FakeSubmitter({"sh010": ["timeout"]})
+        result = fake.submit(shots("sh010"))
+        self.assertEqual(result["sh010"].status, submitter.SUBMIT_CREATED)
+        self.assertEqual(result["sh010"].attempts, 2)
+        self.assertEqual(len(fake.jobs), 1)
+
+    def test_rejected_retry(self):
+        """ Positive test - 429 and connect timeouts never reached the API, so are submitted again without listing """
+        fake = FakeSubmitter({"sh010": [429], "sh020": ["connect"]}, reconcile=False)
+        result = fake.submit(shots("sh010", "sh020"))
+        self.assertEqual(result["sh010"].status, submitter.SUBMIT_CREATED)
+        self.assertEqual(result["sh020"].status, submitter.SUBMIT_CREATED)
+        self.assertEqual(fake.listings, 0)
+        self.assertEqual(len(fake.jobs), 2)
+
+    def test_unknown_after_attempts(self):
+        """ Negative test - a shot ambiguous on every attempt is left UNKNOWN """
+        fake = FakeSubmitter({"sh010": ["timeout"] * 3})
+        result = fake.submit(shots("sh010"))
+        self.assertEqual(result["sh010"].status, submitter.SUBMIT_UNKNOWN)
+        self.assertEqual(result["sh010"].attempts, 3)
+        self.assertFalse(result["sh010"].ok)
+
+    def test_failed(self):
+        """ Negative test - a rejected payload is not submitted again """
+        fake = FakeSubmitter({"sh010": [400]})
+        result = fake.submit(shots("sh010", "sh020"))
+        self.assertEqual(result["sh010"].status, submitter.SUBMIT_FAILED)
+        self.assertEqual(result["sh010"].error.response.status_code, 400)
+        self.assertEqual(result["sh020"].status, submitter.SUBMIT_CREATED)
+        self.assertEqual(len(fake.creates), 2)
+
+    def test_bad_shots(self):
+        """ Negative test - duplicate shots and missing columns are rejected before anything is submitted """
+        fake = FakeSubmitter()
+        with self.assertRaises(ValueError):
+            fake.submit(shots("sh010", "sh010"))
+        with self.assertRaises(ValueError):
+            fake.submit([{"name": "sh010", "file_path": "/data/sh010.nk", "frame_start": 1}])
+        self.assertEqual(fake.creates, [])
+
+    def test_create_job_header(self):
+        """ Positive test - the idempotency key is sent as a header """
+        sent = {}
+
+        class Transport(object):
+            def post(self, url, **kwargs):
+                sent.update(kwargs["headers"])
+                return FakeResponse({})
+
+        original = compute.get_transport
+        compute.get_transport = lambda: Transport()
+        try:
+            compute.create_job("https://api.example", "group", "token", {}, idempotency_key="abc")
+        finally:
+            compute.get_transport = original
+        self.assertEqual(sent[compute.idempotency_header], "abc")
+        self.assertEqual(sent["active-group"], "group")
+
+
+if __name__ == "__main__":
+    unittest.main()
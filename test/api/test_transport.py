@@ -0,0 +1,51 @@
+from athera.api.transport import Transport
+
+import threading
+import unittest
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+
+
+class CookieHandler(BaseHTTPRequestHandler):
+    """ Sets a cookie on every reply, and echoes back the cookie it was sent """
+
+    def do_GET(self):
+        body = (self.headers.get("Cookie") or "").encode("utf-8")
+        self.send_response(200)
+        self.send_header("Set-Cookie", "session=secret; Path=/")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TransportTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = HTTPServer(("127.0.0.1", 0), CookieHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        self.url = "http://127.0.0.1:{}/api/v1/orgs".format(self.server.server_port)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_cookies_are_not_kept(self):
+        """ Negative test - a cookie set in reply to one request is not sent with the next """
+        transport = Transport()
+        first = transport.request("GET", self.url, headers={"Authorization": "Bearer: one"})
+        self.assertEqual(first.cookies.get("session"), "secret")
+        second = transport.request("GET", self.url, headers={"Authorization": "Bearer: two"})
+        self.assertEqual(second.text, "")
+        self.assertEqual(len(transport.session.cookies), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
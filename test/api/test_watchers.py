@@ -0,0 +1,246 @@
+from fakes import FakeResponse
+from athera.api.watchers import JobWatcher, SessionBackoff, SessionWaiter
+
+import asyncio
+import threading
+import unittest
+
+import requests
+
+
+class FakeJobWatcher(JobWatcher):
+    def __init__(self, jobs, **kwargs):
+        super(FakeJobWatcher, self).__init__("https://api.example", "token", **kwargs)
+        self.jobs = jobs
+        self.listings = []
+        self.fetches = []
+        self.errors = {}
+
+    def list_jobs(self, group_id):
+        self.listings.append(group_id)
+        for job_id, (job_group, status) in sorted(self.jobs.items()):
+            if job_group == group_id and not job_id.startswith("hidden"):
+                yield {"id": job_id, "status": status}
+
+    def fetch_job(self, group_id, job_id):
+        self.fetches.append(job_id)
+        error = self.errors.get(job_id)
+        if isinstance(error, Exception):
+            raise error
+        if error is not None:
+            return FakeResponse({}, error)
+        return FakeResponse({"id": job_id, "status": self.jobs[job_id][1]})
+
+
+class JobWatcherTest(unittest.TestCase):
+
+    def setUp(self):
+        self.jobs = {
+            "j1": ("g1", "CREATED"),
+            "j2": ("g1", "CREATED"),
+            "j3": ("g2", "CREATED"),
+        }
+        self.watcher = FakeJobWatcher(self.jobs, min_interval=1.0, max_interval=8.0, backoff=2.0)
+        self.changes = []
+        self.watcher.on_change(lambda job, old, new: self.changes.append((job["id"], old, new)))
+
+    def test_one_listing_per_group(self):
+        """ Positive test - one listing per group per tick, however many jobs are watched """
+        for job_id, (group_id, _) in self.jobs.items():
+            self.watcher.watch(group_id, job_id)
+        self.watcher.poll()
+        self.assertEqual(sorted(self.watcher.listings), ["g1", "g2"])
+        self.assertEqual(self.watcher.fetches, [])
+
+    def test_callbacks_only_on_transitions(self):
+        """ Positive test """
+        seen = []
+        self.watcher.watch("g1", "j1", lambda job, old, new: seen.append((old, new)))
+        self.watcher.poll()
+        self.watcher.poll()
+        self.jobs["j1"] = ("g1", "ACTIVE")
+        self.watcher.poll()
+        self.assertEqual(seen, [(None, "CREATED"), ("CREATED", "ACTIVE")])
+        self.assertEqual(self.changes, [("j1", None, "CREATED"), ("j1", "CREATED", "ACTIVE")])
+
+    def test_future_resolves_on_final_status(self):
+        """ Positive test - the job is no longer watched once final """
+        future = self.watcher.watch("g1", "j1")
+        self.watcher.poll()
+        self.assertFalse(future.done())
+        self.jobs["j1"] = ("g1", "CANCELED")
+        self.watcher.poll()
+        self.assertEqual(future.result(0)["status"], "CANCELED")
+        self.assertNotIn("j1", self.watcher.watches)
+
+    def test_adaptive_interval(self):
+        """ Positive test - the interval backs off while idle and resets on a change """
+        self.watcher.watch("g1", "j1")
+        self.watcher.poll()
+        self.assertEqual(self.watcher.interval, 1.0)
+        self.watcher.poll()
+        self.watcher.poll()
+        self.assertEqual(self.watcher.interval, 4.0)
+        for _ in range(5):
+            self.watcher.poll()
+        self.assertEqual(self.watcher.interval, 8.0)
+        self.jobs["j1"] = ("g1", "ACTIVE")
+        self.watcher.poll()
+        self.assertEqual(self.watcher.interval, 1.0)
+
+    def test_missing_from_listing(self):
+        """ Positive test - a job absent from the listing is fetched on its own """
+        self.jobs["hidden"] = ("g1", "CREATED")
+        self.watcher.watch("g1", "hidden")
+        self.watcher.poll()
+        self.assertEqual(self.watcher.fetches, ["hidden"])
+        self.assertEqual(self.watcher.status("hidden"), "CREATED")
+
+    def test_missing_job_fails(self):
+        """ Negative test - a job which cannot be fetched fails its future instead of being polled forever """
+        self.jobs["hidden"] = ("g1", "CREATED")
+        self.watcher.errors["hidden"] = 404
+        future = self.watcher.watch("g1", "hidden")
+        self.watcher.poll()
+        with self.assertRaises(requests.HTTPError) as raised:
+            future.result(0)
+        self.assertEqual(raised.exception.response.status_code, 404)
+        self.assertNotIn("hidden", self.watcher.watches)
+
+    def test_fetch_job_retried(self):
+        """ Negative test - a job whose fetch fails with a transient error is fetched again on the next tick """
+        self.jobs["hidden"] = ("g1", "CREATED")
+        self.watcher.errors["hidden"] = 503
+        future = self.watcher.watch("g1", "hidden")
+        self.watcher.poll()
+        self.assertFalse(future.done())
+        del self.watcher.errors["hidden"]
+        self.jobs["hidden"] = ("g1", "FAILED")
+        self.watcher.poll()
+        self.assertEqual(self.watcher.fetches, ["hidden", "hidden"])
+        self.assertEqual(future.result(0)["status"], "FAILED")
+
+    def test_fetch_job_raises(self):
+        """ Negative test - a fetch which raises is logged, and neither stops the tick nor fails the job """
+        self.jobs["hidden1"] = ("g1", "CREATED")
+        self.jobs["hidden2"] = ("g1", "CREATED")
+        self.watcher.errors["hidden1"] = requests.ConnectionError("reset")
+        first = self.watcher.watch("g1", "hidden1")
+        self.watcher.watch("g1", "hidden2")
+        self.watcher.watch("g1", "j1")
+        with self.assertLogs("athera.api", "WARNING"):
+            self.assertEqual(self.watcher.poll(), 2)
+        self.assertEqual(self.watcher.status("hidden2"), "CREATED")
+        self.assertFalse(first.done())
+        del self.watcher.errors["hidden1"]
+        self.watcher.poll()
+        self.assertEqual(self.watcher.status("hidden1"), "CREATED")
+
+    def test_stop_cancels_watched(self):
+        """ Positive test - stopping the watcher cancels the futures of jobs still watched """
+        future = self.watcher.watch("g1", "j1")
+        self.watcher.start()
+        self.watcher.stop()
+        self.assertTrue(future.cancelled())
+        self.assertEqual(self.watcher.watches, {})
+
+    def test_unwatch(self):
+        """ Positive test """
+        future = self.watcher.watch("g1", "j1")
+        self.watcher.unwatch("j1")
+        self.assertTrue(future.cancelled())
+        self.watcher.poll()
+        self.assertEqual(self.watcher.listings, [])
+
+    def test_background_thread(self):
+        """ Positive test """
+        self.jobs["j1"] = ("g1", "COMPLETE")
+        watcher = FakeJobWatcher(self.jobs, min_interval=0.01)
+        with watcher:
+            future = watcher.watch("g1", "j1")
+            self.assertEqual(future.result(5)["status"], "COMPLETE")
+
+
+class FakeSessions(object):
+    """ Each session id maps to the statuses successive get_session calls return; the last one repeats """
+    def __init__(self, timelines):
+        self.timelines = timelines
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __call__(self, session_id):
+        with self.lock:
+            self.calls.append(session_id)
+            timeline = self.timelines.get(session_id)
+            if timeline is None:
+                return FakeResponse({}, 404)
+            status = timeline.pop(0) if len(timeline) > 1 else timeline[0]
+        return FakeResponse({"id": session_id, "status": status})
+
+
+FAST = SessionBackoff({"CREATED": 0.001, "HOST_ASSIGNMENT": 0.001, "WAITING_FOR_CONTAINER": 0.001}, 2.0, 0.01)
+
+
+class FakeSessionWaiter(SessionWaiter):
+    def __init__(self, fake, **kwargs):
+        super(FakeSessionWaiter, self).__init__("https://api.example", "token", **kwargs)
+        self.fake = fake
+
+    def fetch_session(self, group_id, session_id):
+        return self.fake(session_id)
+
+
+class SessionWaiterTest(unittest.TestCase):
+
+    def test_backoff_fits_phases(self):
+        """ Positive test - each phase has its own base interval, growing while the phase lasts """
+        backoff = SessionBackoff({"HOST_ASSIGNMENT": 3.0, "WAITING_FOR_CONTAINER": 1.0}, 2.0, 10.0)
+        self.assertEqual(backoff.interval("HOST_ASSIGNMENT", 0), 3.0)
+        self.assertEqual(backoff.interval("HOST_ASSIGNMENT", 1), 6.0)
+        self.assertEqual(backoff.interval("HOST_ASSIGNMENT", 2), 10.0)
+        self.assertEqual(backoff.interval("WAITING_FOR_CONTAINER", 0), 1.0)
+        self.assertEqual(backoff.interval("UNKNOWN", 0), 10.0)
+
+    def test_many_sessions_one_poller(self):
+        """ Positive test - sessions resolve as soon as they are READY or failed """
+        fake = FakeSessions({
+            "s1": ["CREATED", "HOST_ASSIGNMENT", "WAITING_FOR_CONTAINER", "READY"],
+            "s2": ["CREATED", "ALLOCATION_EXHAUSTED"],
+            "s3": ["READY"],
+        })
+        with FakeSessionWaiter(fake, backoff=FAST) as waiter:
+            futures = dict((session_id, waiter.add("group", session_id)) for session_id in ("s1", "s2", "s3"))
+            statuses = dict((session_id, future.result(5)["status"]) for session_id, future in futures.items())
+        self.assertEqual(statuses, {"s1": "READY", "s2": "ALLOCATION_EXHAUSTED", "s3": "READY"})
+        self.assertEqual(fake.calls.count("s3"), 1)
+        self.assertEqual(fake.calls.count("s1"), 4)
+
+    def test_unknown_session(self):
+        """ Negative test - a 404 fails the future instead of polling forever """
+        fake = FakeSessions({})
+        with FakeSessionWaiter(fake, backoff=FAST) as waiter:
+            future = waiter.add("group", "missing")
+            self.assertIsNotNone(future.exception(5))
+        self.assertEqual(fake.calls, ["missing"])
+
+    def test_async_wait_for_sessions(self):
+        """ Positive test - the asyncio waiter polls all sessions from one coroutine """
+        from athera.api.async_client import AsyncClient
+
+        fake = FakeSessions({
+            "s1": ["CREATED", "WAITING_FOR_CONTAINER", "READY"],
+            "s2": ["HOST_ASSIGNMENT"],
+        })
+
+        class FakeAsyncClient(AsyncClient):
+            async def get_session(self, session_id):
+                return fake(session_id)
+
+        async def main():
+            client = FakeAsyncClient("https://api.example", "token", "group")
+            return await client.wait_for_sessions(["s1", "s2", "s3"], timeout=0.05, backoff=FAST)
+
+        result = asyncio.run(main())
+        self.assertEqual(result["s1"]["status"], "READY")
+        self.assertEqual(result["s2"]["status"], "HOST_ASSIGNMENT")
+        self.assertIsNone(result["s3"])
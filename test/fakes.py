@@ -0,0 +1,66 @@
+"""
+Fakes shared by the offline tests, standing in for requests and for time:
+
+    from fakes import Clock, FakeResponse, FakeSession
+    transport.session = FakeSession([503, FakeResponse({"jobs": []})])
+"""
+import requests
+
+
+class FakeResponse(object):
+    """ Stands in for requests.Response, with 'data' as the JSON body """
+    def __init__(self, data=None, status_code=200, headers=None, content=b"", url="https://api.example"):
+        self.data = data
+        self.status_code = status_code
+        self.ok = status_code < 400
+        self.headers = headers or {}
+        self.content = content
+        self.url = url
+        self.closed = False
+
+    def json(self):
+        return self.data
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise requests.HTTPError("{} Error for url: {}".format(self.status_code, self.url), response=self)
+
+    def close(self):
+        self.closed = True
+
+
+class FakeSession(object):
+    """
+    Stands in for requests.Session, replaying a script of responses, status codes and exceptions in turn.
+    With a 'release' event each request waits for it to be set.
+    """
+    def __init__(self, script=(), release=None):
+        self.script = list(script)
+        self.release = release
+        self.calls = []
+
+    def request(self, method, url, **kwargs):
+        self.calls.append((method, url, kwargs.get("headers") or {}))
+        if self.release is not None:
+            self.release.wait(5)
+        outcome = self.script.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        if isinstance(outcome, int):
+            return FakeResponse(status_code=outcome)
+        return outcome
+
+    def close(self):
+        pass
+
+
+class Clock(object):
+    """ A clock which only moves when told to, or when slept on """
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds